@@ -0,0 +1,210 @@
+import typing
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from botocore.auth import SigV4Auth
+from botocore.session import Session
+
+from aws_sso_user_list import metrics, tracing
+from aws_sso_user_list.concurrency import bounded_map
+from aws_sso_user_list.group import GroupMemberships, list_group_ids
+from aws_sso_user_list.lookup import LookupCache
+from aws_sso_user_list.transport import BaseTransport, post_signed
+
+
+@dataclass
+class AccountAssignment:
+    account_id: str
+    permission_set_arn: str
+    permission_set_name: str
+    principal_type: str
+    principal_id: str
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "AccountAssignment":
+        return cls(
+            account_id=data["account_id"],
+            permission_set_arn=data["permission_set_arn"],
+            permission_set_name=data["permission_set_name"],
+            principal_type=data["principal_type"],
+            principal_id=data["principal_id"],
+        )
+
+
+@dataclass
+class UserAccountAssignments:
+    user_id: str
+    account_assignments: list[AccountAssignment]
+
+
+def _post_sso_admin(
+    sigv4_auth: SigV4Auth,
+    region: str,
+    target: str,
+    body: dict,
+    transport: BaseTransport | None = None,
+) -> dict:
+    return post_signed(
+        sigv4_auth=sigv4_auth,
+        url=f"https://sso.{region}.amazonaws.com/",
+        target=f"SWBExternalService.{target}",
+        body=body,
+        transport=transport,
+    )
+
+
+def _fetch_account_assignments(
+    sigv4_auth: SigV4Auth,
+    instance_arn: str,
+    region: str,
+    principal_type: str,
+    principal_id: str,
+    next_token: str | None = None,
+    transport: BaseTransport | None = None,
+) -> dict:
+    body: dict[str, typing.Any] = {
+        "InstanceArn": instance_arn,
+        "PrincipalType": principal_type,
+        "PrincipalId": principal_id,
+        "MaxResults": 100,
+    }
+    if next_token:
+        body["NextToken"] = next_token
+    return _post_sso_admin(
+        sigv4_auth=sigv4_auth,
+        region=region,
+        target="ListAccountAssignmentsForPrincipal",
+        body=body,
+        transport=transport,
+    )
+
+
+def _describe_permission_set(
+    sigv4_auth: SigV4Auth,
+    instance_arn: str,
+    region: str,
+    permission_set_arn: str,
+    transport: BaseTransport | None = None,
+) -> dict:
+    return _post_sso_admin(
+        sigv4_auth=sigv4_auth,
+        region=region,
+        target="DescribePermissionSet",
+        body={
+            "InstanceArn": instance_arn,
+            "PermissionSetArn": permission_set_arn,
+        },
+        transport=transport,
+    )
+
+
+def iter_all_account_assignments(
+    identity_store_id: str,
+    region: str,
+    instance_arn: str,
+    user_ids: typing.Iterable[str],
+    transport: BaseTransport | None = None,
+    max_workers: int = 1,
+    memberships: GroupMemberships | None = None,
+) -> typing.Iterator[UserAccountAssignments]:
+    credentials = Session().get_credentials()
+    sigv4_auth = SigV4Auth(
+        credentials=credentials, service_name="sso", region_name=region
+    )
+    identity_store_sigv4_auth = SigV4Auth(
+        credentials=credentials,
+        service_name="identitystore",
+        region_name=region,
+    )
+
+    def describe(permission_set_arn: str) -> str:
+        with tracing.span("_describe_permission_set"):
+            response = _describe_permission_set(
+                sigv4_auth=sigv4_auth,
+                instance_arn=instance_arn,
+                region=region,
+                permission_set_arn=permission_set_arn,
+                transport=transport,
+            )
+        metrics.increment("permission_sets")
+        return response["PermissionSet"]["Name"]
+
+    def list_assignments(
+        principal_type: str, principal_id: str
+    ) -> list[AccountAssignment]:
+        account_assignments: list[AccountAssignment] = []
+        next_token = None
+        with tracing.span(
+            "_fetch_account_assignments",
+            principal_type=principal_type,
+            principal_id=principal_id,
+        ):
+            while True:
+                response = _fetch_account_assignments(
+                    sigv4_auth=sigv4_auth,
+                    instance_arn=instance_arn,
+                    region=region,
+                    principal_type=principal_type,
+                    principal_id=principal_id,
+                    next_token=next_token,
+                    transport=transport,
+                )
+                # Assignments inherited from groups are looked up per group
+                account_assignments.extend(
+                    AccountAssignment(
+                        account_id=assignment["AccountId"],
+                        permission_set_arn=assignment["PermissionSetArn"],
+                        permission_set_name=permission_set_names.get(
+                            assignment["PermissionSetArn"]
+                        ),
+                        principal_type=assignment["PrincipalType"],
+                        principal_id=assignment["PrincipalId"],
+                    )
+                    for assignment in response["AccountAssignments"]
+                    if assignment["PrincipalType"] == principal_type
+                )
+                if not (next_token := response.get("NextToken")):
+                    break
+        return account_assignments
+
+    permission_set_names = LookupCache(describe)
+    group_assignments = LookupCache(
+        lambda group_id: list_assignments("GROUP", group_id)
+    )
+
+    def fetch(user_id: str) -> UserAccountAssignments:
+        account_assignments = list_assignments("USER", user_id)
+        group_ids = (
+            memberships.pop(user_id) if memberships is not None else None
+        )
+        if group_ids is None:
+            group_ids = list_group_ids(
+                sigv4_auth=identity_store_sigv4_auth,
+                identity_store_id=identity_store_id,
+                region=region,
+                user_id=user_id,
+                transport=transport,
+            )
+        for group_id in group_ids:
+            account_assignments.extend(group_assignments.get(group_id))
+        account_assignments.sort(
+            key=lambda assignment: (
+                assignment.account_id,
+                assignment.permission_set_name,
+                assignment.principal_type,
+            )
+        )
+        return UserAccountAssignments(
+            user_id=user_id, account_assignments=account_assignments
+        )
+
+    with (
+        tracing.span(
+            "fetch_all_account_assignments", max_workers=max_workers
+        ) as span,
+        ThreadPoolExecutor(max_workers=max_workers) as executor,
+    ):
+        for _, future in bounded_map(executor, fetch, user_ids, max_workers):
+            yield future.result()
+        span.set_attribute("groups", len(group_assignments))
+        span.set_attribute("permission_sets", len(permission_set_names))
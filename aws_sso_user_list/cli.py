@@ -1,81 +1,259 @@
-import csv
-import json
+import threading
 import typing
-from dataclasses import asdict
-from datetime import datetime
-from enum import Enum
+import warnings
+from functools import partial
 
 import click
 
+from aws_sso_user_list import memory, metrics, progress, tracing
+from aws_sso_user_list.diff import diff_users, load_users
+from aws_sso_user_list.exporter import (
+    BaseUserExporter,
+    Format,
+    UserCsvExporter,
+    UserDiffJsonExporter,
+    UserJsonExporter,
+    UserMfaDeviceCsvExporter,
+    UserSummaryExporter,
+    UserXlsxExporter,
+)
+from aws_sso_user_list.failures import (
+    PARTIAL_FAILURE_EXIT_CODE,
+    FailureReport,
+)
+from aws_sso_user_list.fanout import fan_out
+from aws_sso_user_list.hedging import Hedge
+from aws_sso_user_list.loadtest import DEFAULT_LATENCY, sweep, write_results
+from aws_sso_user_list.mfa_device import MFA_BATCH_SIZE
+from aws_sso_user_list.parts import SPLIT_BY, write_parts
+from aws_sso_user_list.progress import PROGRESS_FORMATS, PROGRESS_INTERVAL
+from aws_sso_user_list.recording import RecordingTransport, ReplayTransport
+from aws_sso_user_list.server import UserCache, UserServer
+from aws_sso_user_list.table import UserTable
+from aws_sso_user_list.transport import (
+    BACKOFF,
+    CONNECT_TIMEOUT,
+    MAX_BACKOFF,
+    MAX_RETRIES,
+    READ_TIMEOUT,
+    BaseTransport,
+    Http2Transport,
+    RequestsTransport,
+    use_placeholder_credentials,
+)
+from aws_sso_user_list.user import ShardedScanWarning
 from aws_sso_user_list.utils import (
+    SORT_KEYS,
+    SORT_MEMORY_LIMIT,
     UserWithMfaDevice,
     fetch_all_user_with_mfa_device,
+    fetch_all_user_with_mfa_device_bounded,
+    iter_all_user_with_mfa_device,
+    sort_users,
 )
+from aws_sso_user_list.watch import Watcher
 
 if typing.TYPE_CHECKING:
     from _typeshed import SupportsWrite
 
 
-class Format(Enum):
-    CSV = "csv"
-    JSON = "json"
+class DefaultCommandGroup(click.Group):
+    def __init__(
+        self, *args: typing.Any, default_command: str, **kwargs: typing.Any
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.default_command = default_command
 
+    def parse_args(self, ctx: click.Context, args: list[str]) -> list[str]:
+        if not args or (
+            args[0] not in self.commands
+            and args[0] not in ctx.help_option_names
+        ):
+            args = [self.default_command, *args]
+        return super().parse_args(ctx, args)
 
-class BaseUserExporter:
-    def __init__(self, users: list[UserWithMfaDevice]) -> None:
-        self.users = users
 
-    def export(self, output: "SupportsWrite") -> None:
-        raise NotImplementedError()
+def make_transport(
+    http2: bool,
+    connect_timeout: float,
+    read_timeout: float,
+    hedge_percentile: float | None,
+    max_workers: int,
+    max_retries: int = MAX_RETRIES,
+    retry_backoff: float = BACKOFF,
+    max_retry_backoff: float = MAX_BACKOFF,
+    record_file: str | None = None,
+    replay_file: str | None = None,
+    replay_timing: str = "fast",
+) -> BaseTransport:
+    if record_file is not None and replay_file is not None:
+        raise click.UsageError(
+            "--record-file and --replay-file are mutually exclusive"
+        )
+    hedge = (
+        Hedge(hedge_percentile, max_workers=max_workers)
+        if hedge_percentile is not None
+        else None
+    )
+    if replay_file is not None:
+        use_placeholder_credentials("replay")
+        return ReplayTransport(
+            replay_file,
+            original_timing=replay_timing == "original",
+            hedge=hedge,
+            max_retries=max_retries,
+            backoff=retry_backoff,
+            max_backoff=max_retry_backoff,
+        )
+
+    transport_class = partial(
+        Http2Transport if http2 else RequestsTransport,
+        connect_timeout=connect_timeout,
+        read_timeout=read_timeout,
+        max_retries=max_retries,
+        backoff=retry_backoff,
+        max_backoff=max_retry_backoff,
+    )
+    if record_file is None:
+        return transport_class(hedge=hedge)
+    return RecordingTransport(record_file, transport_class(), hedge=hedge)
 
 
-class UserCsvExporter(BaseUserExporter):
-    def export(self, output: "SupportsWrite") -> None:
-        field_maps = [
-            ("Active", lambda user: str(user.active)),
-            ("UserId", lambda user: user.user_id),
-            ("UserName", lambda user: user.user_name),
-            ("DisplayName", lambda user: user.display_name),
-            ("Email", lambda user: user.email),
-            (
-                "EmailVerificationStatus",
-                lambda user: user.email_verification_status,
-            ),
-            ("MfaDeviceCount", lambda user: str(len(user.mfa_devices))),
-            ("CreatedAt", lambda user: user.created_at.isoformat()),
-            ("UpdatedAt", lambda user: user.updated_at.isoformat()),
-        ]
+def read_lines(file: typing.TextIO) -> list[str]:
+    return [
+        line
+        for line in (line.strip() for line in file)
+        if line and not line.startswith("#")
+    ]
 
-        writer = csv.DictWriter(
-            output, fieldnames=[fieldname for fieldname, _ in field_maps]
-        )
 
-        writer.writeheader()
+class FoundUsers:
+    def __init__(self, users: typing.Iterable[UserWithMfaDevice]) -> None:
+        self.users = users
+        self.user_ids: set[str] = set()
+        self.user_names: set[str] = set()
+
+    def __iter__(self) -> typing.Iterator[UserWithMfaDevice]:
         for user in self.users:
-            row = {field: converter(user) for field, converter in field_maps}
-            writer.writerow(row)
+            self.user_ids.add(user.user_id)
+            self.user_names.add(user.user_name.casefold())
+            yield user
 
+    def missing(self, user_ids: list[str], user_names: list[str]) -> list[str]:
+        return [
+            user_id for user_id in user_ids if user_id not in self.user_ids
+        ] + [
+            user_name
+            for user_name in user_names
+            if user_name.casefold() not in self.user_names
+        ]
 
-class UserJsonExporter(BaseUserExporter):
-    def export(self, output: "SupportsWrite") -> None:
-        data = {"Users": [asdict(user) for user in self.users]}
 
-        def json_default(obj: typing.Any) -> typing.Any:
-            if isinstance(obj, datetime):
-                return obj.isoformat()
-            else:
-                return str(obj)
-
-        json.dump(
-            data,
-            output,
-            indent=2,
-            default=json_default,
-            ensure_ascii=False,
-        )
+def output_path(output: "SupportsWrite") -> str | None:
+    name = getattr(output, "name", None)
+    # Standard streams are named like "<stdout>"
+    if not isinstance(name, str) or name.startswith("<"):
+        return None
+    return name
+
+
+def export_users(
+    users: typing.Iterable[UserWithMfaDevice],
+    exporter_class: typing.Callable[..., BaseUserExporter],
+    output: "SupportsWrite",
+) -> None:
+    exporter = exporter_class(users)
+    with tracing.span("export", exporter=type(exporter).__name__):
+        exporter.export(output)
+
+
+F = typing.TypeVar("F", bound=typing.Callable[..., typing.Any])
+
+TRANSPORT_OPTIONS = (
+    click.option(
+        "--http2",
+        is_flag=True,
+        help="Multiplex requests over one HTTP/2 connection per host",
+    ),
+    click.option(
+        "--max-workers",
+        type=click.IntRange(min=1),
+        default=1,
+        help=(
+            "Number of MFA device batches or user shards fetched concurrently"
+        ),
+    ),
+    click.option(
+        "--sharded-scan",
+        is_flag=True,
+        help="Page through users in parallel shards split by user name prefix",
+    ),
+    click.option(
+        "--connect-timeout",
+        type=click.FloatRange(min=0, min_open=True),
+        default=CONNECT_TIMEOUT,
+        show_default=True,
+        help="Seconds to wait for a connection to an API endpoint",
+    ),
+    click.option(
+        "--read-timeout",
+        type=click.FloatRange(min=0, min_open=True),
+        default=READ_TIMEOUT,
+        show_default=True,
+        help="Seconds to wait for an API response",
+    ),
+    click.option(
+        "--max-retries",
+        type=click.IntRange(min=0),
+        default=MAX_RETRIES,
+        show_default=True,
+        help="Times to retry a throttled, 5xx or timed out request",
+    ),
+    click.option(
+        "--retry-backoff",
+        type=click.FloatRange(min=0),
+        default=BACKOFF,
+        show_default=True,
+        help=(
+            "Seconds of backoff before the first retry, "
+            "doubled for each retry"
+        ),
+    ),
+    click.option(
+        "--max-retry-backoff",
+        type=click.FloatRange(min=0),
+        default=MAX_BACKOFF,
+        show_default=True,
+        help="Upper bound of the backoff before a retry, in seconds",
+    ),
+)
+
+
+def transport_options(function: F) -> F:
+    for option in reversed(TRANSPORT_OPTIONS):
+        function = option(function)
+    return function
+
+
+def show_warning(
+    message: Warning | str,
+    category: type[Warning],
+    filename: str,
+    lineno: int,
+    file: typing.TextIO | None = None,
+    line: str | None = None,
+) -> None:
+    click.echo(f"Warning: {message}", err=True)
+
+
+@click.group(cls=DefaultCommandGroup, default_command="export")
+def main() -> None:
+    # serve and watch fall back on every refresh, not only on the first
+    warnings.simplefilter("always", ShardedScanWarning)
+    warnings.showwarning = show_warning
 
 
-@click.command()
+@main.command()
 @click.option(
     "--identity-store-id",
     help="Identity store ID (e.g. d-0123456789)",
@@ -90,30 +268,703 @@ class UserJsonExporter(BaseUserExporter):
 )
 @click.option(
     "--format",
+    "formats",
     type=click.Choice(
         choices=[format_.value for format_ in Format],
         case_sensitive=False,
     ),
-    default=Format.JSON.name,
+    multiple=True,
+    default=[Format.JSON.value],
+    help="Export format (repeat with --output to write several formats)",
 )
 @click.option(
     "--output",
+    "outputs",
     type=click.File(mode="w", encoding="utf-8"),
-    default="-",
+    multiple=True,
+    default=["-"],
+    help="Output file for the --format in the same position",
+)
+@click.option(
+    "--parts",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help=(
+        "Split each export into this many part files written in parallel, "
+        "plus a manifest"
+    ),
 )
-def main(
+@click.option(
+    "--split-by",
+    type=click.Choice(SPLIT_BY),
+    default="hash",
+    show_default=True,
+    help="Assign users to parts by user ID hash or in turn",
+)
+@click.option(
+    "--columnar",
+    is_flag=True,
+    help="Hold fetched users in a compact columnar table",
+)
+@click.option(
+    "--memory-limit",
+    type=click.IntRange(min=1),
+    help=(
+        "Spill fetched users to temporary files beyond this many MiB "
+        "(users are exported in user ID order)"
+    ),
+)
+@click.option(
+    "--sort-by",
+    type=click.Choice(list(SORT_KEYS)),
+    help=(
+        "Export users in this order (spilled to temporary files beyond "
+        "--memory-limit, or 64 MiB)"
+    ),
+)
+@click.option(
+    "--user-ids-file",
+    type=click.File(mode="r", encoding="utf-8"),
+    help="Export only the users with the IDs in this file, one per line",
+)
+@click.option(
+    "--user-names-file",
+    type=click.File(mode="r", encoding="utf-8"),
+    help="Export only the users with the user names in this file",
+)
+@transport_options
+@click.option(
+    "--hedge-percentile",
+    type=click.FloatRange(min=0, max=100),
+    help=(
+        "Send a duplicate MFA device batch request when the first has not "
+        "answered within this latency percentile"
+    ),
+)
+@click.option(
+    "--metrics-file",
+    type=click.Path(dir_okay=False, writable=True),
+    help="Write Prometheus text format metrics to this file",
+)
+@click.option(
+    "--trace-file",
+    type=click.Path(dir_okay=False, writable=True),
+    help="Write tracing spans to this file in Chrome trace JSON format",
+)
+@click.option(
+    "--otlp-endpoint",
+    help="Send tracing spans to this OTLP/HTTP collector "
+    "(e.g. http://localhost:4318)",
+)
+@click.option(
+    "--progress",
+    "progress_format",
+    type=click.Choice(PROGRESS_FORMATS),
+    help=(
+        "Report pages, users, MFA batches, request rate and ETA on stderr, "
+        "as a status line or as JSON Lines for CI logs"
+    ),
+)
+@click.option(
+    "--progress-interval",
+    type=click.FloatRange(min=0.1),
+    default=PROGRESS_INTERVAL,
+    show_default=True,
+    help="Seconds between --progress updates",
+)
+@click.option(
+    "--memory-stats",
+    is_flag=True,
+    help=(
+        "Trace allocations and report peak and retained memory per stage "
+        "with the top allocating call sites on stderr"
+    ),
+)
+@click.option(
+    "--stale-days",
+    type=click.IntRange(min=0),
+    default=90,
+    show_default=True,
+    help="Count users not updated for this many days as stale in summary",
+)
+@click.option(
+    "--with-groups",
+    is_flag=True,
+    help="Add the names of the groups each user is a member of",
+)
+@click.option(
+    "--with-account-assignments",
+    is_flag=True,
+    help="Add the accounts and permission sets assigned to each user",
+)
+@click.option(
+    "--instance-arn",
+    help=(
+        "IAM Identity Center instance ARN for --with-account-assignments "
+        "(e.g. arn:aws:sso:::instance/ssoins-0123456789abcdef)"
+    ),
+)
+@click.option(
+    "--tolerant",
+    is_flag=True,
+    help=(
+        "Retry failed MFA device batches at the end and export users whose "
+        "MFA devices still cannot be fetched as unknown "
+        f"(exits with status {PARTIAL_FAILURE_EXIT_CODE})"
+    ),
+)
+@click.option(
+    "--failure-report",
+    type=click.Path(dir_okay=False, writable=True),
+    help="Write the --tolerant failure report to this file instead of stderr",
+)
+@click.option(
+    "--record-file",
+    type=click.Path(dir_okay=False, writable=True),
+    help="Record API requests and responses to this file",
+)
+@click.option(
+    "--replay-file",
+    type=click.Path(exists=True, dir_okay=False),
+    help="Serve API responses from a recording instead of AWS",
+)
+@click.option(
+    "--replay-timing",
+    type=click.Choice(["fast", "original"]),
+    default="fast",
+    show_default=True,
+    help="Replay responses as fast as possible or with recorded latency",
+)
+def export(
     identity_store_id: str,
     region: str,
-    format: str,
+    formats: tuple[str, ...],
+    outputs: tuple["SupportsWrite", ...],
+    parts: int,
+    split_by: str,
+    columnar: bool,
+    memory_limit: int | None,
+    sort_by: str | None,
+    user_ids_file: typing.TextIO | None,
+    user_names_file: typing.TextIO | None,
+    http2: bool,
+    max_workers: int,
+    sharded_scan: bool,
+    connect_timeout: float,
+    read_timeout: float,
+    max_retries: int,
+    retry_backoff: float,
+    max_retry_backoff: float,
+    hedge_percentile: float | None,
+    metrics_file: str | None,
+    trace_file: str | None,
+    otlp_endpoint: str | None,
+    progress_format: str | None,
+    progress_interval: float,
+    memory_stats: bool,
+    stale_days: int,
+    with_groups: bool,
+    with_account_assignments: bool,
+    instance_arn: str | None,
+    tolerant: bool,
+    failure_report: str | None,
+    record_file: str | None,
+    replay_file: str | None,
+    replay_timing: str,
+) -> None:
+    if len(formats) != len(outputs):
+        raise click.UsageError("Each --format needs its own --output")
+    if parts > 1 and not all(output_path(output) for output in outputs):
+        raise click.UsageError("--parts needs a file --output")
+    if columnar and memory_limit is not None:
+        raise click.UsageError(
+            "--columnar and --memory-limit are mutually exclusive"
+        )
+    summary_only = {Format(format_) for format_ in formats} == {Format.SUMMARY}
+    if not with_account_assignments:
+        instance_arn = None
+    elif instance_arn is None:
+        raise click.UsageError(
+            "--instance-arn is required with --with-account-assignments"
+        )
+    transport = make_transport(
+        http2=http2,
+        connect_timeout=connect_timeout,
+        read_timeout=read_timeout,
+        max_retries=max_retries,
+        retry_backoff=retry_backoff,
+        max_retry_backoff=max_retry_backoff,
+        hedge_percentile=hedge_percentile,
+        max_workers=max_workers,
+        record_file=record_file,
+        replay_file=replay_file,
+        replay_timing=replay_timing,
+    )
+    failures = FailureReport() if tolerant else None
+    user_ids = read_lines(user_ids_file) if user_ids_file else None
+    user_names = read_lines(user_names_file) if user_names_file else None
+    found_users: FoundUsers | None = None
+    sorted_ = sort_by is not None and not summary_only
+    fetch_memory_limit = sort_memory_limit = SORT_MEMORY_LIMIT
+    if memory_limit is not None:
+        # One budget is shared by the fetch and the sort, which overlap
+        fetch_memory_limit = memory_limit * 1024 * 1024 // (1 + sorted_)
+        sort_memory_limit = fetch_memory_limit
+    with (
+        metrics.collect(metrics_file),
+        tracing.collect(trace_file, otlp_endpoint),
+        memory.collect(memory_stats) as stats,
+        progress.collect(progress_format, progress_interval),
+        transport,
+    ):
+        users: typing.Iterable[UserWithMfaDevice]
+        if memory_limit is not None:
+            users = fetch_all_user_with_mfa_device_bounded(
+                identity_store_id=identity_store_id,
+                region=region,
+                memory_limit=fetch_memory_limit,
+                transport=transport,
+                max_workers=max_workers,
+                sharded=sharded_scan,
+                failures=failures,
+                user_ids=user_ids,
+                user_names=user_names,
+                with_groups=with_groups,
+                instance_arn=instance_arn,
+            )
+        elif summary_only:
+            users = iter_all_user_with_mfa_device(
+                identity_store_id=identity_store_id,
+                region=region,
+                transport=transport,
+                max_workers=max_workers,
+                sharded=sharded_scan,
+                failures=failures,
+                user_ids=user_ids,
+                user_names=user_names,
+            )
+        elif columnar or sorted_:
+            # The table or the sort runs are filled as users arrive, so the
+            # whole directory is never held as a fetched list
+            users = iter_all_user_with_mfa_device(
+                identity_store_id=identity_store_id,
+                region=region,
+                transport=transport,
+                max_workers=max_workers,
+                sharded=sharded_scan,
+                failures=failures,
+                user_ids=user_ids,
+                user_names=user_names,
+                with_groups=with_groups,
+                instance_arn=instance_arn,
+            )
+        else:
+            users = fetch_all_user_with_mfa_device(
+                identity_store_id=identity_store_id,
+                region=region,
+                transport=transport,
+                max_workers=max_workers,
+                sharded=sharded_scan,
+                failures=failures,
+                user_ids=user_ids,
+                user_names=user_names,
+                with_groups=with_groups,
+                instance_arn=instance_arn,
+            )
+        if user_ids is not None or user_names is not None:
+            users = found_users = FoundUsers(users)
+        if sort_by is not None and not summary_only:
+            users = sort_users(
+                users, sort_by=sort_by, memory_limit=sort_memory_limit
+            )
+        if columnar:
+            with metrics.stage("columnar"):
+                users = UserTable.from_users(users)
+        exporter_classes: dict[
+            Format, typing.Callable[..., BaseUserExporter]
+        ] = {
+            Format.CSV: partial(
+                UserCsvExporter,
+                with_groups=with_groups,
+                with_account_assignments=instance_arn is not None,
+            ),
+            Format.CSV_DEVICES: partial(
+                UserMfaDeviceCsvExporter,
+                with_groups=with_groups,
+                with_account_assignments=instance_arn is not None,
+            ),
+            Format.JSON: UserJsonExporter,
+            Format.SUMMARY: partial(
+                UserSummaryExporter,
+                stale_days=stale_days,
+            ),
+            Format.XLSX: partial(
+                UserXlsxExporter,
+                with_groups=with_groups,
+                with_account_assignments=instance_arn is not None,
+            ),
+        }
+        exports = [
+            (
+                partial(
+                    export_users,
+                    exporter_class=exporter_classes[Format(format_)],
+                    output=output,
+                )
+                if parts == 1 or Format(format_) is Format.SUMMARY
+                else partial(
+                    write_parts,
+                    export=partial(
+                        export_users,
+                        exporter_class=exporter_classes[Format(format_)],
+                    ),
+                    path=typing.cast(str, output_path(output)),
+                    parts=parts,
+                    split_by=split_by,
+                    format_=format_,
+                )
+            )
+            for format_, output in zip(formats, outputs)
+        ]
+
+        with metrics.stage("export"):
+            if len(exports) == 1:
+                exports[0](users)
+            elif isinstance(users, UserTable):
+                # A table can be read again by each exporter
+                for export_ in exports:
+                    export_(users)
+            else:
+                # One fetch feeds every exporter at the same time
+                fan_out(users, exports)
+
+        if stats is not None:
+            click.echo(stats.render(), err=True)
+
+    if found_users is not None:
+        missing = found_users.missing(user_ids or [], user_names or [])
+        if missing:
+            click.echo(
+                f"{len(missing)} requested users were not found: "
+                + ", ".join(missing),
+                err=True,
+            )
+
+    if failures:
+        if failure_report is not None:
+            with open(failure_report, "w", encoding="utf-8") as file:
+                file.write(failures.dumps())
+        else:
+            click.echo(failures.dumps(), err=True)
+        click.echo(
+            f"MFA devices of {len(failures.unknown_user_ids)} users "
+            "could not be fetched",
+            err=True,
+        )
+        raise click.exceptions.Exit(PARTIAL_FAILURE_EXIT_CODE)
+
+
+@main.command()
+@click.argument("old", type=click.File(mode="r", encoding="utf-8"))
+@click.argument(
+    "new",
+    type=click.File(mode="r", encoding="utf-8"),
+    required=False,
+)
+@click.option(
+    "--identity-store-id",
+    help="Identity store ID to fetch when NEW is omitted",
+)
+@click.option(
+    "--region",
+    help="region name to fetch when NEW is omitted",
+)
+@click.option(
+    "--output",
+    type=click.File(mode="w", encoding="utf-8"),
+    default="-",
+)
+def diff(
+    old: typing.TextIO,
+    new: typing.TextIO | None,
+    identity_store_id: str | None,
+    region: str | None,
     output: "SupportsWrite",
 ) -> None:
-    users = fetch_all_user_with_mfa_device(
-        identity_store_id=identity_store_id,
-        region=region,
+    old_users = load_users(old)
+    if new is not None:
+        new_users = load_users(new)
+    elif identity_store_id and region:
+        new_users = fetch_all_user_with_mfa_device(
+            identity_store_id=identity_store_id,
+            region=region,
+        )
+    else:
+        raise click.UsageError(
+            "NEW or both --identity-store-id and --region are required"
+        )
+
+    UserDiffJsonExporter(diff_users(old_users, new_users)).export(output)
+
+
+@main.command()
+@click.option(
+    "--identity-store-id",
+    help="Identity store ID (e.g. d-0123456789)",
+    prompt=True,
+    required=True,
+)
+@click.option(
+    "--region",
+    help="region name (e.g. us-east-1)",
+    prompt=True,
+    required=True,
+)
+@click.option(
+    "--host",
+    default="127.0.0.1",
+    show_default=True,
+)
+@click.option(
+    "--port",
+    type=click.IntRange(min=0, max=65535),
+    default=8080,
+    show_default=True,
+)
+@click.option(
+    "--refresh-interval",
+    type=click.FloatRange(min=1),
+    default=900,
+    show_default=True,
+    help="Seconds between background refreshes",
+)
+@transport_options
+@click.option(
+    "--hedge-percentile",
+    type=click.FloatRange(min=0, max=100),
+    help=(
+        "Send a duplicate MFA device batch request when the first has not "
+        "answered within this latency percentile"
+    ),
+)
+def serve(
+    identity_store_id: str,
+    region: str,
+    host: str,
+    port: int,
+    refresh_interval: float,
+    http2: bool,
+    max_workers: int,
+    sharded_scan: bool,
+    connect_timeout: float,
+    read_timeout: float,
+    max_retries: int,
+    retry_backoff: float,
+    max_retry_backoff: float,
+    hedge_percentile: float | None,
+) -> None:
+    transport = make_transport(
+        http2=http2,
+        connect_timeout=connect_timeout,
+        read_timeout=read_timeout,
+        max_retries=max_retries,
+        retry_backoff=retry_backoff,
+        max_retry_backoff=max_retry_backoff,
+        hedge_percentile=hedge_percentile,
+        max_workers=max_workers,
     )
-    exporter: BaseUserExporter = {
-        Format.CSV: UserCsvExporter,
-        Format.JSON: UserJsonExporter,
-    }[Format(format)](users)
 
-    exporter.export(output)
+    def fetch_user(user_id: str) -> UserWithMfaDevice | None:
+        users = fetch_all_user_with_mfa_device(
+            identity_store_id=identity_store_id,
+            region=region,
+            transport=transport,
+            user_ids=[user_id],
+        )
+        return users[0] if users else None
+
+    with transport:
+        cache = UserCache(
+            fetch=lambda: fetch_all_user_with_mfa_device(
+                identity_store_id=identity_store_id,
+                region=region,
+                transport=transport,
+                max_workers=max_workers,
+                sharded=sharded_scan,
+            ),
+            refresh_interval=refresh_interval,
+            fetch_user=fetch_user,
+        )
+        cache.refresh()
+        cache.start()
+
+        server = UserServer((host, port), cache)
+        click.echo(
+            f"Serving {len(cache.index or ())} users on "
+            f"http://{host}:{server.server_port}/",
+            err=True,
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            cache.stop()
+
+
+@main.command(
+    help=(
+        "Poll the identity store and write user, activation, email "
+        "verification and MFA device changes as NDJSON events"
+    )
+)
+@click.option(
+    "--identity-store-id",
+    help="Identity store ID (e.g. d-0123456789)",
+    prompt=True,
+    required=True,
+)
+@click.option(
+    "--region",
+    help="region name (e.g. us-east-1)",
+    prompt=True,
+    required=True,
+)
+@click.option(
+    "--interval",
+    type=click.FloatRange(min=1),
+    default=300,
+    show_default=True,
+    help="Seconds between polls",
+)
+@click.option(
+    "--baseline",
+    type=click.File(mode="r", encoding="utf-8"),
+    help=(
+        "JSON export to compare the first poll against; without it the "
+        "first poll only sets the state"
+    ),
+)
+@click.option(
+    "--output",
+    type=click.File(mode="w", encoding="utf-8"),
+    default="-",
+)
+@transport_options
+def watch(
+    identity_store_id: str,
+    region: str,
+    interval: float,
+    baseline: typing.TextIO | None,
+    output: typing.TextIO,
+    http2: bool,
+    max_workers: int,
+    sharded_scan: bool,
+    connect_timeout: float,
+    read_timeout: float,
+    max_retries: int,
+    retry_backoff: float,
+    max_retry_backoff: float,
+) -> None:
+    transport = make_transport(
+        http2=http2,
+        connect_timeout=connect_timeout,
+        read_timeout=read_timeout,
+        max_retries=max_retries,
+        retry_backoff=retry_backoff,
+        max_retry_backoff=max_retry_backoff,
+        hedge_percentile=None,
+        max_workers=max_workers,
+    )
+    with transport:
+        watcher = Watcher(
+            # Users whose MFA devices fail are compared on a later poll
+            fetch=lambda: fetch_all_user_with_mfa_device(
+                identity_store_id=identity_store_id,
+                region=region,
+                transport=transport,
+                max_workers=max_workers,
+                sharded=sharded_scan,
+                failures=FailureReport(),
+            ),
+            output=output,
+            users=load_users(baseline) if baseline is not None else None,
+        )
+        try:
+            watcher.run(interval, threading.Event())
+        except KeyboardInterrupt:
+            pass
+
+
+@main.command(
+    help=(
+        "Measure fetch throughput, p99 request latency and peak memory "
+        "against a local stub of the AWS APIs"
+    )
+)
+@click.option(
+    "--users",
+    "user_counts",
+    type=click.IntRange(min=1),
+    multiple=True,
+    default=[1000],
+    show_default=True,
+    help="Number of users in the stub directory; repeat to sweep",
+)
+@click.option(
+    "--batch-size",
+    "batch_sizes",
+    type=click.IntRange(min=1),
+    multiple=True,
+    default=[MFA_BATCH_SIZE],
+    show_default=True,
+    help="Users per MFA device batch request; repeat to sweep",
+)
+@click.option(
+    "--max-workers",
+    "max_workers_options",
+    type=click.IntRange(min=1),
+    multiple=True,
+    default=[1, 4, 16],
+    show_default=True,
+    help="Concurrent requests; repeat to sweep",
+)
+@click.option(
+    "--latency",
+    type=click.FloatRange(min=0),
+    default=DEFAULT_LATENCY,
+    show_default=True,
+    help="Seconds the stub waits before each response",
+)
+@click.option(
+    "--throttle-rate",
+    type=click.FloatRange(min=0, max=1),
+    default=0.0,
+    show_default=True,
+    help="Fraction of requests the stub answers with ThrottlingException",
+)
+@click.option(
+    "--output",
+    type=click.File(mode="w", encoding="utf-8"),
+    default="-",
+)
+def loadtest(
+    user_counts: tuple[int, ...],
+    batch_sizes: tuple[int, ...],
+    max_workers_options: tuple[int, ...],
+    latency: float,
+    throttle_rate: float,
+    output: typing.TextIO,
+) -> None:
+    write_results(
+        sweep(
+            user_counts=user_counts,
+            batch_sizes=batch_sizes,
+            max_workers_options=max_workers_options,
+            latency=latency,
+            throttle_rate=throttle_rate,
+        ),
+        output,
+    )
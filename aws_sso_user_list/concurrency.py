@@ -0,0 +1,25 @@
+import typing
+from collections import deque
+from concurrent.futures import Executor, Future
+
+from aws_sso_user_list import tracing
+
+T = typing.TypeVar("T")
+R = typing.TypeVar("R")
+
+
+def bounded_map(
+    executor: Executor,
+    function: typing.Callable[[T], R],
+    items: typing.Iterable[T],
+    max_pending: int,
+) -> typing.Iterator[tuple[T, "Future[R]"]]:
+    # Up to max_pending calls run ahead of the caller, which gets them back
+    # in item order
+    futures: deque[tuple[T, Future[R]]] = deque()
+    for item in items:
+        futures.append((item, executor.submit(tracing.wrap(function), item)))
+        if len(futures) >= max_pending:
+            yield futures.popleft()
+    while futures:
+        yield futures.popleft()
@@ -0,0 +1,95 @@
+import json
+import typing
+from dataclasses import dataclass, field
+
+from aws_sso_user_list.mfa_device import MfaDevice
+from aws_sso_user_list.utils import UserWithMfaDevice
+
+if typing.TYPE_CHECKING:
+    from _typeshed import SupportsRead
+
+COMPARED_FIELDS = (
+    "active",
+    "user_name",
+    "display_name",
+    "email",
+    "email_verification_status",
+)
+
+
+@dataclass
+class UserChange:
+    user_id: str
+    user_name: str
+    changes: dict[str, tuple[typing.Any, typing.Any]]
+    added_mfa_devices: list[MfaDevice]
+    removed_mfa_devices: list[MfaDevice]
+
+    @classmethod
+    def from_users(
+        cls, old: UserWithMfaDevice, new: UserWithMfaDevice
+    ) -> "UserChange | None":
+        assert old.user_id == new.user_id
+        changes = {
+            name: (getattr(old, name), getattr(new, name))
+            for name in COMPARED_FIELDS
+            if getattr(old, name) != getattr(new, name)
+        }
+        old_devices = {
+            device.device_id: device for device in old.mfa_devices or []
+        }
+        new_devices = {
+            device.device_id: device for device in new.mfa_devices or []
+        }
+        if old.mfa_devices is None or new.mfa_devices is None:
+            # Devices cannot be compared when either side is unknown
+            old_devices = new_devices = {}
+        added_mfa_devices = [
+            device
+            for device_id, device in new_devices.items()
+            if device_id not in old_devices
+        ]
+        removed_mfa_devices = [
+            device
+            for device_id, device in old_devices.items()
+            if device_id not in new_devices
+        ]
+        if not (changes or added_mfa_devices or removed_mfa_devices):
+            return None
+        return cls(
+            user_id=new.user_id,
+            user_name=new.user_name,
+            changes=changes,
+            added_mfa_devices=added_mfa_devices,
+            removed_mfa_devices=removed_mfa_devices,
+        )
+
+
+@dataclass
+class UserDiff:
+    added: list[UserWithMfaDevice] = field(default_factory=list)
+    removed: list[UserWithMfaDevice] = field(default_factory=list)
+    changed: list[UserChange] = field(default_factory=list)
+
+
+def load_users(input: "SupportsRead[str]") -> list[UserWithMfaDevice]:
+    data = json.load(input)
+    return [UserWithMfaDevice.from_dict(user) for user in data["Users"]]
+
+
+def diff_users(
+    old_users: typing.Iterable[UserWithMfaDevice],
+    new_users: typing.Iterable[UserWithMfaDevice],
+) -> UserDiff:
+    old_user_map = {user.user_id: user for user in old_users}
+
+    user_diff = UserDiff()
+    for new_user in new_users:
+        old_user = old_user_map.pop(new_user.user_id, None)
+        if old_user is None:
+            user_diff.added.append(new_user)
+        elif change := UserChange.from_users(old=old_user, new=new_user):
+            user_diff.changed.append(change)
+    user_diff.removed = list(old_user_map.values())
+
+    return user_diff
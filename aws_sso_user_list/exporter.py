@@ -0,0 +1,302 @@
+import csv
+import json
+import typing
+from dataclasses import asdict
+from datetime import datetime
+from enum import Enum
+
+from aws_sso_user_list.assignment import AccountAssignment
+from aws_sso_user_list.diff import UserDiff
+from aws_sso_user_list.summary import UserSummary
+from aws_sso_user_list.table import UserTable, from_epoch_microseconds
+from aws_sso_user_list.utils import UserWithMfaDevice
+from aws_sso_user_list.xlsx import XlsxWriter
+
+if typing.TYPE_CHECKING:
+    from _typeshed import SupportsWrite
+
+
+class Format(Enum):
+    CSV = "csv"
+    CSV_DEVICES = "csv-devices"
+    JSON = "json"
+    SUMMARY = "summary"
+    XLSX = "xlsx"
+
+
+def json_default(obj: typing.Any) -> typing.Any:
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    else:
+        return str(obj)
+
+
+UNKNOWN_MFA_TYPE = "UNKNOWN"
+GROUP_SEPARATOR = ";"
+
+
+def mfa_device_count(user: UserWithMfaDevice) -> int | None:
+    # Left blank when the MFA devices of the user could not be fetched
+    if user.mfa_devices is None:
+        return None
+    return len(user.mfa_devices)
+
+
+def format_groups(groups: list[str] | None) -> str:
+    return GROUP_SEPARATOR.join(groups or ())
+
+
+def format_account_assignments(
+    account_assignments: list[AccountAssignment] | None,
+) -> str:
+    assignments = dict.fromkeys(
+        f"{assignment.account_id}:{assignment.permission_set_name}"
+        for assignment in account_assignments or ()
+    )
+    return GROUP_SEPARATOR.join(assignments)
+
+
+def join_groups(user: UserWithMfaDevice) -> str:
+    return format_groups(user.groups)
+
+
+def join_account_assignments(user: UserWithMfaDevice) -> str:
+    return format_account_assignments(user.account_assignments)
+
+
+class BaseUserExporter:
+    def __init__(
+        self,
+        users: typing.Iterable[UserWithMfaDevice],
+        with_groups: bool = False,
+        with_account_assignments: bool = False,
+    ) -> None:
+        self.users = users
+        self.with_groups = with_groups
+        self.with_account_assignments = with_account_assignments
+
+    def table_columns(
+        self,
+        table: UserTable,
+        timestamp: typing.Callable[[datetime], typing.Any],
+    ) -> list[typing.Iterable]:
+        # Read straight from the columns, without building a user per row
+        columns: list[typing.Iterable] = [
+            map(bool, table.active),
+            table.user_ids,
+            table.user_names,
+            table.display_names,
+            table.emails,
+            table.email_verification_status_column(),
+            table.mfa_device_count_column(),
+            (timestamp(from_epoch_microseconds(v)) for v in table.created_at),
+            (timestamp(from_epoch_microseconds(v)) for v in table.updated_at),
+        ]
+        if self.with_groups:
+            columns.append(map(format_groups, table.groups))
+        if self.with_account_assignments:
+            columns.append(
+                map(format_account_assignments, table.account_assignments)
+            )
+        return columns
+
+    def export(self, output: "SupportsWrite") -> None:
+        raise NotImplementedError()
+
+
+class UserCsvExporter(BaseUserExporter):
+    fieldnames: tuple[str, ...] = (
+        "Active",
+        "UserId",
+        "UserName",
+        "DisplayName",
+        "Email",
+        "EmailVerificationStatus",
+        "MfaDeviceCount",
+        "CreatedAt",
+        "UpdatedAt",
+    )
+
+    @staticmethod
+    def row(user: UserWithMfaDevice) -> tuple:
+        return (
+            user.active,
+            user.user_id,
+            user.user_name,
+            user.display_name,
+            user.email,
+            user.email_verification_status,
+            mfa_device_count(user),
+            user.created_at.isoformat(),
+            user.updated_at.isoformat(),
+        )
+
+    def extra_columns(
+        self,
+    ) -> list[tuple[str, typing.Callable[[UserWithMfaDevice], str]]]:
+        columns: list[tuple[str, typing.Callable[[UserWithMfaDevice], str]]]
+        columns = []
+        if self.with_groups:
+            columns.append(("Groups", join_groups))
+        if self.with_account_assignments:
+            columns.append(("AccountAssignments", join_account_assignments))
+        return columns
+
+    def rows(self) -> typing.Iterator[tuple]:
+        if isinstance(self.users, UserTable):
+            return zip(*self.table_columns(self.users, datetime.isoformat))
+        converters = [converter for _, converter in self.extra_columns()]
+        if not converters:
+            return map(self.row, self.users)
+        return (
+            self.row(user) + tuple(converter(user) for converter in converters)
+            for user in self.users
+        )
+
+    def export(self, output: "SupportsWrite") -> None:
+        writer = csv.writer(output)
+        writer.writerow(
+            self.fieldnames + tuple(name for name, _ in self.extra_columns())
+        )
+        writer.writerows(self.rows())
+
+
+class UserMfaDeviceCsvExporter(UserCsvExporter):
+    fieldnames = (
+        "Active",
+        "UserId",
+        "UserName",
+        "Email",
+        "DeviceId",
+        "DeviceName",
+        "MfaType",
+        "RegisteredDate",
+    )
+
+    def rows(self) -> typing.Iterator[tuple]:
+        converters = [converter for _, converter in self.extra_columns()]
+        for user in self.users:
+            user_row = (user.active, user.user_id, user.user_name, user.email)
+            extra = tuple(converter(user) for converter in converters)
+            if user.mfa_devices is None:
+                yield user_row + ("", "", UNKNOWN_MFA_TYPE, "") + extra
+                continue
+            if not user.mfa_devices:
+                yield user_row + ("", "", "", "") + extra
+            for mfa_device in user.mfa_devices:
+                yield user_row + (
+                    mfa_device.device_id,
+                    mfa_device.device_name,
+                    mfa_device.mfa_type,
+                    mfa_device.registered_date.isoformat(),
+                ) + extra
+
+
+class UserJsonExporter(BaseUserExporter):
+    def export(self, output: "SupportsWrite") -> None:
+        output.write('{\n  "Users": [')
+        separator = "\n    "
+        for user in self.users:
+            data = json.dumps(
+                user.to_dict(),
+                indent=2,
+                default=json_default,
+                ensure_ascii=False,
+            )
+            output.write(separator + data.replace("\n", "\n    "))
+            separator = ",\n    "
+        output.write("]\n}" if separator == "\n    " else "\n  ]\n}")
+
+
+class UserXlsxExporter(BaseUserExporter):
+    def export(self, output: "SupportsWrite") -> None:
+        field_maps = [
+            ("Active", lambda user: user.active),
+            ("UserId", lambda user: user.user_id),
+            ("UserName", lambda user: user.user_name),
+            ("DisplayName", lambda user: user.display_name),
+            ("Email", lambda user: user.email),
+            (
+                "EmailVerificationStatus",
+                lambda user: user.email_verification_status,
+            ),
+            ("MfaDeviceCount", mfa_device_count),
+            ("CreatedAt", lambda user: user.created_at),
+            ("UpdatedAt", lambda user: user.updated_at),
+        ]
+        if self.with_groups:
+            field_maps.append(("Groups", join_groups))
+        if self.with_account_assignments:
+            field_maps.append(("AccountAssignments", join_account_assignments))
+
+        # XLSX is a zip archive, so write to the underlying binary stream
+        binary_output = typing.cast(
+            typing.BinaryIO, getattr(output, "buffer", output)
+        )
+        if binary_output is not output:
+            typing.cast(typing.TextIO, output).flush()
+        with XlsxWriter(binary_output, "Users") as writer:
+            writer.writerow(fieldname for fieldname, _ in field_maps)
+            if isinstance(self.users, UserTable):
+                for row in zip(
+                    *self.table_columns(self.users, lambda value: value)
+                ):
+                    writer.writerow(row)
+                return
+            for user in self.users:
+                writer.writerow(converter(user) for _, converter in field_maps)
+
+
+class UserSummaryExporter(BaseUserExporter):
+    def __init__(
+        self,
+        users: typing.Iterable[UserWithMfaDevice],
+        stale_days: int = 90,
+    ) -> None:
+        super().__init__(users)
+        self.stale_days = stale_days
+
+    def export(self, output: "SupportsWrite") -> None:
+        summary = UserSummary.from_stale_days(self.stale_days)
+        if isinstance(self.users, UserTable):
+            summary.extend_table(self.users)
+        else:
+            summary.extend(self.users)
+
+        json.dump(summary.to_dict(), output, indent=2, ensure_ascii=False)
+
+
+class UserDiffJsonExporter:
+    def __init__(self, user_diff: UserDiff) -> None:
+        self.user_diff = user_diff
+
+    def export(self, output: "SupportsWrite") -> None:
+        data = {
+            "Added": [user.to_dict() for user in self.user_diff.added],
+            "Removed": [user.to_dict() for user in self.user_diff.removed],
+            "Changed": [
+                {
+                    "user_id": change.user_id,
+                    "user_name": change.user_name,
+                    "changes": {
+                        name: {"old": old, "new": new}
+                        for name, (old, new) in change.changes.items()
+                    },
+                    "added_mfa_devices": [
+                        asdict(device) for device in change.added_mfa_devices
+                    ],
+                    "removed_mfa_devices": [
+                        asdict(device) for device in change.removed_mfa_devices
+                    ],
+                }
+                for change in self.user_diff.changed
+            ],
+        }
+
+        json.dump(
+            data,
+            output,
+            indent=2,
+            default=json_default,
+            ensure_ascii=False,
+        )
@@ -0,0 +1,41 @@
+import json
+import threading
+import typing
+from dataclasses import asdict, dataclass
+
+PARTIAL_FAILURE_EXIT_CODE = 3
+
+
+@dataclass
+class Failure:
+    target: str
+    user_ids: list[str]
+    error: str
+
+
+class FailureReport:
+    def __init__(self) -> None:
+        self.failures: list[Failure] = []
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.failures)
+
+    def add(self, target: str, user_ids: list[str], error: str) -> None:
+        with self.lock:
+            self.failures.append(
+                Failure(target=target, user_ids=user_ids, error=error)
+            )
+
+    @property
+    def unknown_user_ids(self) -> list[str]:
+        return [user_id for item in self.failures for user_id in item.user_ids]
+
+    def to_dict(self) -> dict[str, typing.Any]:
+        return {
+            "UnknownUsers": len(self.unknown_user_ids),
+            "Failures": [asdict(failure) for failure in self.failures],
+        }
+
+    def dumps(self) -> str:
+        return json.dumps(self.to_dict(), indent=2, ensure_ascii=False)
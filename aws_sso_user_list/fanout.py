@@ -0,0 +1,78 @@
+import queue
+import threading
+import typing
+from concurrent.futures import ThreadPoolExecutor
+
+from aws_sso_user_list import tracing
+
+T = typing.TypeVar("T")
+
+_END = object()
+_ABORT = object()
+
+
+class FanOutAborted(Exception):
+    pass
+
+
+class Channel(typing.Generic[T]):
+    def __init__(self, maxsize: int) -> None:
+        self.queue: queue.Queue[typing.Any] = queue.Queue(maxsize=maxsize)
+        self.closed = threading.Event()
+
+    def __iter__(self) -> typing.Iterator[T]:
+        while (item := self.queue.get()) is not _END:
+            if item is _ABORT:
+                raise FanOutAborted()
+            yield item
+
+    def put(self, item: typing.Any) -> None:
+        # Stop feeding a consumer that has already returned or failed
+        while not self.closed.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def close(self) -> None:
+        self.closed.set()
+
+
+def _consume(
+    consumer: typing.Callable[[typing.Iterable[T]], None],
+    channel: Channel[T],
+) -> None:
+    try:
+        consumer(channel)
+    finally:
+        channel.close()
+
+
+def fan_out(
+    items: typing.Iterable[T],
+    consumers: typing.Sequence[typing.Callable[[typing.Iterable[T]], None]],
+    maxsize: int = 1024,
+) -> None:
+    channels = [Channel[T](maxsize) for _ in consumers]
+    with ThreadPoolExecutor(
+        max_workers=len(consumers), thread_name_prefix="fan-out"
+    ) as executor:
+        futures = [
+            executor.submit(tracing.wrap(_consume), consumer, channel)
+            for consumer, channel in zip(consumers, channels)
+        ]
+        try:
+            for item in items:
+                if all(channel.closed.is_set() for channel in channels):
+                    break
+                for channel in channels:
+                    channel.put(item)
+        except BaseException:
+            for channel in channels:
+                channel.put(_ABORT)
+            raise
+        for channel in channels:
+            channel.put(_END)
+        for future in futures:
+            future.result()
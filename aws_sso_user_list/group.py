@@ -0,0 +1,172 @@
+import threading
+import typing
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from botocore.auth import SigV4Auth
+from botocore.session import Session
+
+from aws_sso_user_list import metrics, tracing
+from aws_sso_user_list.concurrency import bounded_map
+from aws_sso_user_list.lookup import LookupCache
+from aws_sso_user_list.transport import BaseTransport, post_signed
+
+
+@dataclass
+class UserGroups:
+    user_id: str
+    group_names: list[str]
+
+
+class GroupMemberships:
+    # Group IDs listed for the groups are kept until the account
+    # assignments of the same user take them
+    def __init__(self) -> None:
+        self.group_ids: dict[str, list[str]] = {}
+        self.lock = threading.Lock()
+
+    def put(self, user_id: str, group_ids: list[str]) -> None:
+        with self.lock:
+            self.group_ids[user_id] = group_ids
+
+    def pop(self, user_id: str) -> list[str] | None:
+        with self.lock:
+            return self.group_ids.pop(user_id, None)
+
+
+def _post_identity_store(
+    sigv4_auth: SigV4Auth,
+    region: str,
+    target: str,
+    body: dict,
+    transport: BaseTransport | None = None,
+) -> dict:
+    return post_signed(
+        sigv4_auth=sigv4_auth,
+        url=f"https://identitystore.{region}.amazonaws.com/",
+        target=f"AWSIdentityStore.{target}",
+        body=body,
+        transport=transport,
+    )
+
+
+def _fetch_group_memberships(
+    sigv4_auth: SigV4Auth,
+    identity_store_id: str,
+    region: str,
+    user_id: str,
+    next_token: str | None = None,
+    transport: BaseTransport | None = None,
+) -> dict:
+    body: dict[str, typing.Any] = {
+        "IdentityStoreId": identity_store_id,
+        "MemberId": {"UserId": user_id},
+        "MaxResults": 100,
+    }
+    if next_token:
+        body["NextToken"] = next_token
+    return _post_identity_store(
+        sigv4_auth=sigv4_auth,
+        region=region,
+        target="ListGroupMembershipsForMember",
+        body=body,
+        transport=transport,
+    )
+
+
+def _describe_group(
+    sigv4_auth: SigV4Auth,
+    identity_store_id: str,
+    region: str,
+    group_id: str,
+    transport: BaseTransport | None = None,
+) -> dict:
+    return _post_identity_store(
+        sigv4_auth=sigv4_auth,
+        region=region,
+        target="DescribeGroup",
+        body={"IdentityStoreId": identity_store_id, "GroupId": group_id},
+        transport=transport,
+    )
+
+
+def list_group_ids(
+    sigv4_auth: SigV4Auth,
+    identity_store_id: str,
+    region: str,
+    user_id: str,
+    transport: BaseTransport | None = None,
+) -> list[str]:
+    group_ids: list[str] = []
+    next_token = None
+    with tracing.span("_fetch_group_memberships", user_id=user_id):
+        while True:
+            response = _fetch_group_memberships(
+                sigv4_auth=sigv4_auth,
+                identity_store_id=identity_store_id,
+                region=region,
+                user_id=user_id,
+                next_token=next_token,
+                transport=transport,
+            )
+            group_ids.extend(
+                membership["GroupId"]
+                for membership in response["GroupMemberships"]
+            )
+            if not (next_token := response.get("NextToken")):
+                break
+    return group_ids
+
+
+def iter_all_groups(
+    identity_store_id: str,
+    region: str,
+    user_ids: typing.Iterable[str],
+    transport: BaseTransport | None = None,
+    max_workers: int = 1,
+    memberships: GroupMemberships | None = None,
+) -> typing.Iterator[UserGroups]:
+    sigv4_auth = SigV4Auth(
+        credentials=Session().get_credentials(),
+        service_name="identitystore",
+        region_name=region,
+    )
+
+    def describe(group_id: str) -> str:
+        with tracing.span("_describe_group", group_id=group_id):
+            response = _describe_group(
+                sigv4_auth=sigv4_auth,
+                identity_store_id=identity_store_id,
+                region=region,
+                group_id=group_id,
+                transport=transport,
+            )
+        metrics.increment("groups")
+        return response["DisplayName"]
+
+    group_names = LookupCache(describe)
+
+    def fetch(user_id: str) -> UserGroups:
+        group_ids = list_group_ids(
+            sigv4_auth=sigv4_auth,
+            identity_store_id=identity_store_id,
+            region=region,
+            user_id=user_id,
+            transport=transport,
+        )
+        if memberships is not None:
+            memberships.put(user_id, group_ids)
+        return UserGroups(
+            user_id=user_id,
+            group_names=sorted(
+                group_names.get(group_id) for group_id in group_ids
+            ),
+        )
+
+    with (
+        tracing.span("fetch_all_groups", max_workers=max_workers) as span,
+        ThreadPoolExecutor(max_workers=max_workers) as executor,
+    ):
+        for _, future in bounded_map(executor, fetch, user_ids, max_workers):
+            yield future.result()
+        span.set_attribute("groups", len(group_names))
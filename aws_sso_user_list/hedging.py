@@ -0,0 +1,85 @@
+import threading
+import time
+import typing
+from collections import deque
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ThreadPoolExecutor,
+    wait,
+)
+
+from aws_sso_user_list import metrics, tracing
+
+T = typing.TypeVar("T")
+
+
+class Hedge:
+    def __init__(
+        self,
+        percentile: float,
+        max_workers: int = 1,
+        min_samples: int = 10,
+        window: int = 200,
+    ) -> None:
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.latencies: deque[float] = deque(maxlen=window)
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(
+            max_workers=2 * max_workers, thread_name_prefix="hedge"
+        )
+
+    def __enter__(self) -> "Hedge":
+        return self
+
+    def __exit__(self, *args: typing.Any) -> None:
+        self.close()
+
+    def delay(self) -> float | None:
+        with self.lock:
+            if len(self.latencies) < self.min_samples:
+                return None
+            latencies = sorted(self.latencies)
+        index = int(len(latencies) * self.percentile / 100)
+        return latencies[min(index, len(latencies) - 1)]
+
+    def observe(self, seconds: float) -> None:
+        with self.lock:
+            self.latencies.append(seconds)
+
+    def call(
+        self,
+        function: typing.Callable[..., T],
+        *args: typing.Any,
+        succeeded: typing.Callable[[T], bool] | None = None,
+    ) -> T:
+        def primary() -> T:
+            started_at = time.perf_counter()
+            result = function(*args)
+            # Hedged and failed requests would skew the delay
+            if succeeded is None or succeeded(result):
+                self.observe(time.perf_counter() - started_at)
+            return result
+
+        futures: set[Future[T]] = {self.executor.submit(tracing.wrap(primary))}
+        done, _ = wait(futures, timeout=self.delay())
+        if not done:
+            metrics.increment("hedged_requests")
+            futures.add(self.executor.submit(tracing.wrap(function), *args))
+
+        # Use the first successful response, or the last error if both failed
+        pending = futures
+        while True:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            answers = [future for future in done if future.exception() is None]
+            if answers or not pending:
+                future = (answers or list(done))[0]
+                break
+
+        for other in pending:
+            other.cancel()
+        return future.result()
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,15 @@
+import typing
+from dataclasses import fields
+
+
+class LazyRecord:
+    record_class: typing.ClassVar[type]
+
+    def __eq__(self, other: object) -> bool:
+        # Equal to the eager record with the same field values
+        if not isinstance(other, self.record_class):
+            return NotImplemented
+        return all(
+            getattr(self, field.name) == getattr(other, field.name)
+            for field in fields(self.record_class)
+        )
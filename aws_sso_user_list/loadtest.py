@@ -0,0 +1,311 @@
+import csv
+import json
+import math
+import multiprocessing
+import random
+import threading
+import time
+import typing
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import astuple, dataclass
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import product
+
+from aws_sso_user_list.failures import FailureReport
+from aws_sso_user_list.metrics import peak_rss_bytes
+from aws_sso_user_list.mfa_device import MFA_BATCH_SIZE
+from aws_sso_user_list.transport import (
+    RequestsTransport,
+    TransportResponse,
+    request_target,
+    use_placeholder_credentials,
+)
+from aws_sso_user_list.utils import fetch_all_user_with_mfa_device
+
+STUB_IDENTITY_STORE_ID = "d-0000000000"
+STUB_REGION = "us-east-1"
+STUB_CREATED_AT = 948603360.0
+DEFAULT_LATENCY = 0.05
+
+
+def stub_user_id(index: int) -> str:
+    return f"{index:08d}-0000-0000-0000-000000000000"
+
+
+def stub_user(index: int) -> dict:
+    user_name = f"user{index:08d}@example.com"
+    return {
+        "Active": True,
+        "UserId": stub_user_id(index),
+        "UserName": user_name,
+        "UserAttributes": {
+            "displayName": {"StringValue": f"User {index}"},
+            "emails": {
+                "ComplexListValue": [
+                    {
+                        "primary": {"BooleanValue": True},
+                        "value": {"StringValue": user_name},
+                        "verificationStatus": {"StringValue": "VERIFIED"},
+                    }
+                ]
+            },
+        },
+        "Meta": {"CreatedAt": STUB_CREATED_AT, "UpdatedAt": STUB_CREATED_AT},
+    }
+
+
+def stub_mfa_devices(user_id: str) -> list[dict]:
+    # Zero to two devices per user, depending on the user index
+    return [
+        {
+            "deviceId": f"m-{user_id[:8]}{number}",
+            "deviceName": f"m-{user_id[:8]}{number}_name",
+            "displayName": "MFA Device",
+            "mfaType": "WEBAUTHN",
+            "registeredDate": STUB_CREATED_AT,
+        }
+        for number in range(int(user_id[:8]) % 3)
+    ]
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: tuple[str, int],
+        users: int,
+        latency: float = 0.0,
+        throttle_rate: float = 0.0,
+        seed: int = 0,
+    ) -> None:
+        super().__init__(address, StubRequestHandler)
+        self.users = users
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def throttle(self) -> bool:
+        with self.lock:
+            return self.random.random() < self.throttle_rate
+
+    def search_users(self, body: dict) -> dict:
+        start = int(body.get("NextToken") or 0)
+        end = min(start + body.get("MaxResults", 100), self.users)
+        response: dict[str, typing.Any] = {
+            "Users": [stub_user(index) for index in range(start, end)]
+        }
+        if end < self.users:
+            response["NextToken"] = str(end)
+        return response
+
+    def list_mfa_devices(self, body: dict) -> dict:
+        return {
+            "userMfaDevicesEntryList": [
+                {
+                    "mfaDevices": stub_mfa_devices(user["userId"]),
+                    "user": user,
+                }
+                for user in body["userList"]
+            ]
+        }
+
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+    server: StubServer
+
+    def do_POST(self) -> None:
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        time.sleep(self.server.latency)
+        if self.server.throttle():
+            self.send_json(
+                HTTPStatus.BAD_REQUEST,
+                {"__type": "ThrottlingException", "message": "Rate exceeded"},
+            )
+            return
+
+        target = request_target(dict(self.headers))
+        if target == "SearchUsers":
+            self.send_json(HTTPStatus.OK, self.server.search_users(body))
+        elif target == "BatchListMfaDevicesForUser":
+            self.send_json(HTTPStatus.OK, self.server.list_mfa_devices(body))
+        else:
+            self.send_json(
+                HTTPStatus.BAD_REQUEST,
+                {"__type": "UnknownOperationException", "message": target},
+            )
+
+    def send_json(self, status: HTTPStatus, data: dict) -> None:
+        content = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/x-amz-json-1.1")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format: str, *args: typing.Any) -> None:
+        pass
+
+
+@contextmanager
+def serve_stub(
+    users: int,
+    latency: float = 0.0,
+    throttle_rate: float = 0.0,
+) -> typing.Iterator[str]:
+    server = StubServer(
+        ("127.0.0.1", 0),
+        users=users,
+        latency=latency,
+        throttle_rate=throttle_rate,
+    )
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}/"
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+
+class StubTransport(RequestsTransport):
+    def __init__(self, endpoint: str) -> None:
+        super().__init__()
+        self.endpoint = endpoint
+        self.latencies: list[float] = []
+        self.throttled = 0
+        self.lock = threading.Lock()
+
+    def send(
+        self, url: str, headers: typing.Mapping[str, str], data: str
+    ) -> TransportResponse:
+        # Every API endpoint is served by the stub
+        started_at = time.perf_counter()
+        response = super().send(self.endpoint, headers=headers, data=data)
+        elapsed = time.perf_counter() - started_at
+        with self.lock:
+            self.latencies.append(elapsed)
+            self.throttled += int(response.throttled)
+        return response
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[max(0, math.ceil(len(values) * pct / 100) - 1)]
+
+
+@dataclass
+class LoadResult:
+    users: int
+    batch_size: int
+    max_workers: int
+    seconds: float
+    users_per_second: float
+    requests: int
+    throttled: int
+    p99_latency: float
+    peak_rss_bytes: int
+    failed_users: int = 0
+    error: str = ""
+
+
+LOAD_RESULT_FIELDNAMES = (
+    "Users",
+    "BatchSize",
+    "MaxWorkers",
+    "Seconds",
+    "UsersPerSecond",
+    "Requests",
+    "Throttled",
+    "P99LatencySeconds",
+    "PeakRssBytes",
+    "FailedUsers",
+    "Error",
+)
+
+
+def run_load(
+    endpoint: str, users: int, batch_size: int, max_workers: int
+) -> LoadResult:
+    use_placeholder_credentials("loadtest")
+
+    transport = StubTransport(endpoint)
+    failures = FailureReport()
+    fetched = 0
+    error = ""
+    with transport:
+        started_at = time.perf_counter()
+        try:
+            fetched = len(
+                fetch_all_user_with_mfa_device(
+                    identity_store_id=STUB_IDENTITY_STORE_ID,
+                    region=STUB_REGION,
+                    transport=transport,
+                    max_workers=max_workers,
+                    failures=failures,
+                    mfa_batch_size=batch_size,
+                )
+            )
+        except Exception as e:
+            # A failed setting is reported in its row, the sweep goes on
+            error = f"{type(e).__name__}: {e}"
+        seconds = time.perf_counter() - started_at
+    if not error and fetched != users:
+        error = f"Fetched {fetched} of {users} stub users"
+
+    return LoadResult(
+        users=users,
+        batch_size=batch_size,
+        max_workers=max_workers,
+        seconds=round(seconds, 3),
+        users_per_second=round(fetched / seconds, 1),
+        requests=len(transport.latencies),
+        throttled=transport.throttled,
+        p99_latency=round(percentile(transport.latencies, 99), 4),
+        peak_rss_bytes=peak_rss_bytes(),
+        failed_users=len(failures.unknown_user_ids),
+        error=error,
+    )
+
+
+def sweep(
+    user_counts: typing.Iterable[int],
+    batch_sizes: typing.Sequence[int] = (MFA_BATCH_SIZE,),
+    max_workers_options: typing.Sequence[int] = (1,),
+    latency: float = DEFAULT_LATENCY,
+    throttle_rate: float = 0.0,
+) -> typing.Iterator[LoadResult]:
+    # Each run gets a fresh process so its peak memory is its own and the
+    # stub does not compete with it for the GIL
+    with ProcessPoolExecutor(
+        max_workers=1,
+        mp_context=multiprocessing.get_context("spawn"),
+        max_tasks_per_child=1,
+    ) as executor:
+        for users in user_counts:
+            with serve_stub(
+                users, latency=latency, throttle_rate=throttle_rate
+            ) as endpoint:
+                for batch_size, max_workers in product(
+                    batch_sizes, max_workers_options
+                ):
+                    yield executor.submit(
+                        run_load, endpoint, users, batch_size, max_workers
+                    ).result()
+
+
+def write_results(
+    results: typing.Iterable[LoadResult], output: typing.TextIO
+) -> None:
+    writer = csv.writer(output)
+    writer.writerow(LOAD_RESULT_FIELDNAMES)
+    for result in results:
+        writer.writerow(astuple(result))
+        # Long sweeps report each setting as soon as it finishes
+        output.flush()
@@ -0,0 +1,32 @@
+import threading
+import typing
+from concurrent.futures import Future
+
+T = typing.TypeVar("T")
+
+
+class LookupCache(typing.Generic[T]):
+    def __init__(self, lookup: typing.Callable[[str], T]) -> None:
+        self.lookup = lookup
+        self.lock = threading.Lock()
+        self.values: dict[str, Future[T]] = {}
+
+    def get(self, key: str) -> T:
+        with self.lock:
+            future = self.values.get(key)
+            owner = future is None
+            if future is None:
+                future = self.values[key] = Future()
+        # Concurrent lookups of the same key wait for the first one
+        if owner:
+            try:
+                future.set_result(self.lookup(key))
+            except BaseException as e:
+                # Waiting lookups get the error, later ones try again
+                with self.lock:
+                    del self.values[key]
+                future.set_exception(e)
+        return future.result()
+
+    def __len__(self) -> int:
+        return len(self.values)
@@ -0,0 +1,143 @@
+import os
+import tracemalloc
+import typing
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+PACKAGE_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+MODULE_FILE = os.path.abspath(__file__)
+TRACEBACK_LIMIT = 32
+TOP_SITES = 5
+
+
+@dataclass
+class StageMemory:
+    name: str
+    peak: int = 0
+    retained: int = 0
+    top_sites: list[tuple[str, int]] = field(default_factory=list)
+
+
+def format_bytes(value: int) -> str:
+    return f"{value / 1024 / 1024:.1f} MiB"
+
+
+def profiler_allocation(traceback: tracemalloc.Traceback) -> bool:
+    return any(frame.filename == MODULE_FILE for frame in traceback)
+
+
+def package_site(traceback: tracemalloc.Traceback) -> str | None:
+    # Attribute the allocation to the innermost frame in this package, but
+    # leave out the snapshots taken by the profiler itself
+    if profiler_allocation(traceback):
+        return None
+    for frame in reversed(traceback):
+        if frame.filename.startswith(PACKAGE_DIRECTORY):
+            filename = os.path.relpath(
+                frame.filename, os.path.dirname(PACKAGE_DIRECTORY)
+            )
+            return f"{filename}:{frame.lineno}"
+    return None
+
+
+class MemoryStats:
+    def __init__(self, top: int = TOP_SITES) -> None:
+        self.top = top
+        self.stages: list[StageMemory] = []
+        self.open_stages: list[StageMemory] = []
+        # Traced memory held by the snapshots of the open stages
+        self.snapshot_size = 0
+
+    @contextmanager
+    def stage(self, name: str) -> typing.Iterator[None]:
+        started_current, peak = tracemalloc.get_traced_memory()
+        # Resetting the peak must not lose it for enclosing stages
+        for open_stage in self.open_stages:
+            open_stage.peak = max(open_stage.peak, peak - self.snapshot_size)
+        started_snapshot = tracemalloc.take_snapshot()
+        snapshot_size = tracemalloc.get_traced_memory()[0] - started_current
+        self.snapshot_size += snapshot_size
+        tracemalloc.reset_peak()
+
+        stage_memory = StageMemory(name=name)
+        self.open_stages.append(stage_memory)
+        try:
+            yield
+        finally:
+            self.open_stages.remove(stage_memory)
+            _, peak = tracemalloc.get_traced_memory()
+            stage_memory.peak = max(
+                stage_memory.peak, peak - self.snapshot_size
+            )
+            self.snapshot_size -= snapshot_size
+            for open_stage in self.open_stages:
+                open_stage.peak = max(open_stage.peak, stage_memory.peak)
+            differences = tracemalloc.take_snapshot().compare_to(
+                started_snapshot, "traceback"
+            )
+            stage_memory.retained = sum(
+                difference.size_diff
+                for difference in differences
+                if not profiler_allocation(difference.traceback)
+            )
+            stage_memory.top_sites = self.top_sites(differences)
+            self.stages.append(stage_memory)
+
+    def top_sites(
+        self, differences: list[tracemalloc.StatisticDiff]
+    ) -> list[tuple[str, int]]:
+        sizes: Counter[str] = Counter()
+        for difference in differences:
+            if difference.size_diff <= 0:
+                continue
+            if site := package_site(difference.traceback):
+                sizes[site] += difference.size_diff
+        return sizes.most_common(self.top)
+
+    def render(self) -> str:
+        lines = [f"{'Stage':<28}{'Peak':>12}{'Retained':>12}"]
+        lines.extend(
+            f"{stage.name:<28}{format_bytes(stage.peak):>12}"
+            f"{format_bytes(stage.retained):>12}"
+            for stage in self.stages
+        )
+        for stage in self.stages:
+            if not stage.top_sites:
+                continue
+            lines.append("")
+            lines.append(f"Top allocating call sites in {stage.name}:")
+            lines.extend(
+                f"  {site:<48}{format_bytes(size):>12}"
+                for site, size in stage.top_sites
+            )
+        return "\n".join(lines)
+
+
+_active: MemoryStats | None = None
+
+
+@contextmanager
+def collect(enabled: bool) -> typing.Iterator[MemoryStats | None]:
+    global _active
+
+    if not enabled:
+        yield None
+        return
+
+    stats = _active = MemoryStats()
+    tracemalloc.start(TRACEBACK_LIMIT)
+    try:
+        yield stats
+    finally:
+        _active = None
+        tracemalloc.stop()
+
+
+@contextmanager
+def stage(name: str) -> typing.Iterator[None]:
+    if _active is None:
+        yield
+        return
+    with _active.stage(name):
+        yield
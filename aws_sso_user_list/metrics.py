@@ -0,0 +1,291 @@
+import bisect
+import os
+import sys
+import threading
+import time
+import typing
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None  # type: ignore[assignment]
+
+from aws_sso_user_list import memory
+
+PREFIX = "sso_user_list"
+T = typing.TypeVar("T")
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    def __init__(self, buckets: typing.Sequence[float]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative_counts(self) -> list[int]:
+        counts = []
+        total = 0
+        for count in self.counts:
+            total += count
+            counts.append(total)
+        return counts
+
+
+class Metrics:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.stage_durations: dict[str, float] = {}
+        self.requests: Counter[tuple[str, str]] = Counter()
+        self.request_durations: defaultdict[str, Histogram] = defaultdict(
+            lambda: Histogram(LATENCY_BUCKETS)
+        )
+        self.throttles: Counter[str] = Counter()
+        self.retries: Counter[str] = Counter()
+        self.counters: Counter[str] = Counter()
+
+    def observe_stage(self, name: str, seconds: float) -> None:
+        with self.lock:
+            self.stage_durations[name] = (
+                self.stage_durations.get(name, 0.0) + seconds
+            )
+
+    def observe_request(
+        self, target: str, status_code: int | None, seconds: float
+    ) -> None:
+        with self.lock:
+            self.requests[(target, str(status_code))] += 1
+            self.request_durations[target].observe(seconds)
+
+    def observe_throttle(self, target: str) -> None:
+        with self.lock:
+            self.throttles[target] += 1
+
+    def observe_retry(self, target: str) -> None:
+        with self.lock:
+            self.retries[target] += 1
+
+    def increment(self, name: str, value: int = 1) -> None:
+        with self.lock:
+            self.counters[name] += value
+
+    def render(self, success: bool) -> str:
+        lines: list[str] = []
+
+        def metric(
+            name: str,
+            type_: str,
+            help_: str,
+            samples: typing.Iterable[tuple[str, dict[str, str], float]],
+        ) -> None:
+            lines.append(f"# HELP {PREFIX}_{name} {help_}")
+            lines.append(f"# TYPE {PREFIX}_{name} {type_}")
+            for suffix, labels, value in samples:
+                label = ",".join(
+                    f'{key}="{escape(label_value)}"'
+                    for key, label_value in labels.items()
+                )
+                label = f"{{{label}}}" if label else ""
+                lines.append(f"{PREFIX}_{name}{suffix}{label} {value}")
+
+        with self.lock:
+            metric(
+                "stage_duration_seconds",
+                "gauge",
+                "Time spent in each pipeline stage.",
+                (
+                    ("", {"stage": name}, seconds)
+                    for name, seconds in self.stage_durations.items()
+                ),
+            )
+            metric(
+                "requests_total",
+                "counter",
+                "API requests by target and HTTP status.",
+                (
+                    ("", {"target": target, "status": status}, count)
+                    for (target, status), count in sorted(
+                        self.requests.items(),
+                    )
+                ),
+            )
+            metric(
+                "request_duration_seconds",
+                "histogram",
+                "API request latency by target.",
+                (
+                    sample
+                    for target, histogram in sorted(
+                        self.request_durations.items()
+                    )
+                    for sample in histogram_samples(target, histogram)
+                ),
+            )
+            metric(
+                "throttles_total",
+                "counter",
+                "Throttled API responses by target.",
+                (
+                    ("", {"target": target}, count)
+                    for target, count in sorted(self.throttles.items())
+                ),
+            )
+            metric(
+                "retries_total",
+                "counter",
+                "Retried API requests by target.",
+                (
+                    ("", {"target": target}, count)
+                    for target, count in sorted(self.retries.items())
+                ),
+            )
+            metric(
+                "hedged_requests_total",
+                "counter",
+                "Duplicate requests sent for slow MFA device batches.",
+                [("", {}, self.counters["hedged_requests"])],
+            )
+            metric(
+                "users",
+                "gauge",
+                "Users fetched in the last run.",
+                [("", {}, self.counters["users"])],
+            )
+            metric(
+                "mfa_devices",
+                "gauge",
+                "MFA devices fetched in the last run.",
+                [("", {}, self.counters["mfa_devices"])],
+            )
+            metric(
+                "groups",
+                "gauge",
+                "Groups described in the last run.",
+                [("", {}, self.counters["groups"])],
+            )
+            metric(
+                "permission_sets",
+                "gauge",
+                "Permission sets described in the last run.",
+                [("", {}, self.counters["permission_sets"])],
+            )
+        metric(
+            "peak_rss_bytes",
+            "gauge",
+            "Peak resident set size of the process.",
+            [("", {}, peak_rss_bytes())],
+        )
+        metric(
+            "last_run_success",
+            "gauge",
+            "Whether the last run finished successfully.",
+            [("", {}, int(success))],
+        )
+        metric(
+            "last_run_timestamp_seconds",
+            "gauge",
+            "Unix time the last run finished.",
+            [("", {}, int(time.time()))],
+        )
+
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str, success: bool) -> None:
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            file.write(self.render(success=success))
+        os.replace(temporary_path, path)
+
+
+def escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def histogram_samples(
+    target: str, histogram: Histogram
+) -> typing.Iterator[tuple[str, dict[str, str], float]]:
+    for bucket, count in zip(histogram.buckets, histogram.cumulative_counts()):
+        yield "_bucket", {"target": target, "le": f"{bucket:g}"}, count
+    yield "_bucket", {"target": target, "le": "+Inf"}, histogram.count
+    yield "_sum", {"target": target}, histogram.sum
+    yield "_count", {"target": target}, histogram.count
+
+
+def peak_rss_bytes() -> int:
+    if resource is None:  # pragma: no cover
+        return 0
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in kilobytes on Linux and in bytes on macOS
+    return peak_rss if sys.platform == "darwin" else peak_rss * 1024
+
+
+_active: Metrics | None = None
+
+
+def active() -> Metrics | None:
+    return _active
+
+
+@contextmanager
+def collect(path: str | None) -> typing.Iterator[Metrics | None]:
+    global _active
+
+    if path is None:
+        yield None
+        return
+
+    metrics = _active = Metrics()
+    success = False
+    try:
+        yield metrics
+        success = True
+    finally:
+        _active = None
+        metrics.write_textfile(path, success=success)
+
+
+@contextmanager
+def stage(name: str) -> typing.Iterator[None]:
+    started_at = time.perf_counter()
+    try:
+        with memory.stage(name):
+            yield
+    finally:
+        if _active is not None:
+            _active.observe_stage(name, time.perf_counter() - started_at)
+
+
+def iter_stage(name: str, items: typing.Iterable[T]) -> typing.Iterator[T]:
+    # A lazy stage is interleaved with its consumer, so only the time spent
+    # producing its items (and those of the stages it pulls from) counts
+    iterator = iter(items)
+    seconds = 0.0
+    try:
+        with memory.stage(name):
+            while True:
+                started_at = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    seconds += time.perf_counter() - started_at
+                yield item
+    finally:
+        if _active is not None:
+            _active.observe_stage(name, seconds)
+
+
+def increment(name: str, value: int = 1) -> None:
+    if _active is not None:
+        _active.increment(name, value)
@@ -1,12 +1,22 @@
-import json
+import typing
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import UTC, datetime
+from functools import cached_property
+from itertools import islice
 
-import requests
 from botocore.auth import SigV4Auth
-from botocore.awsrequest import AWSRequest
 from botocore.session import Session
 
+from aws_sso_user_list import metrics, progress, tracing
+from aws_sso_user_list.concurrency import bounded_map
+from aws_sso_user_list.failures import FailureReport
+from aws_sso_user_list.lazy import LazyRecord
+from aws_sso_user_list.transport import BaseTransport, post_signed
+
+_MFA_DEVICES_TARGET = "BatchListMfaDevicesForUser"
+MFA_BATCH_SIZE = 25
+
 
 @dataclass
 class MfaDevice:
@@ -18,22 +28,50 @@ class MfaDevice:
 
     @classmethod
     def from_data(cls, data: dict) -> "MfaDevice":
+        return LazyMfaDevice(data)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "MfaDevice":
         return cls(
-            device_id=data["deviceId"],
-            device_name=data["deviceName"],
-            display_name=data.get("displayName"),
-            mfa_type=data["mfaType"],
-            registered_date=datetime.fromtimestamp(
-                data["registeredDate"],
-                UTC,
-            ),
+            device_id=data["device_id"],
+            device_name=data["device_name"],
+            display_name=data.get("display_name"),
+            mfa_type=data["mfa_type"],
+            registered_date=datetime.fromisoformat(data["registered_date"]),
         )
 
 
+class LazyMfaDevice(LazyRecord, MfaDevice):
+    record_class = MfaDevice
+
+    def __init__(self, data: dict) -> None:
+        self.data = data
+
+    @cached_property
+    def device_id(self) -> str:  # type: ignore[override]
+        return self.data["deviceId"]
+
+    @cached_property
+    def device_name(self) -> str:  # type: ignore[override]
+        return self.data["deviceName"]
+
+    @cached_property
+    def display_name(self) -> str | None:  # type: ignore[override]
+        return self.data.get("displayName")
+
+    @cached_property
+    def mfa_type(self) -> str:  # type: ignore[override]
+        return self.data["mfaType"]
+
+    @cached_property
+    def registered_date(self) -> datetime:  # type: ignore[override]
+        return datetime.fromtimestamp(self.data["registeredDate"], UTC)
+
+
 @dataclass
 class UserMfa:
     user_id: str
-    mfa_devices: list[MfaDevice]
+    mfa_devices: list[MfaDevice] | None
 
     @classmethod
     def from_data(cls, data: dict) -> "UserMfa":
@@ -51,60 +89,144 @@ def _fetch_mfa_devices(
     identity_store_id: str,
     region: str,
     user_ids: list[str],
+    transport: BaseTransport | None = None,
 ) -> dict:
-    endpoint = f"https://auth-control.{region}.prod.apps-auth.aws.a2z.com/"
-    headers = {
-        "Content-Type": "application/x-amz-json-1.0",
-        "X-Amz-Target": "AppsAuthControlPlaneService.BatchListMfaDevicesForUser",  # noqa: E501
-    }
-    data = json.dumps(
-        {
+    return post_signed(
+        sigv4_auth=sigv4_auth,
+        url=f"https://auth-control.{region}.prod.apps-auth.aws.a2z.com/",
+        target=f"AppsAuthControlPlaneService.{_MFA_DEVICES_TARGET}",
+        body={
             "userList": [
                 {"directoryId": identity_store_id, "userId": user_id}
                 for user_id in user_ids
             ],
-        }
-    )
-    request = AWSRequest(
-        method="POST",
-        url=endpoint,
-        data=data,
-        headers=headers,
+        },
+        transport=transport,
+        content_type="application/x-amz-json-1.0",
     )
-    sigv4_auth.add_auth(request)
-    prepped = request.prepare()
-
-    response = requests.post(
-        prepped.url,
-        headers=prepped.headers,
-        data=data,
-    )
-    response_data = response.json()
-
-    return response_data
 
 
-def fetch_all_mfa_devices(
-    identity_store_id: str, region: str, user_ids: list[str]
-) -> list[UserMfa]:
+def iter_all_mfa_devices(
+    identity_store_id: str,
+    region: str,
+    user_ids: typing.Iterable[str],
+    transport: BaseTransport | None = None,
+    max_workers: int = 1,
+    failures: FailureReport | None = None,
+    batch_size: int = MFA_BATCH_SIZE,
+) -> typing.Iterator[UserMfa]:
     sigv4_auth = SigV4Auth(
         credentials=Session().get_credentials(),
         service_name="appsauth",
         region_name=region,
     )
 
-    user_mfa_devices: list[UserMfa] = []
-    batch_size = 25
-    for i in range(0, len(user_ids), batch_size):
-        response = _fetch_mfa_devices(
-            sigv4_auth=sigv4_auth,
-            identity_store_id=identity_store_id,
-            region=region,
-            user_ids=user_ids[i : i + batch_size],  # noqa: E203
-        )
-        user_mfa_devices += [
+    def parse(response: dict) -> list[UserMfa]:
+        user_mfas = [
             UserMfa.from_data(mfa)
             for mfa in response["userMfaDevicesEntryList"]
         ]
+        metrics.increment(
+            "mfa_devices",
+            sum(len(user_mfa.mfa_devices or ()) for user_mfa in user_mfas),
+        )
+        return user_mfas
+
+    def fetch(numbered_batch: tuple[int, list[str]]) -> dict:
+        batch_number, batch = numbered_batch
+        progress.increment("mfa_batches_started")
+        try:
+            with tracing.span(
+                "_fetch_mfa_devices",
+                batch=batch_number,
+                batch_size=len(batch),
+            ):
+                return _fetch_mfa_devices(
+                    sigv4_auth=sigv4_auth,
+                    identity_store_id=identity_store_id,
+                    region=region,
+                    user_ids=batch,
+                    transport=transport,
+                )
+        finally:
+            progress.increment("mfa_batches")
+            progress.increment("mfa_users", len(batch))
+
+    retry_batches: list[tuple[int, list[str]]] = []
+
+    def settle(
+        batch_number: int,
+        batch: list[str],
+        future: Future[dict],
+        retried: bool = False,
+    ) -> list[UserMfa]:
+        if failures is None:
+            return parse(future.result())
+
+        try:
+            user_mfas = parse(future.result())
+        except Exception as e:
+            user_mfas = []
+            error = f"{type(e).__name__}: {e}"
+        else:
+            error = "Missing from userMfaDevicesEntryList"
+        found_user_ids = {user_mfa.user_id for user_mfa in user_mfas}
+        failed_user_ids = [
+            user_id for user_id in batch if user_id not in found_user_ids
+        ]
+        if not failed_user_ids:
+            return user_mfas
+        if not retried:
+            # Keep the pipeline moving and try the batch again at the end
+            retry_batches.append((batch_number, failed_user_ids))
+            return user_mfas
+        failures.add(_MFA_DEVICES_TARGET, failed_user_ids, error)
+        return user_mfas + [
+            UserMfa(user_id=user_id, mfa_devices=None)
+            for user_id in failed_user_ids
+        ]
+
+    user_id_iter = iter(user_ids)
+    batches = iter(lambda: list(islice(user_id_iter, batch_size)), [])
+    with (
+        tracing.span(
+            "fetch_all_mfa_devices",
+            batch_size=batch_size,
+            max_workers=max_workers,
+        ) as span,
+        ThreadPoolExecutor(max_workers=max_workers) as executor,
+    ):
+        batch_count = 0
+        for (batch_count, batch), future in bounded_map(
+            executor, fetch, enumerate(batches, 1), max_workers
+        ):
+            yield from settle(batch_count, batch, future)
+        span.set_attribute("batches", batch_count)
+
+        span.set_attribute("retried_batches", len(retry_batches))
+        for (batch_number, batch), future in bounded_map(
+            executor, fetch, retry_batches, max_workers
+        ):
+            yield from settle(batch_number, batch, future, retried=True)
 
-    return user_mfa_devices
+
+def fetch_all_mfa_devices(
+    identity_store_id: str,
+    region: str,
+    user_ids: list[str],
+    transport: BaseTransport | None = None,
+    max_workers: int = 1,
+    failures: FailureReport | None = None,
+    batch_size: int = MFA_BATCH_SIZE,
+) -> list[UserMfa]:
+    return list(
+        iter_all_mfa_devices(
+            identity_store_id=identity_store_id,
+            region=region,
+            user_ids=user_ids,
+            transport=transport,
+            max_workers=max_workers,
+            failures=failures,
+            batch_size=batch_size,
+        )
+    )
@@ -0,0 +1,143 @@
+import itertools
+import json
+import multiprocessing
+import os
+import queue
+import typing
+import zlib
+from dataclasses import dataclass
+
+from aws_sso_user_list.utils import UserWithMfaDevice
+
+SPLIT_BY = ("hash", "round-robin")
+PART_BATCH_SIZE = 1000
+PART_QUEUE_SIZE = 4
+
+
+def part_path(path: str, index: int) -> str:
+    root, ext = os.path.splitext(path)
+    return f"{root}-{index:05d}{ext}"
+
+
+def manifest_path(path: str) -> str:
+    root, _ = os.path.splitext(path)
+    return f"{root}.manifest.json"
+
+
+def part_key(
+    split_by: str, parts: int
+) -> typing.Callable[[UserWithMfaDevice], int]:
+    if split_by == "hash":
+        # Stable across runs, unlike hash() of a str
+        return lambda user: zlib.crc32(user.user_id.encode()) % parts
+    # Users are dealt in turn, so the parts of a stream need no total count
+    rows = itertools.count()
+    return lambda user: next(rows) % parts
+
+
+def _write_part(
+    batches: "multiprocessing.Queue[list[UserWithMfaDevice] | None]",
+    export: typing.Callable[..., None],
+    path: str,
+) -> None:
+    def iter_users() -> typing.Iterator[UserWithMfaDevice]:
+        while (batch := batches.get()) is not None:
+            yield from batch
+
+    with open(path, "w", encoding="utf-8") as output:
+        export(users=iter_users(), output=output)
+
+
+@dataclass
+class Part:
+    path: str
+    process: multiprocessing.process.BaseProcess
+    batches: "multiprocessing.Queue[list[UserWithMfaDevice] | None]"
+    pending: list[UserWithMfaDevice]
+    users: int = 0
+
+    def put(self, batch: list[UserWithMfaDevice] | None) -> None:
+        while True:
+            try:
+                self.batches.put(batch, timeout=0.1)
+                return
+            except queue.Full:
+                if not self.process.is_alive():
+                    raise RuntimeError(f"Writing {self.path} failed")
+
+    def flush(self) -> None:
+        if self.pending:
+            self.put(self.pending)
+            self.pending = []
+
+    def to_dict(self) -> dict[str, typing.Any]:
+        return {
+            "Path": os.path.basename(self.path),
+            "Users": self.users,
+            "Bytes": os.path.getsize(self.path),
+        }
+
+
+def write_parts(
+    users: typing.Iterable[UserWithMfaDevice],
+    export: typing.Callable[..., None],
+    path: str,
+    parts: int,
+    split_by: str,
+    format_: str,
+) -> None:
+    # Each part is encoded in its own process, so parts do not share a GIL
+    context = multiprocessing.get_context("spawn")
+    part_list: list[Part] = []
+    for index in range(parts):
+        batches: "multiprocessing.Queue[list[UserWithMfaDevice] | None]" = (
+            context.Queue(maxsize=PART_QUEUE_SIZE)
+        )
+        process = context.Process(
+            target=_write_part,
+            args=(batches, export, part_path(path, index)),
+            name=f"part-{index}",
+        )
+        process.start()
+        part_list.append(
+            Part(
+                path=part_path(path, index),
+                process=process,
+                batches=batches,
+                pending=[],
+            )
+        )
+
+    key = part_key(split_by, parts)
+    try:
+        for user in users:
+            part = part_list[key(user)]
+            part.users += 1
+            part.pending.append(user)
+            if len(part.pending) >= PART_BATCH_SIZE:
+                part.flush()
+        for part in part_list:
+            part.flush()
+            part.put(None)
+    except BaseException:
+        for part in part_list:
+            part.process.terminate()
+        raise
+    finally:
+        for part in part_list:
+            part.process.join()
+    for part in part_list:
+        if part.process.exitcode != 0:
+            raise RuntimeError(f"Writing {part.path} failed")
+
+    with open(manifest_path(path), "w", encoding="utf-8") as manifest:
+        json.dump(
+            {
+                "Format": format_,
+                "SplitBy": split_by,
+                "Users": sum(part.users for part in part_list),
+                "Parts": [part.to_dict() for part in part_list],
+            },
+            manifest,
+            indent=2,
+        )
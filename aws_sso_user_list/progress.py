@@ -0,0 +1,153 @@
+import json
+import sys
+import threading
+import time
+import typing
+from collections import Counter
+from contextlib import contextmanager
+
+PROGRESS_FORMATS = ("text", "json")
+PROGRESS_INTERVAL = 1.0
+
+
+def format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}"
+
+
+class Progress:
+    def __init__(
+        self,
+        output: typing.TextIO,
+        format_: str = "text",
+        interval: float = PROGRESS_INTERVAL,
+    ) -> None:
+        self.output = output
+        self.format = format_
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.counters: Counter[str] = Counter()
+        self.total_users: int | None = None
+        self.started_at = time.monotonic()
+        self.last_reported_at = self.started_at
+        self.last_requests = 0
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def increment(self, name: str, value: int = 1) -> None:
+        with self.lock:
+            self.counters[name] += value
+
+    def set_total_users(self, total_users: int) -> None:
+        self.total_users = total_users
+
+    def snapshot(self) -> dict[str, typing.Any]:
+        now = time.monotonic()
+        with self.lock:
+            counters = self.counters.copy()
+        elapsed = now - self.started_at
+        requests_per_second = (counters["requests"] - self.last_requests) / (
+            max(now - self.last_reported_at, 1e-9)
+        )
+        self.last_reported_at = now
+        self.last_requests = counters["requests"]
+
+        eta = None
+        if self.total_users:
+            # Every user is parsed once and then joined with its MFA devices
+            done = counters["users"] + counters["mfa_users"]
+            if done:
+                eta = max(elapsed * (2 * self.total_users - done) / done, 0)
+        return {
+            "elapsed_seconds": round(elapsed, 1),
+            "pages": counters["pages"],
+            "users": counters["users"],
+            "total_users": self.total_users,
+            "mfa_batches": counters["mfa_batches"],
+            "mfa_batches_in_flight": (
+                counters["mfa_batches_started"] - counters["mfa_batches"]
+            ),
+            "requests": counters["requests"],
+            "requests_per_second": round(requests_per_second, 1),
+            "eta_seconds": round(eta, 1) if eta is not None else None,
+        }
+
+    def render(self, snapshot: dict[str, typing.Any]) -> str:
+        users = str(snapshot["users"])
+        if snapshot["total_users"] is not None:
+            users += f"/{snapshot['total_users']}"
+        line = (
+            f"{format_duration(snapshot['elapsed_seconds'])} "
+            f"pages {snapshot['pages']}, users {users}, "
+            f"MFA batches {snapshot['mfa_batches']} "
+            f"({snapshot['mfa_batches_in_flight']} in flight), "
+            f"{snapshot['requests_per_second']} requests/s"
+        )
+        if snapshot["eta_seconds"] is not None:
+            line += f", ETA {format_duration(snapshot['eta_seconds'])}"
+        return line
+
+    def report(self, final: bool = False) -> None:
+        snapshot = self.snapshot()
+        if self.format == "json":
+            self.output.write(json.dumps(snapshot) + "\n")
+        elif self.output.isatty():
+            # Redraw the same terminal line until the run ends
+            end = "\n" if final else ""
+            self.output.write(f"\r\x1b[K{self.render(snapshot)}{end}")
+        else:
+            self.output.write(self.render(snapshot) + "\n")
+        self.output.flush()
+
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            target=self._run, name="progress", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.report(final=True)
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            self.report()
+
+
+_active: Progress | None = None
+
+
+@contextmanager
+def collect(
+    format_: str | None,
+    interval: float = PROGRESS_INTERVAL,
+    output: typing.TextIO | None = None,
+) -> typing.Iterator[Progress | None]:
+    global _active
+
+    if format_ is None:
+        yield None
+        return
+
+    progress = _active = Progress(
+        output or sys.stderr, format_=format_, interval=interval
+    )
+    progress.start()
+    try:
+        yield progress
+    finally:
+        _active = None
+        progress.stop()
+
+
+def increment(name: str, value: int = 1) -> None:
+    if _active is not None:
+        _active.increment(name, value)
+
+
+def set_total_users(total_users: int) -> None:
+    if _active is not None:
+        _active.set_total_users(total_users)
@@ -0,0 +1,117 @@
+import gzip
+import json
+import threading
+import time
+import typing
+from collections import defaultdict, deque
+
+from aws_sso_user_list.hedging import Hedge
+from aws_sso_user_list.transport import (
+    BACKOFF,
+    MAX_BACKOFF,
+    MAX_RETRIES,
+    BaseTransport,
+    TransportResponse,
+    request_target,
+)
+
+REDACTED_HEADERS = {"authorization", "x-amz-security-token", "x-amz-date"}
+REDACTED = "REDACTED"
+
+
+def redact_headers(headers: typing.Mapping[str, str]) -> dict[str, str]:
+    return {
+        key: REDACTED if key.lower() in REDACTED_HEADERS else value
+        for key, value in headers.items()
+    }
+
+
+class RecordingTransport(BaseTransport):
+    def __init__(
+        self,
+        path: str,
+        transport: BaseTransport,
+        hedge: Hedge | None = None,
+    ) -> None:
+        super().__init__(
+            connect_timeout=transport.connect_timeout,
+            read_timeout=transport.read_timeout,
+            hedge=hedge,
+            max_retries=transport.max_retries,
+            backoff=transport.backoff,
+            max_backoff=transport.max_backoff,
+        )
+        self.transport = transport
+        self.file = gzip.open(path, "wt", encoding="utf-8")
+        self.lock = threading.Lock()
+        self.started_at = time.perf_counter()
+
+    def send(
+        self, url: str, headers: typing.Mapping[str, str], data: str
+    ) -> TransportResponse:
+        started_at = time.perf_counter()
+        response = self.transport.send(url, headers=headers, data=data)
+        entry = {
+            "offset": started_at - self.started_at,
+            "elapsed": time.perf_counter() - started_at,
+            "target": request_target(headers),
+            "url": url,
+            "headers": redact_headers(headers),
+            "request": data,
+            "status_code": response.status_code,
+            "response": response.content.decode("utf-8"),
+        }
+        line = json.dumps(entry, separators=(",", ":")) + "\n"
+        with self.lock:
+            self.file.write(line)
+        return response
+
+    def close(self) -> None:
+        super().close()
+        self.transport.close()
+        self.file.close()
+
+
+class ReplayTransport(BaseTransport):
+    def __init__(
+        self,
+        path: str,
+        original_timing: bool = False,
+        hedge: Hedge | None = None,
+        max_retries: int = MAX_RETRIES,
+        backoff: float = BACKOFF,
+        max_backoff: float = MAX_BACKOFF,
+    ) -> None:
+        super().__init__(
+            hedge=hedge,
+            max_retries=max_retries,
+            backoff=backoff,
+            max_backoff=max_backoff,
+        )
+        self.original_timing = original_timing
+        self.lock = threading.Lock()
+        self.entries: defaultdict[tuple[str, str], deque[dict]] = defaultdict(
+            deque
+        )
+        with gzip.open(path, "rt", encoding="utf-8") as file:
+            for line in file:
+                entry = json.loads(line)
+                self.entries[(entry["target"], entry["request"])].append(entry)
+
+    def send(
+        self, url: str, headers: typing.Mapping[str, str], data: str
+    ) -> TransportResponse:
+        key = (request_target(headers), data)
+        with self.lock:
+            entries = self.entries.get(key)
+            if not entries:
+                raise KeyError(f"No recorded response for {key[0]}: {data}")
+            # Keep the last response for requests repeated more than recorded
+            entry = entries.popleft() if len(entries) > 1 else entries[0]
+
+        if self.original_timing:
+            time.sleep(entry["elapsed"])
+        return TransportResponse(
+            status_code=entry["status_code"],
+            content=entry["response"].encode("utf-8"),
+        )
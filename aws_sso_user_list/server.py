@@ -0,0 +1,180 @@
+import io
+import json
+import sys
+import threading
+import traceback
+import typing
+from datetime import UTC, datetime
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from aws_sso_user_list.exporter import UserJsonExporter, json_default
+from aws_sso_user_list.utils import UserWithMfaDevice
+
+
+def dump_user(user: UserWithMfaDevice) -> bytes:
+    return json.dumps(
+        user.to_dict(), default=json_default, ensure_ascii=False
+    ).encode()
+
+
+class UserIndex:
+    def __init__(self, users: typing.Iterable[UserWithMfaDevice]) -> None:
+        self.by_user_id: dict[str, bytes] = {}
+        self.by_user_name: dict[str, bytes] = {}
+        self.by_email: dict[str, bytes] = {}
+        users = list(users)
+        for user in users:
+            data = dump_user(user)
+            self.by_user_id[user.user_id] = data
+            self.by_user_name[user.user_name.casefold()] = data
+            self.by_email[user.email.casefold()] = data
+
+        output = io.StringIO()
+        UserJsonExporter(users).export(output)
+        self.export = output.getvalue().encode()
+        self.refreshed_at = datetime.now(UTC)
+
+    def __len__(self) -> int:
+        return len(self.by_user_id)
+
+    def lookup(
+        self,
+        user_id: str | None = None,
+        user_name: str | None = None,
+        email: str | None = None,
+    ) -> bytes | None:
+        if user_id is not None:
+            return self.by_user_id.get(user_id)
+        if user_name is not None:
+            return self.by_user_name.get(user_name.casefold())
+        if email is not None:
+            return self.by_email.get(email.casefold())
+        return None
+
+
+class UserCache:
+    def __init__(
+        self,
+        fetch: typing.Callable[[], typing.Iterable[UserWithMfaDevice]],
+        refresh_interval: float,
+        fetch_user: (
+            typing.Callable[[str], UserWithMfaDevice | None] | None
+        ) = None,
+    ) -> None:
+        self.fetch = fetch
+        self.refresh_interval = refresh_interval
+        self.fetch_user = fetch_user
+        self.index: UserIndex | None = None
+        self.last_error: str | None = None
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def refresh(self) -> None:
+        # Lookups keep reading the previous index until the new one is ready
+        self.index = UserIndex(self.fetch())
+        self.last_error = None
+
+    def lookup_user_id(self, user_id: str) -> bytes | None:
+        data = self.index.lookup(user_id=user_id) if self.index else None
+        if data is None and self.fetch_user is not None:
+            # Users created since the last refresh are described directly
+            user = self.fetch_user(user_id)
+            data = dump_user(user) if user is not None else None
+        return data
+
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            target=self._run, name="user-cache-refresh", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                self.last_error = repr(e)
+                traceback.print_exc(file=sys.stderr)
+
+
+class UserRequestHandler(BaseHTTPRequestHandler):
+    server: "UserServer"
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        query = {key: value[-1] for key, value in parse_qs(url.query).items()}
+        index = self.server.cache.index
+
+        if url.path == "/health":
+            self._send_health(index)
+        elif index is None:
+            self._send_error(HTTPStatus.SERVICE_UNAVAILABLE)
+        elif url.path == "/users" and not query:
+            self._send_json(HTTPStatus.OK, index.export)
+        elif url.path == "/users" and query.keys() - {"user_name", "email"}:
+            self._send_error(HTTPStatus.BAD_REQUEST)
+        elif url.path == "/users":
+            data = index.lookup(
+                user_name=query.get("user_name"), email=query.get("email")
+            )
+            self._send_data(data)
+        elif url.path.startswith("/users/"):
+            user_id = unquote(url.path.removeprefix("/users/"))
+            try:
+                data = self.server.cache.lookup_user_id(user_id)
+            except Exception:
+                traceback.print_exc(file=sys.stderr)
+                self._send_error(HTTPStatus.BAD_GATEWAY)
+                return
+            self._send_data(data)
+        else:
+            self._send_error(HTTPStatus.NOT_FOUND)
+
+    def _send_health(self, index: UserIndex | None) -> None:
+        data: dict[str, typing.Any]
+        if index is None:
+            status = HTTPStatus.SERVICE_UNAVAILABLE
+            data = {"users": None, "refreshed_at": None}
+        else:
+            status = HTTPStatus.OK
+            data = {
+                "users": len(index),
+                "refreshed_at": index.refreshed_at.isoformat(),
+            }
+        data["last_error"] = self.server.cache.last_error
+        self._send_json(status, json.dumps(data).encode())
+
+    def _send_data(self, data: bytes | None) -> None:
+        if data is None:
+            self._send_error(HTTPStatus.NOT_FOUND)
+        else:
+            self._send_json(HTTPStatus.OK, data)
+
+    def _send_error(self, status: HTTPStatus) -> None:
+        data = json.dumps({"message": status.phrase}).encode()
+        self._send_json(status, data)
+
+    def _send_json(self, status: HTTPStatus, data: bytes) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args: typing.Any) -> None:
+        pass
+
+
+class UserServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], cache: UserCache) -> None:
+        super().__init__(address, UserRequestHandler)
+        self.cache = cache
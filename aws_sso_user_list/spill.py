@@ -0,0 +1,121 @@
+import heapq
+import os
+import pickle
+import tempfile
+import typing
+
+T = typing.TypeVar("T")
+MEMORY_LIMIT = 64 * 1024 * 1024
+
+
+class SpillBuffer(typing.Generic[T]):
+    # Runs are merged in passes of at most this many open files
+    max_open_runs = 64
+    # Every this many items, an item is pickled to estimate the item size
+    sample_interval = 64
+
+    def __init__(
+        self,
+        key: typing.Callable[[T], typing.Any],
+        memory_limit: int = MEMORY_LIMIT,
+    ) -> None:
+        self.key = key
+        self.memory_limit = memory_limit
+        self.buffer: list[T] = []
+        self.buffer_size = 0
+        self.item_size = 0
+        self.runs: list[str] = []
+        self.run_count = 0
+        self.spilled_count = 0
+        self._directory: tempfile.TemporaryDirectory | None = None
+
+    def __enter__(self) -> "SpillBuffer[T]":
+        return self
+
+    def __exit__(self, *args: typing.Any) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self.spilled_count + len(self.buffer)
+
+    def append(self, item: T) -> None:
+        if len(self.buffer) % self.sample_interval == 0:
+            self.item_size = len(
+                pickle.dumps(item, protocol=pickle.HIGHEST_PROTOCOL)
+            )
+        self.buffer.append(item)
+        self.buffer_size += self.item_size
+        if self.buffer_size > self.memory_limit:
+            self.spill()
+
+    def extend(self, items: typing.Iterable[T]) -> None:
+        for item in items:
+            self.append(item)
+
+    def spill(self) -> None:
+        if not self.buffer:
+            return
+
+        self.buffer.sort(key=self.key)
+        path, size = self._write_run(self.buffer)
+        self.runs.append(path)
+        # The actual size of this batch is the estimate for the next one
+        self.item_size = size // len(self.buffer)
+
+        self.spilled_count += len(self.buffer)
+        self.buffer = []
+        self.buffer_size = 0
+
+    def _write_run(self, items: typing.Iterable[T]) -> tuple[str, int]:
+        if self._directory is None:
+            self._directory = tempfile.TemporaryDirectory(
+                prefix="sso-user-list-"
+            )
+
+        path = os.path.join(self._directory.name, f"{self.run_count}.run")
+        self.run_count += 1
+        with open(path, "wb") as file:
+            for item in items:
+                pickle.dump(item, file, protocol=pickle.HIGHEST_PROTOCOL)
+            return path, file.tell()
+
+    def _merge_runs(self) -> None:
+        while len(self.runs) > self.max_open_runs:
+            runs, self.runs = self.runs, []
+            for start in range(0, len(runs), self.max_open_runs):
+                end = start + self.max_open_runs
+                group = runs[start:end]
+                if len(group) == 1:
+                    self.runs.extend(group)
+                    continue
+                path, _ = self._write_run(
+                    heapq.merge(*map(self._read_run, group), key=self.key)
+                )
+                self.runs.append(path)
+                for run in group:
+                    os.remove(run)
+
+    def __iter__(self) -> typing.Iterator[T]:
+        self._merge_runs()
+        self.buffer.sort(key=self.key)
+        return heapq.merge(
+            *[self._read_run(path) for path in self.runs],
+            list(self.buffer),
+            key=self.key,
+        )
+
+    @staticmethod
+    def _read_run(path: str) -> typing.Iterator[T]:
+        with open(path, "rb") as file:
+            while True:
+                try:
+                    yield pickle.load(file)
+                except EOFError:
+                    return
+
+    def close(self) -> None:
+        self.buffer = []
+        self.runs = []
+        if self._directory is not None:
+            self._directory.cleanup()
+            self._directory = None
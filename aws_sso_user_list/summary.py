@@ -0,0 +1,84 @@
+import typing
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import UTC, datetime, timedelta
+
+from aws_sso_user_list.table import UserTable
+from aws_sso_user_list.utils import UserWithMfaDevice
+
+VERIFIED = "VERIFIED"
+
+
+@dataclass
+class UserSummary:
+    stale_before: datetime
+    users: int = 0
+    active_users: int = 0
+    active_users_without_mfa_device: int = 0
+    unknown_mfa_users: int = 0
+    unverified_emails: int = 0
+    stale_users: int = 0
+    mfa_devices: int = 0
+    mfa_devices_by_type: Counter[str] = field(default_factory=Counter)
+
+    @classmethod
+    def from_stale_days(cls, stale_days: int) -> "UserSummary":
+        return cls(stale_before=datetime.now(UTC) - timedelta(days=stale_days))
+
+    def add(self, user: UserWithMfaDevice) -> None:
+        self.users += 1
+        if user.mfa_devices is None:
+            self.unknown_mfa_users += 1
+        elif user.active and not user.mfa_devices:
+            self.active_users_without_mfa_device += 1
+        if user.active:
+            self.active_users += 1
+        if user.email_verification_status != VERIFIED:
+            self.unverified_emails += 1
+        if user.updated_at < self.stale_before:
+            self.stale_users += 1
+        mfa_devices = user.mfa_devices or []
+        self.mfa_devices += len(mfa_devices)
+        self.mfa_devices_by_type.update(
+            mfa_device.mfa_type for mfa_device in mfa_devices
+        )
+
+    def extend(self, users: typing.Iterable[UserWithMfaDevice]) -> None:
+        for user in users:
+            self.add(user)
+
+    def extend_table(self, table: UserTable) -> None:
+        # Counted column by column, without building a user per row
+        self.users += len(table)
+        self.active_users += table.count_active()
+        self.active_users_without_mfa_device += (
+            table.count_active_without_mfa_device()
+        )
+        self.unknown_mfa_users += table.count_mfa_unknown()
+        self.unverified_emails += len(
+            table
+        ) - table.count_by_email_verification_status().get(VERIFIED, 0)
+        self.stale_users += table.count_updated_before(self.stale_before)
+        self.mfa_devices += len(table.mfa_device_ids)
+        self.mfa_devices_by_type.update(
+            {
+                mfa_type: count
+                for mfa_type, count in table.count_by_mfa_type().items()
+                if count
+            }
+        )
+
+    def to_dict(self) -> dict[str, typing.Any]:
+        return {
+            "Users": self.users,
+            "ActiveUsers": self.active_users,
+            "ActiveUsersWithoutMfaDevice": (
+                self.active_users_without_mfa_device
+            ),
+            "UnknownMfaUsers": self.unknown_mfa_users,
+            "UnverifiedEmails": self.unverified_emails,
+            "StaleUsers": self.stale_users,
+            "StaleBefore": self.stale_before.isoformat(),
+            "MfaDevices": self.mfa_devices,
+            "MfaDevicesByType": dict(sorted(self.mfa_devices_by_type.items())),
+        }
@@ -0,0 +1,218 @@
+import typing
+from array import array
+from datetime import UTC, datetime, timedelta
+
+from aws_sso_user_list.assignment import AccountAssignment
+from aws_sso_user_list.mfa_device import MfaDevice
+from aws_sso_user_list.utils import UserWithMfaDevice
+
+EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+
+
+def to_epoch_microseconds(value: datetime) -> int:
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+
+def from_epoch_microseconds(value: int) -> datetime:
+    return EPOCH + timedelta(microseconds=value)
+
+
+class StringDictionary:
+    max_size = 256
+
+    def __init__(self) -> None:
+        self.values: list[str] = []
+        self.codes: dict[str, int] = {}
+
+    def encode(self, value: str) -> int:
+        if (code := self.codes.get(value)) is None:
+            if len(self.values) >= self.max_size:
+                raise ValueError(f"too many distinct values: {value}")
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def decode(self, code: int) -> str:
+        return self.values[code]
+
+
+class UserTable(typing.Sequence[UserWithMfaDevice]):
+    def __init__(self) -> None:
+        self.active = array("B")
+        self.user_ids: list[str] = []
+        self.user_names: list[str] = []
+        self.display_names: list[str] = []
+        self.emails: list[str] = []
+        self.email_verification_statuses = array("B")
+        self.created_at = array("q")
+        self.updated_at = array("q")
+        self.mfa_device_offsets = array("q", [0])
+        self.mfa_unknown = array("B")
+        self.groups: list[list[str] | None] = []
+        self.account_assignments: list[list[AccountAssignment] | None] = []
+
+        self.mfa_device_ids: list[str] = []
+        self.mfa_device_names: list[str] = []
+        self.mfa_device_display_names: list[str | None] = []
+        self.mfa_types = array("B")
+        self.mfa_registered_dates = array("q")
+
+        self.email_verification_status_dictionary = StringDictionary()
+        self.mfa_type_dictionary = StringDictionary()
+
+    @classmethod
+    def from_users(
+        cls, users: typing.Iterable[UserWithMfaDevice]
+    ) -> "UserTable":
+        table = cls()
+        for user in users:
+            table.append(user)
+        return table
+
+    def append(self, user: UserWithMfaDevice) -> None:
+        self.active.append(user.active)
+        self.user_ids.append(user.user_id)
+        self.user_names.append(user.user_name)
+        self.display_names.append(user.display_name)
+        self.emails.append(user.email)
+        self.email_verification_statuses.append(
+            self.email_verification_status_dictionary.encode(
+                user.email_verification_status
+            )
+        )
+        self.created_at.append(to_epoch_microseconds(user.created_at))
+        self.updated_at.append(to_epoch_microseconds(user.updated_at))
+
+        self.mfa_unknown.append(user.mfa_devices is None)
+        for mfa_device in user.mfa_devices or []:
+            self.mfa_device_ids.append(mfa_device.device_id)
+            self.mfa_device_names.append(mfa_device.device_name)
+            self.mfa_device_display_names.append(mfa_device.display_name)
+            self.mfa_types.append(
+                self.mfa_type_dictionary.encode(mfa_device.mfa_type)
+            )
+            self.mfa_registered_dates.append(
+                to_epoch_microseconds(mfa_device.registered_date)
+            )
+        self.mfa_device_offsets.append(len(self.mfa_device_ids))
+        self.groups.append(user.groups)
+        self.account_assignments.append(user.account_assignments)
+
+    def __len__(self) -> int:
+        return len(self.user_ids)
+
+    @typing.overload
+    def __getitem__(self, index: int) -> UserWithMfaDevice: ...
+
+    @typing.overload
+    def __getitem__(self, index: slice) -> list[UserWithMfaDevice]: ...
+
+    def __getitem__(
+        self, index: int | slice
+    ) -> UserWithMfaDevice | list[UserWithMfaDevice]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+
+        return UserWithMfaDevice(
+            active=bool(self.active[index]),
+            user_id=self.user_ids[index],
+            user_name=self.user_names[index],
+            display_name=self.display_names[index],
+            email=self.emails[index],
+            email_verification_status=(
+                self.email_verification_status_dictionary.decode(
+                    self.email_verification_statuses[index]
+                )
+            ),
+            created_at=from_epoch_microseconds(self.created_at[index]),
+            updated_at=from_epoch_microseconds(self.updated_at[index]),
+            mfa_devices=(
+                [
+                    self._mfa_device(i)
+                    for i in range(
+                        self.mfa_device_offsets[index],
+                        self.mfa_device_offsets[index + 1],
+                    )
+                ]
+                if not self.mfa_unknown[index]
+                else None
+            ),
+            groups=self.groups[index],
+            account_assignments=self.account_assignments[index],
+        )
+
+    def _mfa_device(self, index: int) -> MfaDevice:
+        return MfaDevice(
+            device_id=self.mfa_device_ids[index],
+            device_name=self.mfa_device_names[index],
+            display_name=self.mfa_device_display_names[index],
+            mfa_type=self.mfa_type_dictionary.decode(self.mfa_types[index]),
+            registered_date=from_epoch_microseconds(
+                self.mfa_registered_dates[index]
+            ),
+        )
+
+    def __iter__(self) -> typing.Iterator[UserWithMfaDevice]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def mfa_device_counts(self) -> list[int]:
+        offsets = self.mfa_device_offsets
+        return [end - start for start, end in zip(offsets, offsets[1:])]
+
+    def mfa_device_count_column(self) -> list[int | None]:
+        return [
+            None if unknown else count
+            for unknown, count in zip(
+                self.mfa_unknown, self.mfa_device_counts()
+            )
+        ]
+
+    def email_verification_status_column(self) -> list[str]:
+        values = self.email_verification_status_dictionary.values
+        return [values[code] for code in self.email_verification_statuses]
+
+    def count_active(self) -> int:
+        return self.active.tobytes().count(1)
+
+    def count_active_without_mfa_device(self) -> int:
+        offsets = self.mfa_device_offsets
+        return sum(
+            1
+            for active, unknown, start, end in zip(
+                self.active, self.mfa_unknown, offsets, offsets[1:]
+            )
+            if active and not unknown and start == end
+        )
+
+    def count_mfa_unknown(self) -> int:
+        return self.mfa_unknown.tobytes().count(1)
+
+    def count_updated_before(self, value: datetime) -> int:
+        threshold = to_epoch_microseconds(value)
+        return sum(
+            1 for updated_at in self.updated_at if updated_at < threshold
+        )
+
+    def count_by_email_verification_status(self) -> dict[str, int]:
+        return self._count_codes(
+            self.email_verification_statuses,
+            self.email_verification_status_dictionary,
+        )
+
+    def count_by_mfa_type(self) -> dict[str, int]:
+        return self._count_codes(self.mfa_types, self.mfa_type_dictionary)
+
+    @staticmethod
+    def _count_codes(
+        codes: array, dictionary: StringDictionary
+    ) -> dict[str, int]:
+        data = codes.tobytes()
+        return {
+            value: data.count(code)
+            for code, value in enumerate(dictionary.values)
+        }
@@ -0,0 +1,210 @@
+import contextvars
+import json
+import os
+import threading
+import time
+import typing
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+import requests
+
+SERVICE_NAME = "sso-user-list"
+
+T = typing.TypeVar("T")
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_span_id: str | None
+    start_time: int
+    end_time: int | None = None
+    thread_id: int = 0
+    attributes: dict[str, typing.Any] = field(default_factory=dict)
+
+    def set_attribute(self, key: str, value: typing.Any) -> None:
+        self.attributes[key] = value
+
+
+class NoopSpan:
+    def set_attribute(self, key: str, value: typing.Any) -> None:
+        pass
+
+
+NOOP_SPAN = NoopSpan()
+
+_current_span: contextvars.ContextVar[Span | None] = contextvars.ContextVar(
+    "current_span", default=None
+)
+
+
+class Tracer:
+    def __init__(self) -> None:
+        self.trace_id = os.urandom(16).hex()
+        self.spans: list[Span] = []
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def span(
+        self, name: str, **attributes: typing.Any
+    ) -> typing.Iterator[Span]:
+        parent = _current_span.get()
+        span = Span(
+            name=name,
+            trace_id=self.trace_id,
+            span_id=os.urandom(8).hex(),
+            parent_span_id=parent.span_id if parent is not None else None,
+            start_time=time.time_ns(),
+            thread_id=threading.get_ident(),
+            attributes=attributes,
+        )
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.set_attribute("error", repr(e))
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end_time = time.time_ns()
+            with self.lock:
+                self.spans.append(span)
+
+    def to_chrome_trace(self) -> dict:
+        spans = sorted(self.spans, key=lambda span: span.start_time)
+        return {
+            "traceEvents": [chrome_trace_event(span) for span in spans],
+            "displayTimeUnit": "ms",
+        }
+
+    def to_otlp(self) -> dict:
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": otlp_attributes(
+                            {"service.name": SERVICE_NAME}
+                        ),
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": __package__},
+                            "spans": [otlp_span(span) for span in self.spans],
+                        }
+                    ],
+                }
+            ]
+        }
+
+    def write_json(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.to_chrome_trace(), file, default=str)
+
+    def send_otlp(self, endpoint: str) -> None:
+        response = requests.post(
+            endpoint.rstrip("/") + "/v1/traces",
+            data=json.dumps(self.to_otlp(), default=str),
+            headers={"Content-Type": "application/json"},
+            timeout=10,
+        )
+        response.raise_for_status()
+
+
+def chrome_trace_event(span: Span) -> dict:
+    end_time = span.end_time or span.start_time
+    return {
+        "name": span.name,
+        "ph": "X",
+        "ts": span.start_time / 1000,
+        "dur": (end_time - span.start_time) / 1000,
+        "pid": os.getpid(),
+        "tid": span.thread_id,
+        "args": span.attributes,
+    }
+
+
+def otlp_value(value: typing.Any) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def otlp_attributes(attributes: dict[str, typing.Any]) -> list[dict]:
+    return [
+        {"key": key, "value": otlp_value(value)}
+        for key, value in attributes.items()
+    ]
+
+
+def otlp_span(span: Span) -> dict:
+    data = {
+        "traceId": span.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        "kind": 1,
+        "startTimeUnixNano": str(span.start_time),
+        "endTimeUnixNano": str(span.end_time or span.start_time),
+        "attributes": otlp_attributes(span.attributes),
+    }
+    if span.parent_span_id is not None:
+        data["parentSpanId"] = span.parent_span_id
+    if "error" in span.attributes:
+        data["status"] = {"code": 2, "message": span.attributes["error"]}
+    return data
+
+
+_active: Tracer | None = None
+
+
+def active() -> Tracer | None:
+    return _active
+
+
+@contextmanager
+def collect(
+    path: str | None, otlp_endpoint: str | None = None
+) -> typing.Iterator[Tracer | None]:
+    global _active
+
+    if path is None and otlp_endpoint is None:
+        yield None
+        return
+
+    tracer = _active = Tracer()
+    try:
+        yield tracer
+    finally:
+        _active = None
+        if path is not None:
+            tracer.write_json(path)
+        if otlp_endpoint is not None:
+            tracer.send_otlp(otlp_endpoint)
+
+
+@contextmanager
+def span(
+    name: str, **attributes: typing.Any
+) -> typing.Iterator[Span | NoopSpan]:
+    if _active is None:
+        yield NOOP_SPAN
+        return
+
+    with _active.span(name, **attributes) as span_:
+        yield span_
+
+
+def wrap(function: typing.Callable[..., T]) -> typing.Callable[..., T]:
+    # Carry the current span into executor threads
+    context = contextvars.copy_context()
+
+    def wrapper(*args: typing.Any, **kwargs: typing.Any) -> T:
+        return context.run(function, *args, **kwargs)
+
+    return wrapper
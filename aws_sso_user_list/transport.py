@@ -0,0 +1,285 @@
+import json
+import os
+import random
+import time
+import typing
+from dataclasses import dataclass
+
+import requests
+from botocore.auth import SigV4Auth
+from botocore.awsrequest import AWSRequest
+
+from aws_sso_user_list import metrics, progress, tracing
+from aws_sso_user_list.hedging import Hedge
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+
+@dataclass
+class TransportResponse:
+    status_code: int
+    content: bytes
+
+    def json(self) -> typing.Any:
+        return json.loads(self.content)
+
+    @property
+    def throttled(self) -> bool:
+        if self.status_code == 429:
+            return True
+        if self.status_code != 400:
+            return False
+        try:
+            error_type = str(self.json().get("__type", ""))
+        except (ValueError, AttributeError):
+            return False
+        return error_type.split("#")[-1] in THROTTLING_ERROR_TYPES
+
+    @property
+    def retryable(self) -> bool:
+        return self.throttled or self.status_code in RETRYABLE_STATUS_CODES
+
+
+THROTTLING_ERROR_TYPES = {
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "RequestLimitExceeded",
+}
+RETRYABLE_STATUS_CODES = {500, 502, 503, 504}
+HEDGED_TARGETS = {"BatchListMfaDevicesForUser"}
+CONNECT_TIMEOUT = 10.0
+READ_TIMEOUT = 60.0
+MAX_RETRIES = 3
+BACKOFF = 0.5
+MAX_BACKOFF = 10.0
+
+
+class TransportTimeoutError(TimeoutError):
+    pass
+
+
+def request_target(headers: typing.Mapping[str, str]) -> str:
+    return headers.get("X-Amz-Target", "").split(".")[-1] or "unknown"
+
+
+class BaseTransport:
+    def __init__(
+        self,
+        connect_timeout: float = CONNECT_TIMEOUT,
+        read_timeout: float = READ_TIMEOUT,
+        hedge: Hedge | None = None,
+        max_retries: int = MAX_RETRIES,
+        backoff: float = BACKOFF,
+        max_backoff: float = MAX_BACKOFF,
+    ) -> None:
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.hedge = hedge
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def __enter__(self) -> "BaseTransport":
+        return self
+
+    def __exit__(self, *args: typing.Any) -> None:
+        self.close()
+
+    def post(
+        self, url: str, headers: typing.Mapping[str, str], data: str
+    ) -> TransportResponse:
+        target = request_target(headers)
+        with tracing.span(
+            f"POST {target}", target=target, request_bytes=len(data)
+        ) as span:
+            response = self._post_with_retry(
+                target,
+                url,
+                headers,
+                data,
+                hedged=self.hedge is not None and target in HEDGED_TARGETS,
+            )
+            span.set_attribute("status_code", response.status_code)
+            span.set_attribute("response_bytes", len(response.content))
+        return response
+
+    def _post_with_retry(
+        self,
+        target: str,
+        url: str,
+        headers: typing.Mapping[str, str],
+        data: str,
+        hedged: bool = False,
+    ) -> TransportResponse:
+        attempt = 0
+        while True:
+            progress.increment("requests")
+            started_at = time.perf_counter()
+            try:
+                response = self._send(url, headers, data, hedged)
+            except TransportTimeoutError:
+                if active_metrics := metrics.active():
+                    active_metrics.observe_request(
+                        target, None, time.perf_counter() - started_at
+                    )
+                if attempt >= self.max_retries:
+                    raise
+            else:
+                if active_metrics := metrics.active():
+                    active_metrics.observe_request(
+                        target,
+                        response.status_code,
+                        time.perf_counter() - started_at,
+                    )
+                    if response.throttled:
+                        active_metrics.observe_throttle(target)
+                if response.throttled:
+                    # A duplicate request would only add to the throttling
+                    hedged = False
+
+                if not response.retryable or attempt >= self.max_retries:
+                    return response
+
+            if active_metrics := metrics.active():
+                active_metrics.observe_retry(target)
+            time.sleep(
+                random.uniform(
+                    0, min(self.max_backoff, self.backoff * 2**attempt)
+                )
+            )
+            attempt += 1
+
+    def _send(
+        self,
+        url: str,
+        headers: typing.Mapping[str, str],
+        data: str,
+        hedged: bool,
+    ) -> TransportResponse:
+        # Only single attempts are hedged, never the backoff between them
+        if hedged and self.hedge is not None:
+            return self.hedge.call(
+                self.send,
+                url,
+                headers,
+                data,
+                succeeded=lambda response: not response.retryable,
+            )
+        return self.send(url, headers=headers, data=data)
+
+    def send(
+        self, url: str, headers: typing.Mapping[str, str], data: str
+    ) -> TransportResponse:
+        raise NotImplementedError()
+
+    def close(self) -> None:
+        if self.hedge is not None:
+            self.hedge.close()
+
+
+class RequestsTransport(BaseTransport):
+    def send(
+        self, url: str, headers: typing.Mapping[str, str], data: str
+    ) -> TransportResponse:
+        try:
+            response = requests.post(
+                url,
+                headers=headers,
+                data=data,
+                timeout=(self.connect_timeout, self.read_timeout),
+            )
+        except requests.Timeout as e:
+            raise TransportTimeoutError(str(e)) from e
+        return TransportResponse(
+            status_code=response.status_code,
+            content=response.content,
+        )
+
+
+class Http2Transport(BaseTransport):
+    def __init__(
+        self,
+        connect_timeout: float = CONNECT_TIMEOUT,
+        read_timeout: float = READ_TIMEOUT,
+        hedge: Hedge | None = None,
+        max_retries: int = MAX_RETRIES,
+        backoff: float = BACKOFF,
+        max_backoff: float = MAX_BACKOFF,
+    ) -> None:
+        super().__init__(
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            hedge=hedge,
+            max_retries=max_retries,
+            backoff=backoff,
+            max_backoff=max_backoff,
+        )
+        if httpx is None:
+            raise RuntimeError(
+                "HTTP/2 transport requires httpx: "
+                "pip install 'aws-sso-user-list[http2]'"
+            )
+        try:
+            self.client = httpx.Client(
+                http2=True,
+                timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            )
+        except ImportError as e:
+            raise RuntimeError(
+                "HTTP/2 transport requires h2: "
+                "pip install 'aws-sso-user-list[http2]'"
+            ) from e
+
+    def send(
+        self, url: str, headers: typing.Mapping[str, str], data: str
+    ) -> TransportResponse:
+        try:
+            response = self.client.post(
+                url, headers=dict(headers), content=data
+            )
+        except httpx.TimeoutException as e:
+            raise TransportTimeoutError(str(e)) from e
+        return TransportResponse(
+            status_code=response.status_code,
+            content=response.content,
+        )
+
+    def close(self) -> None:
+        super().close()
+        self.client.close()
+
+
+def use_placeholder_credentials(value: str) -> None:
+    # Requests are still signed, but the signature is never checked
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", value)
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", value)
+
+
+def post_signed(
+    sigv4_auth: SigV4Auth,
+    url: str,
+    target: str,
+    body: dict,
+    transport: BaseTransport | None = None,
+    content_type: str = "application/x-amz-json-1.1",
+) -> typing.Any:
+    headers = {"Content-Type": content_type, "X-Amz-Target": target}
+    data = json.dumps(body)
+    request = AWSRequest(
+        method="POST",
+        url=url,
+        data=data,
+        headers=headers,
+    )
+    sigv4_auth.add_auth(request)
+    prepped = request.prepare()
+
+    response = (transport or RequestsTransport()).post(
+        prepped.url,
+        headers=prepped.headers,
+        data=data,
+    )
+    return response.json()
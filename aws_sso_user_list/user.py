@@ -1,12 +1,29 @@
-import json
+import string
+import typing
+import warnings
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import UTC, datetime
+from functools import cached_property
+from itertools import islice
 
-import requests
 from botocore.auth import SigV4Auth
-from botocore.awsrequest import AWSRequest
 from botocore.session import Session
 
+from aws_sso_user_list import metrics, progress, tracing
+from aws_sso_user_list.concurrency import bounded_map
+from aws_sso_user_list.lazy import LazyRecord
+from aws_sso_user_list.transport import BaseTransport, post_signed
+
+# First characters of user names, letters in both cases since the filter
+# may compare them case-sensitively. Duplicates across shards are dropped.
+SHARD_PREFIXES = tuple(string.ascii_letters + string.digits + "+=,.@_-")
+DESCRIBE_USERS_BATCH_SIZE = 100
+
+
+class ShardedScanWarning(UserWarning):
+    pass
+
 
 @dataclass
 class User:
@@ -21,23 +38,56 @@ class User:
 
     @classmethod
     def from_data(cls, data: dict) -> "User":
-        primary_email = [
+        return LazyUser(data)
+
+
+class LazyUser(LazyRecord, User):
+    record_class = User
+
+    def __init__(self, data: dict) -> None:
+        self.data = data
+
+    @cached_property
+    def active(self) -> bool:  # type: ignore[override]
+        return self.data["Active"]
+
+    @cached_property
+    def user_id(self) -> str:  # type: ignore[override]
+        return self.data["UserId"]
+
+    @cached_property
+    def user_name(self) -> str:  # type: ignore[override]
+        return self.data["UserName"]
+
+    @cached_property
+    def display_name(self) -> str:  # type: ignore[override]
+        return self.data["UserAttributes"]["displayName"]["StringValue"]
+
+    @cached_property
+    def primary_email(self) -> dict:
+        return [
             email
-            for email in data["UserAttributes"]["emails"]["ComplexListValue"]
+            for email in self.data["UserAttributes"]["emails"][
+                "ComplexListValue"
+            ]
             if email["primary"]["BooleanValue"] is True
         ][0]
-        return cls(
-            active=data["Active"],
-            user_id=data["UserId"],
-            user_name=data["UserName"],
-            display_name=data["UserAttributes"]["displayName"]["StringValue"],
-            email=primary_email["value"]["StringValue"],
-            email_verification_status=primary_email["verificationStatus"][
-                "StringValue"
-            ],
-            created_at=datetime.fromtimestamp(data["Meta"]["CreatedAt"], UTC),
-            updated_at=datetime.fromtimestamp(data["Meta"]["UpdatedAt"], UTC),
-        )
+
+    @cached_property
+    def email(self) -> str:  # type: ignore[override]
+        return self.primary_email["value"]["StringValue"]
+
+    @cached_property
+    def email_verification_status(self) -> str:  # type: ignore[override]
+        return self.primary_email["verificationStatus"]["StringValue"]
+
+    @cached_property
+    def created_at(self) -> datetime:  # type: ignore[override]
+        return datetime.fromtimestamp(self.data["Meta"]["CreatedAt"], UTC)
+
+    @cached_property
+    def updated_at(self) -> datetime:  # type: ignore[override]
+        return datetime.fromtimestamp(self.data["Meta"]["UpdatedAt"], UTC)
 
 
 def _fetch_users(
@@ -45,55 +95,312 @@ def _fetch_users(
     identity_store_id: str,
     region: str,
     next_token: str,
+    transport: BaseTransport | None = None,
+    filters: list[dict] | None = None,
 ) -> dict:
-    endpoint = f"https://up.sso.{region}.amazonaws.com/identitystore/"
-    headers = {
-        "Content-Type": "application/x-amz-json-1.1",
-        "X-Amz-Target": "AWSIdentityStoreService.SearchUsers",
+    body: dict[str, typing.Any] = {
+        "IdentityStoreId": identity_store_id,
+        "MaxResults": 100,
+        "NextToken": next_token,
     }
-    data = json.dumps(
-        {
-            "IdentityStoreId": identity_store_id,
-            "MaxResults": 100,
-            "NextToken": next_token,
-        }
+    if filters:
+        body["Filters"] = filters
+    return _post_identity_store_service(
+        sigv4_auth=sigv4_auth,
+        region=region,
+        target="SearchUsers",
+        body=body,
+        transport=transport,
     )
-    request = AWSRequest(
-        method="POST",
-        url=endpoint,
-        data=data,
-        headers=headers,
+
+
+def _describe_users(
+    sigv4_auth: SigV4Auth,
+    identity_store_id: str,
+    region: str,
+    user_ids: list[str],
+    transport: BaseTransport | None = None,
+) -> dict:
+    return _post_identity_store_service(
+        sigv4_auth=sigv4_auth,
+        region=region,
+        target="DescribeUsers",
+        body={"IdentityStoreId": identity_store_id, "UserIds": user_ids},
+        transport=transport,
     )
-    sigv4_auth.add_auth(request)
-    prepped = request.prepare()
 
-    response = requests.post(
-        prepped.url,
-        headers=prepped.headers,
-        data=data,
+
+def _post_identity_store_service(
+    sigv4_auth: SigV4Auth,
+    region: str,
+    target: str,
+    body: dict,
+    transport: BaseTransport | None = None,
+) -> dict:
+    return post_signed(
+        sigv4_auth=sigv4_auth,
+        url=f"https://up.sso.{region}.amazonaws.com/identitystore/",
+        target=f"AWSIdentityStoreService.{target}",
+        body=body,
+        transport=transport,
     )
-    response_data = response.json()
 
-    return response_data
 
+def _iter_user_pages(
+    sigv4_auth: SigV4Auth,
+    identity_store_id: str,
+    region: str,
+    transport: BaseTransport | None = None,
+    next_token: str | None = None,
+    filters: list[dict] | None = None,
+) -> typing.Iterator[dict]:
+    page = 0
+    while True:
+        page += 1
+        with tracing.span("_fetch_users", page=page) as page_span:
+            response = _fetch_users(
+                sigv4_auth=sigv4_auth,
+                identity_store_id=identity_store_id,
+                region=region,
+                next_token=next_token,
+                transport=transport,
+                filters=filters,
+            )
+            user_count = len(response.get("Users", ()))
+            page_span.set_attribute("users", user_count)
+        progress.increment("pages")
+        if page == 1 and not filters and "TotalUserCount" in response:
+            progress.set_total_users(response["TotalUserCount"])
+        if not response:
+            break
+        yield response
+        if not (next_token := response.get("NextToken")):
+            break
 
-def fetch_all_users(identity_store_id: str, region: str) -> list[User]:
+
+def iter_all_users(
+    identity_store_id: str,
+    region: str,
+    transport: BaseTransport | None = None,
+    sharded: bool = False,
+    max_workers: int = 1,
+) -> typing.Iterator[User]:
     sigv4_auth = SigV4Auth(
         credentials=Session().get_credentials(),
         service_name="identitystore",
         region_name=region,
     )
+    if sharded:
+        yield from _iter_all_users_sharded(
+            sigv4_auth=sigv4_auth,
+            identity_store_id=identity_store_id,
+            region=region,
+            transport=transport,
+            max_workers=max_workers,
+        )
+        return
 
-    users: list[User] = []
-    next_token = None
-    while response := _fetch_users(
-        sigv4_auth=sigv4_auth,
-        identity_store_id=identity_store_id,
-        region=region,
-        next_token=next_token,
+    with tracing.span("fetch_all_users") as span:
+        pages = 0
+        for response in _iter_user_pages(
+            sigv4_auth=sigv4_auth,
+            identity_store_id=identity_store_id,
+            region=region,
+            transport=transport,
+        ):
+            pages += 1
+            metrics.increment("users", len(response["Users"]))
+            progress.increment("users", len(response["Users"]))
+            yield from (User.from_data(user) for user in response["Users"])
+        span.set_attribute("pages", pages)
+
+
+def _iter_all_users_sharded(
+    sigv4_auth: SigV4Auth,
+    identity_store_id: str,
+    region: str,
+    transport: BaseTransport | None = None,
+    max_workers: int = 1,
+    prefixes: typing.Sequence[str] = SHARD_PREFIXES,
+) -> typing.Iterator[User]:
+    seen_user_ids: set[str] = set()
+
+    def parse(response: dict) -> list[User]:
+        users = [
+            User.from_data(user)
+            for user in response["Users"]
+            if user["UserId"] not in seen_user_ids
+        ]
+        seen_user_ids.update(user.user_id for user in users)
+        metrics.increment("users", len(users))
+        progress.increment("users", len(users))
+        return users
+
+    def fetch_shard(prefix: str) -> list[dict]:
+        with tracing.span("fetch_users_shard", prefix=prefix):
+            return list(
+                _iter_user_pages(
+                    sigv4_auth=sigv4_auth,
+                    identity_store_id=identity_store_id,
+                    region=region,
+                    transport=transport,
+                    filters=[
+                        {"AttributePath": "UserName", "AttributeValue": prefix}
+                    ],
+                )
+            )
+
+    with tracing.span(
+        "fetch_all_users_sharded",
+        shards=len(prefixes),
+        max_workers=max_workers,
+    ) as span:
+        # The first unfiltered page gives the total to check the shards against
+        first_pages = _iter_user_pages(
+            sigv4_auth=sigv4_auth,
+            identity_store_id=identity_store_id,
+            region=region,
+            transport=transport,
+        )
+        first_page = next(first_pages, None)
+        if first_page is None:
+            return
+        yield from parse(first_page)
+        if not first_page.get("NextToken"):
+            return
+        total_user_count = first_page.get("TotalUserCount")
+        if total_user_count is None:
+            # Without a total the shards cannot be checked, so scan instead
+            warnings.warn(
+                "Sharded scan skipped: the directory does not report its "
+                "total user count",
+                ShardedScanWarning,
+            )
+            span.set_attribute("fallback", True)
+            for response in first_pages:
+                yield from parse(response)
+            return
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(tracing.wrap(fetch_shard), prefix)
+                for prefix in prefixes
+            ]
+            for future in futures:
+                for response in future.result():
+                    yield from parse(response)
+
+        fallback = len(seen_user_ids) < total_user_count
+        span.set_attribute("fallback", fallback)
+        if fallback:
+            warnings.warn(
+                f"Sharded scan found {len(seen_user_ids)} of "
+                f"{total_user_count} users, scanning sequentially",
+                ShardedScanWarning,
+            )
+            for response in first_pages:
+                yield from parse(response)
+
+
+def iter_users_by_ids(
+    identity_store_id: str,
+    region: str,
+    user_ids: typing.Iterable[str],
+    transport: BaseTransport | None = None,
+    max_workers: int = 1,
+) -> typing.Iterator[User]:
+    sigv4_auth = SigV4Auth(
+        credentials=Session().get_credentials(),
+        service_name="identitystore",
+        region_name=region,
+    )
+
+    def fetch(batch: list[str]) -> list[User]:
+        with tracing.span("_describe_users", batch_size=len(batch)):
+            response = _describe_users(
+                sigv4_auth=sigv4_auth,
+                identity_store_id=identity_store_id,
+                region=region,
+                user_ids=batch,
+                transport=transport,
+            )
+        users = [User.from_data(user) for user in response["Users"]]
+        metrics.increment("users", len(users))
+        progress.increment("users", len(users))
+        return users
+
+    user_id_iter = iter(dict.fromkeys(user_ids))
+    batches = iter(
+        lambda: list(islice(user_id_iter, DESCRIBE_USERS_BATCH_SIZE)), []
+    )
+    with (
+        tracing.span("fetch_users_by_ids", max_workers=max_workers),
+        ThreadPoolExecutor(max_workers=max_workers) as executor,
     ):
-        users += [User.from_data(user) for user in response["Users"]]
-        if not (next_token := response.get("NextToken")):
-            break
+        for _, future in bounded_map(executor, fetch, batches, max_workers):
+            yield from future.result()
+
 
-    return users
+def iter_users_by_names(
+    identity_store_id: str,
+    region: str,
+    user_names: typing.Iterable[str],
+    transport: BaseTransport | None = None,
+    max_workers: int = 1,
+) -> typing.Iterator[User]:
+    sigv4_auth = SigV4Auth(
+        credentials=Session().get_credentials(),
+        service_name="identitystore",
+        region_name=region,
+    )
+
+    def fetch(user_name: str) -> list[User]:
+        with tracing.span("fetch_users_by_name", user_name=user_name):
+            # The filter may also match other user names with the same prefix
+            users = [
+                User.from_data(user)
+                for response in _iter_user_pages(
+                    sigv4_auth=sigv4_auth,
+                    identity_store_id=identity_store_id,
+                    region=region,
+                    transport=transport,
+                    filters=[
+                        {
+                            "AttributePath": "UserName",
+                            "AttributeValue": user_name,
+                        }
+                    ],
+                )
+                for user in response["Users"]
+                if user["UserName"].casefold() == user_name.casefold()
+            ]
+        metrics.increment("users", len(users))
+        progress.increment("users", len(users))
+        return users
+
+    with (
+        tracing.span("fetch_users_by_names", max_workers=max_workers),
+        ThreadPoolExecutor(max_workers=max_workers) as executor,
+    ):
+        for _, future in bounded_map(
+            executor, fetch, dict.fromkeys(user_names), max_workers
+        ):
+            yield from future.result()
+
+
+def fetch_all_users(
+    identity_store_id: str,
+    region: str,
+    transport: BaseTransport | None = None,
+    sharded: bool = False,
+    max_workers: int = 1,
+) -> list[User]:
+    return list(
+        iter_all_users(
+            identity_store_id=identity_store_id,
+            region=region,
+            transport=transport,
+            sharded=sharded,
+            max_workers=max_workers,
+        )
+    )
@@ -1,12 +1,36 @@
-from dataclasses import asdict, dataclass
+import typing
+from dataclasses import asdict, dataclass, replace
 from datetime import datetime
+from functools import cached_property
+from itertools import chain
+from operator import attrgetter
 
+from aws_sso_user_list import metrics, tracing
+from aws_sso_user_list.assignment import (
+    AccountAssignment,
+    iter_all_account_assignments,
+)
+from aws_sso_user_list.failures import FailureReport
+from aws_sso_user_list.group import GroupMemberships, iter_all_groups
+from aws_sso_user_list.lazy import LazyRecord
 from aws_sso_user_list.mfa_device import (
+    MFA_BATCH_SIZE,
     MfaDevice,
     UserMfa,
     fetch_all_mfa_devices,
+    iter_all_mfa_devices,
+)
+from aws_sso_user_list.spill import MEMORY_LIMIT, SpillBuffer
+from aws_sso_user_list.transport import BaseTransport
+from aws_sso_user_list.user import (
+    User,
+    fetch_all_users,
+    iter_all_users,
+    iter_users_by_ids,
+    iter_users_by_names,
 )
-from aws_sso_user_list.user import User, fetch_all_users
+
+SORT_MEMORY_LIMIT = MEMORY_LIMIT
 
 
 @dataclass
@@ -19,18 +43,96 @@ class UserWithMfaDevice:
     email_verification_status: str
     created_at: datetime
     updated_at: datetime
-    mfa_devices: list[MfaDevice]
+    mfa_devices: list[MfaDevice] | None
+    groups: list[str] | None = None
+    account_assignments: list[AccountAssignment] | None = None
 
     @classmethod
     def from_user_and_user_mfa(
         cls, user: User, user_mfa: UserMfa
     ) -> "UserWithMfaDevice":
         assert user.user_id == user_mfa.user_id
+        return LazyUserWithMfaDevice.from_user(
+            user=user, mfa_devices=user_mfa.mfa_devices
+        )
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "UserWithMfaDevice":
         return cls(
-            mfa_devices=user_mfa.mfa_devices,
-            **asdict(user),
+            active=data["active"],
+            user_id=data["user_id"],
+            user_name=data["user_name"],
+            display_name=data["display_name"],
+            email=data["email"],
+            email_verification_status=data["email_verification_status"],
+            created_at=datetime.fromisoformat(data["created_at"]),
+            updated_at=datetime.fromisoformat(data["updated_at"]),
+            mfa_devices=(
+                [
+                    MfaDevice.from_dict(mfa_device)
+                    for mfa_device in data["mfa_devices"]
+                ]
+                if data["mfa_devices"] is not None
+                else None
+            ),
+            groups=data.get("groups"),
+            account_assignments=(
+                [
+                    AccountAssignment.from_dict(account_assignment)
+                    for account_assignment in data["account_assignments"]
+                ]
+                if data.get("account_assignments") is not None
+                else None
+            ),
         )
 
+    def to_dict(self) -> dict[str, typing.Any]:
+        data = asdict(self)
+        for name in ("groups", "account_assignments"):
+            if data[name] is None:
+                del data[name]
+        return data
+
+
+class LazyUserWithMfaDevice(LazyRecord, UserWithMfaDevice):
+    record_class = UserWithMfaDevice
+    user: User
+
+    @classmethod
+    def from_user(
+        cls, user: User, mfa_devices: list[MfaDevice] | None
+    ) -> "LazyUserWithMfaDevice":
+        # Bypass __init__ so that dataclasses.replace() still builds a copy
+        self = cls.__new__(cls)
+        self.user = user
+        self.mfa_devices = mfa_devices
+        return self
+
+    active = cached_property(attrgetter("user.active"))
+    user_id = cached_property(attrgetter("user.user_id"))
+    user_name = cached_property(attrgetter("user.user_name"))
+    display_name = cached_property(attrgetter("user.display_name"))
+    email = cached_property(attrgetter("user.email"))
+    email_verification_status = cached_property(
+        attrgetter("user.email_verification_status")
+    )
+    created_at = cached_property(attrgetter("user.created_at"))
+    updated_at = cached_property(attrgetter("user.updated_at"))
+
+
+SORT_KEYS: dict[str, typing.Callable[[UserWithMfaDevice], typing.Any]] = {
+    "user_id": attrgetter("user_id"),
+    "user_name": attrgetter("user_name"),
+    "display_name": attrgetter("display_name"),
+    "email": attrgetter("email"),
+    "created_at": attrgetter("created_at"),
+    "updated_at": attrgetter("updated_at"),
+    # Users whose MFA devices are unknown sort before users without any
+    "mfa_device_count": lambda user: (
+        len(user.mfa_devices) if user.mfa_devices is not None else -1
+    ),
+}
+
 
 def combine_user_and_user_mfa(
     users: list[User], user_mfas: list[UserMfa]
@@ -45,17 +147,378 @@ def combine_user_and_user_mfa(
     return user_with_mfa_device
 
 
-def fetch_all_user_with_mfa_device(
-    identity_store_id: str, region: str
-) -> list[UserWithMfaDevice]:
-    users = fetch_all_users(identity_store_id=identity_store_id, region=region)
-    user_mfas = fetch_all_mfa_devices(
+def merge_join_user_and_user_mfa(
+    users: typing.Iterable[User], user_mfas: typing.Iterable[UserMfa]
+) -> typing.Iterator[UserWithMfaDevice]:
+    user_mfa_iter = iter(user_mfas)
+    user_mfa = next(user_mfa_iter, None)
+    for user in users:
+        while user_mfa is not None and user_mfa.user_id < user.user_id:
+            user_mfa = next(user_mfa_iter, None)
+        if user_mfa is None or user_mfa.user_id != user.user_id:
+            raise KeyError(user.user_id)
+        yield UserWithMfaDevice.from_user_and_user_mfa(
+            user=user, user_mfa=user_mfa
+        )
+
+
+def iter_selected_users(
+    identity_store_id: str,
+    region: str,
+    transport: BaseTransport | None = None,
+    sharded: bool = False,
+    max_workers: int = 1,
+    user_ids: list[str] | None = None,
+    user_names: list[str] | None = None,
+) -> typing.Iterator[User]:
+    if user_ids is None and user_names is None:
+        yield from iter_all_users(
+            identity_store_id=identity_store_id,
+            region=region,
+            transport=transport,
+            sharded=sharded,
+            max_workers=max_workers,
+        )
+        return
+
+    seen_user_ids: set[str] = set()
+    users = chain(
+        iter_users_by_ids(
+            identity_store_id=identity_store_id,
+            region=region,
+            user_ids=user_ids or [],
+            transport=transport,
+            max_workers=max_workers,
+        ),
+        iter_users_by_names(
+            identity_store_id=identity_store_id,
+            region=region,
+            user_names=user_names or [],
+            transport=transport,
+            max_workers=max_workers,
+        ),
+    )
+    for user in users:
+        if user.user_id not in seen_user_ids:
+            seen_user_ids.add(user.user_id)
+            yield user
+
+
+def iter_with_groups(
+    identity_store_id: str,
+    region: str,
+    users: typing.Iterable[UserWithMfaDevice],
+    transport: BaseTransport | None = None,
+    max_workers: int = 1,
+    memberships: GroupMemberships | None = None,
+) -> typing.Iterator[UserWithMfaDevice]:
+    pending_users: dict[str, UserWithMfaDevice] = {}
+
+    def iter_user_ids() -> typing.Iterator[str]:
+        for user in users:
+            pending_users[user.user_id] = user
+            yield user.user_id
+
+    for user_groups in iter_all_groups(
         identity_store_id=identity_store_id,
         region=region,
-        user_ids=[user.user_id for user in users],
-    )
-    user_with_mfa_device = combine_user_and_user_mfa(
-        users=users, user_mfas=user_mfas
-    )
+        user_ids=iter_user_ids(),
+        transport=transport,
+        max_workers=max_workers,
+        memberships=memberships,
+    ):
+        yield replace(
+            pending_users.pop(user_groups.user_id),
+            groups=user_groups.group_names,
+        )
+
+
+def iter_with_account_assignments(
+    identity_store_id: str,
+    region: str,
+    instance_arn: str,
+    users: typing.Iterable[UserWithMfaDevice],
+    transport: BaseTransport | None = None,
+    max_workers: int = 1,
+    memberships: GroupMemberships | None = None,
+) -> typing.Iterator[UserWithMfaDevice]:
+    pending_users: dict[str, UserWithMfaDevice] = {}
+
+    def iter_user_ids() -> typing.Iterator[str]:
+        for user in users:
+            pending_users[user.user_id] = user
+            yield user.user_id
+
+    for user_account_assignments in iter_all_account_assignments(
+        identity_store_id=identity_store_id,
+        region=region,
+        instance_arn=instance_arn,
+        user_ids=iter_user_ids(),
+        transport=transport,
+        max_workers=max_workers,
+        memberships=memberships,
+    ):
+        yield replace(
+            pending_users.pop(user_account_assignments.user_id),
+            account_assignments=user_account_assignments.account_assignments,
+        )
+
+
+def fetch_all_user_with_mfa_device(
+    identity_store_id: str,
+    region: str,
+    transport: BaseTransport | None = None,
+    max_workers: int = 1,
+    sharded: bool = False,
+    with_groups: bool = False,
+    instance_arn: str | None = None,
+    failures: FailureReport | None = None,
+    user_ids: list[str] | None = None,
+    user_names: list[str] | None = None,
+    mfa_batch_size: int = MFA_BATCH_SIZE,
+) -> list[UserWithMfaDevice]:
+    with metrics.stage("fetch_users"):
+        if user_ids is None and user_names is None:
+            users = fetch_all_users(
+                identity_store_id=identity_store_id,
+                region=region,
+                transport=transport,
+                sharded=sharded,
+                max_workers=max_workers,
+            )
+        else:
+            users = list(
+                iter_selected_users(
+                    identity_store_id=identity_store_id,
+                    region=region,
+                    transport=transport,
+                    max_workers=max_workers,
+                    user_ids=user_ids,
+                    user_names=user_names,
+                )
+            )
+    with metrics.stage("fetch_mfa_devices"):
+        user_mfas = fetch_all_mfa_devices(
+            identity_store_id=identity_store_id,
+            region=region,
+            user_ids=[user.user_id for user in users],
+            transport=transport,
+            max_workers=max_workers,
+            failures=failures,
+            batch_size=mfa_batch_size,
+        )
+    with (
+        metrics.stage("combine"),
+        tracing.span("combine_user_and_user_mfa", users=len(users)),
+    ):
+        user_with_mfa_device = combine_user_and_user_mfa(
+            users=users, user_mfas=user_mfas
+        )
+    # The account assignments reuse the group memberships
+    memberships = None
+    if with_groups and instance_arn is not None:
+        memberships = GroupMemberships()
+    if with_groups:
+        with metrics.stage("fetch_groups"):
+            user_with_mfa_device = list(
+                iter_with_groups(
+                    identity_store_id=identity_store_id,
+                    region=region,
+                    users=user_with_mfa_device,
+                    transport=transport,
+                    max_workers=max_workers,
+                    memberships=memberships,
+                )
+            )
+    if instance_arn is not None:
+        with metrics.stage("fetch_account_assignments"):
+            user_with_mfa_device = list(
+                iter_with_account_assignments(
+                    identity_store_id=identity_store_id,
+                    region=region,
+                    instance_arn=instance_arn,
+                    users=user_with_mfa_device,
+                    transport=transport,
+                    max_workers=max_workers,
+                    memberships=memberships,
+                )
+            )
 
     return user_with_mfa_device
+
+
+def iter_all_user_with_mfa_device(
+    identity_store_id: str,
+    region: str,
+    transport: BaseTransport | None = None,
+    max_workers: int = 1,
+    sharded: bool = False,
+    failures: FailureReport | None = None,
+    user_ids: list[str] | None = None,
+    user_names: list[str] | None = None,
+    with_groups: bool = False,
+    instance_arn: str | None = None,
+) -> typing.Iterator[UserWithMfaDevice]:
+    # Only users whose MFA batch is still in flight are held in memory
+    pending_users: dict[str, User] = {}
+
+    def iter_user_ids() -> typing.Iterator[str]:
+        for user in metrics.iter_stage(
+            "fetch_users",
+            iter_selected_users(
+                identity_store_id=identity_store_id,
+                region=region,
+                transport=transport,
+                sharded=sharded,
+                max_workers=max_workers,
+                user_ids=user_ids,
+                user_names=user_names,
+            ),
+        ):
+            pending_users[user.user_id] = user
+            yield user.user_id
+
+    def iter_users() -> typing.Iterator[UserWithMfaDevice]:
+        for user_mfa in metrics.iter_stage(
+            "fetch_mfa_devices",
+            iter_all_mfa_devices(
+                identity_store_id=identity_store_id,
+                region=region,
+                user_ids=iter_user_ids(),
+                transport=transport,
+                max_workers=max_workers,
+                failures=failures,
+            ),
+        ):
+            yield UserWithMfaDevice.from_user_and_user_mfa(
+                user=pending_users.pop(user_mfa.user_id), user_mfa=user_mfa
+            )
+        if pending_users:
+            raise KeyError(next(iter(pending_users)))
+
+    users = iter_users()
+    # The account assignments reuse the group memberships
+    memberships = None
+    if with_groups and instance_arn is not None:
+        memberships = GroupMemberships()
+    if with_groups:
+        users = metrics.iter_stage(
+            "fetch_groups",
+            iter_with_groups(
+                identity_store_id=identity_store_id,
+                region=region,
+                users=users,
+                transport=transport,
+                max_workers=max_workers,
+                memberships=memberships,
+            ),
+        )
+    if instance_arn is not None:
+        users = metrics.iter_stage(
+            "fetch_account_assignments",
+            iter_with_account_assignments(
+                identity_store_id=identity_store_id,
+                region=region,
+                instance_arn=instance_arn,
+                users=users,
+                transport=transport,
+                max_workers=max_workers,
+                memberships=memberships,
+            ),
+        )
+    yield from users
+
+
+def fetch_all_user_with_mfa_device_bounded(
+    identity_store_id: str,
+    region: str,
+    memory_limit: int,
+    transport: BaseTransport | None = None,
+    max_workers: int = 1,
+    sharded: bool = False,
+    with_groups: bool = False,
+    instance_arn: str | None = None,
+    failures: FailureReport | None = None,
+    user_ids: list[str] | None = None,
+    user_names: list[str] | None = None,
+) -> typing.Iterator[UserWithMfaDevice]:
+    key = attrgetter("user_id")
+    # Both buffers are held until the merge, so they share the limit
+    buffer_limit = memory_limit // 2
+    with (
+        SpillBuffer[User](key=key, memory_limit=buffer_limit) as users,
+        SpillBuffer[UserMfa](key=key, memory_limit=buffer_limit) as user_mfas,
+    ):
+        with metrics.stage("fetch_users"):
+            users.extend(
+                iter_selected_users(
+                    identity_store_id=identity_store_id,
+                    region=region,
+                    transport=transport,
+                    sharded=sharded,
+                    max_workers=max_workers,
+                    user_ids=user_ids,
+                    user_names=user_names,
+                )
+            )
+        with metrics.stage("fetch_mfa_devices"):
+            user_mfas.extend(
+                iter_all_mfa_devices(
+                    identity_store_id=identity_store_id,
+                    region=region,
+                    user_ids=(user.user_id for user in users),
+                    transport=transport,
+                    max_workers=max_workers,
+                    failures=failures,
+                )
+            )
+        user_with_mfa_device = metrics.iter_stage(
+            "combine",
+            merge_join_user_and_user_mfa(users=users, user_mfas=user_mfas),
+        )
+        # The account assignments reuse the group memberships
+        memberships = None
+        if with_groups and instance_arn is not None:
+            memberships = GroupMemberships()
+        if with_groups:
+            user_with_mfa_device = metrics.iter_stage(
+                "fetch_groups",
+                iter_with_groups(
+                    identity_store_id=identity_store_id,
+                    region=region,
+                    users=user_with_mfa_device,
+                    transport=transport,
+                    max_workers=max_workers,
+                    memberships=memberships,
+                ),
+            )
+        if instance_arn is not None:
+            user_with_mfa_device = metrics.iter_stage(
+                "fetch_account_assignments",
+                iter_with_account_assignments(
+                    identity_store_id=identity_store_id,
+                    region=region,
+                    instance_arn=instance_arn,
+                    users=user_with_mfa_device,
+                    transport=transport,
+                    max_workers=max_workers,
+                    memberships=memberships,
+                ),
+            )
+        yield from user_with_mfa_device
+
+
+def sort_users(
+    users: typing.Iterable[UserWithMfaDevice],
+    sort_by: str,
+    memory_limit: int = SORT_MEMORY_LIMIT,
+) -> typing.Iterator[UserWithMfaDevice]:
+    sort_key = SORT_KEYS[sort_by]
+    with SpillBuffer[UserWithMfaDevice](
+        # Break ties by user ID so that the order is stable across exports
+        key=lambda user: (sort_key(user), user.user_id),
+        memory_limit=memory_limit,
+    ) as sorted_users:
+        with metrics.stage("sort"), tracing.span("sort", sort_by=sort_by):
+            sorted_users.extend(users)
+        yield from sorted_users
@@ -0,0 +1,113 @@
+import json
+import sys
+import threading
+import traceback
+import typing
+from dataclasses import asdict, replace
+from datetime import UTC, datetime
+
+from aws_sso_user_list.diff import UserChange, diff_users
+from aws_sso_user_list.exporter import json_default
+from aws_sso_user_list.utils import UserWithMfaDevice
+
+# Changes of these fields get an event of their own
+FIELD_EVENTS = {
+    "active": "UserActivationChanged",
+    "email_verification_status": "EmailVerificationChanged",
+}
+
+
+def change_events(change: UserChange) -> typing.Iterator[dict]:
+    user = {"user_id": change.user_id, "user_name": change.user_name}
+    other_changes = {}
+    for name, (old, new) in change.changes.items():
+        if name in FIELD_EVENTS:
+            yield {"event": FIELD_EVENTS[name], **user, "old": old, "new": new}
+        else:
+            other_changes[name] = {"old": old, "new": new}
+    if other_changes:
+        yield {"event": "UserUpdated", **user, "changes": other_changes}
+    for device in change.added_mfa_devices:
+        yield {"event": "MfaDeviceAdded", **user, "mfa_device": asdict(device)}
+    for device in change.removed_mfa_devices:
+        yield {
+            "event": "MfaDeviceRemoved",
+            **user,
+            "mfa_device": asdict(device),
+        }
+
+
+class Watcher:
+    def __init__(
+        self,
+        fetch: typing.Callable[[], typing.Iterable[UserWithMfaDevice]],
+        output: typing.TextIO,
+        users: typing.Iterable[UserWithMfaDevice] | None = None,
+    ) -> None:
+        self.fetch = fetch
+        self.output = output
+        self.users: dict[str, UserWithMfaDevice] | None = (
+            {user.user_id: user for user in users}
+            if users is not None
+            else None
+        )
+
+    def poll(self) -> int:
+        new_users: dict[str, UserWithMfaDevice] = {}
+        for user in self.fetch():
+            old_user = (self.users or {}).get(user.user_id)
+            if user.mfa_devices is None and old_user is not None:
+                # Only the MFA devices are unknown, the other fields are new
+                user = replace(user, mfa_devices=old_user.mfa_devices)
+            new_users[user.user_id] = user
+
+        if self.users is None:
+            # The first poll only sets the state to compare against
+            self.users = new_users
+            return 0
+
+        # Devices of a user first seen without them are added once known
+        old_users = (
+            replace(user, mfa_devices=[]) if user.mfa_devices is None else user
+            for user in self.users.values()
+        )
+        user_diff = diff_users(old_users, new_users.values())
+        self.users = new_users
+
+        events = [
+            *(
+                {"event": "UserCreated", "user": user.to_dict()}
+                for user in user_diff.added
+            ),
+            *(
+                {"event": "UserDeleted", "user": user.to_dict()}
+                for user in user_diff.removed
+            ),
+            *(
+                event
+                for change in user_diff.changed
+                for event in change_events(change)
+            ),
+        ]
+        time = datetime.now(UTC)
+        for event in events:
+            self.output.write(
+                json.dumps(
+                    {"time": time, **event},
+                    default=json_default,
+                    ensure_ascii=False,
+                )
+                + "\n"
+            )
+        self.output.flush()
+        return len(events)
+
+    def run(self, interval: float, stopped: threading.Event) -> None:
+        while True:
+            try:
+                self.poll()
+            except Exception:
+                # The last state is kept, so the next poll catches up
+                traceback.print_exc(file=sys.stderr)
+            if stopped.wait(interval):
+                return
@@ -0,0 +1,128 @@
+import re
+import typing
+import zipfile
+from datetime import UTC, datetime
+from functools import cache
+from xml.sax.saxutils import escape, quoteattr
+
+EXCEL_EPOCH = datetime(1899, 12, 30, tzinfo=UTC)
+DATETIME_STYLE = 1
+ILLEGAL_XML_CHARACTERS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+
+CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>
+<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>
+<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>
+</Types>
+"""  # noqa: E501
+ROOT_RELATIONSHIPS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>
+</Relationships>
+"""  # noqa: E501
+WORKBOOK = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">
+<sheets><sheet name={sheet_name} sheetId="1" r:id="rId1"/></sheets>
+</workbook>
+"""  # noqa: E501
+WORKBOOK_RELATIONSHIPS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>
+<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>
+</Relationships>
+"""  # noqa: E501
+STYLES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">
+<numFmts count="1"><numFmt numFmtId="164" formatCode="yyyy-mm-dd hh:mm:ss"/></numFmts>
+<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>
+<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>
+<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>
+<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>
+<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/><xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/></cellXfs>
+</styleSheet>
+"""  # noqa: E501
+SHEET_START = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>
+"""  # noqa: E501
+SHEET_END = """</sheetData></worksheet>
+"""
+
+CellValue = str | bool | int | float | datetime | None
+
+
+@cache
+def column_name(index: int) -> str:
+    name = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        name = chr(ord("A") + remainder) + name
+    return name
+
+
+def excel_serial(value: datetime) -> float:
+    return (value - EXCEL_EPOCH).total_seconds() / 86400
+
+
+def cell(reference: str, value: CellValue) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return f'<c r="{reference}" t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f'<c r="{reference}"><v>{value}</v></c>'
+    if isinstance(value, datetime):
+        return (
+            f'<c r="{reference}" s="{DATETIME_STYLE}">'
+            f"<v>{excel_serial(value)}</v></c>"
+        )
+    text = escape(ILLEGAL_XML_CHARACTERS.sub("", value))
+    return (
+        f'<c r="{reference}" t="inlineStr">'
+        f'<is><t xml:space="preserve">{text}</t></is></c>'
+    )
+
+
+class XlsxWriter:
+    def __init__(
+        self, file: typing.BinaryIO, sheet_name: str = "Sheet1"
+    ) -> None:
+        self.zip_file = zipfile.ZipFile(
+            file, mode="w", compression=zipfile.ZIP_DEFLATED
+        )
+        self.zip_file.writestr("[Content_Types].xml", CONTENT_TYPES)
+        self.zip_file.writestr("_rels/.rels", ROOT_RELATIONSHIPS)
+        self.zip_file.writestr(
+            "xl/workbook.xml",
+            WORKBOOK.format(sheet_name=quoteattr(sheet_name)),
+        )
+        self.zip_file.writestr(
+            "xl/_rels/workbook.xml.rels", WORKBOOK_RELATIONSHIPS
+        )
+        self.zip_file.writestr("xl/styles.xml", STYLES)
+        # Rows are compressed into the archive as they are written
+        self.sheet = self.zip_file.open("xl/worksheets/sheet1.xml", mode="w")
+        self.sheet.write(SHEET_START.encode())
+        self.row_count = 0
+
+    def __enter__(self) -> "XlsxWriter":
+        return self
+
+    def __exit__(self, *args: typing.Any) -> None:
+        self.close()
+
+    def writerow(self, values: typing.Iterable[CellValue]) -> None:
+        self.row_count += 1
+        cells = "".join(
+            cell(f"{column_name(index)}{self.row_count}", value)
+            for index, value in enumerate(values)
+        )
+        self.sheet.write(f'<row r="{self.row_count}">{cells}</row>'.encode())
+
+    def close(self) -> None:
+        self.sheet.write(SHEET_END.encode())
+        self.sheet.close()
+        self.zip_file.close()
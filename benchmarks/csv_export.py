@@ -0,0 +1,108 @@
+import argparse
+import csv
+import itertools
+import time
+import typing
+from datetime import UTC, datetime, timedelta
+
+from aws_sso_user_list.exporter import UserCsvExporter
+from aws_sso_user_list.mfa_device import MfaDevice
+from aws_sso_user_list.utils import UserWithMfaDevice
+
+CREATED_AT = datetime(2000, 1, 23, 4, 56, tzinfo=UTC)
+
+
+class NullSink:
+    def write(self, data: str) -> int:
+        return len(data)
+
+
+def make_user(index: int) -> UserWithMfaDevice:
+    user_name = f"user{index:08d}@example.com"
+    return UserWithMfaDevice(
+        active=index % 10 != 0,
+        user_id=f"{index:08d}-89ab-cdef-0123-456789abcdef",
+        user_name=user_name,
+        display_name=f"User {index}",
+        email=user_name,
+        email_verification_status="VERIFIED" if index % 3 else "NOT_VERIFIED",
+        created_at=CREATED_AT,
+        updated_at=CREATED_AT + timedelta(minutes=index),
+        mfa_devices=[
+            MfaDevice(
+                device_id=f"m-{index:08d}{number}",
+                device_name=f"m-{index:08d}{number}_name",
+                display_name="MFA Device",
+                mfa_type="WEBAUTHN",
+                registered_date=CREATED_AT,
+            )
+            for number in range(index % 3)
+        ],
+    )
+
+
+def iter_users(rows: int, distinct: int) -> typing.Iterator[UserWithMfaDevice]:
+    # A pool of distinct users is cycled, so 1M rows fit in memory
+    users = [make_user(index) for index in range(distinct)]
+    return itertools.islice(itertools.cycle(users), rows)
+
+
+def export_dict_writer(
+    users: typing.Iterable[UserWithMfaDevice], output: NullSink
+) -> None:
+    # The DictWriter path UserCsvExporter used before the tuple rows
+    field_maps: list[tuple[str, typing.Callable[[UserWithMfaDevice], str]]]
+    field_maps = [
+        ("Active", lambda user: str(user.active)),
+        ("UserId", lambda user: user.user_id),
+        ("UserName", lambda user: user.user_name),
+        ("DisplayName", lambda user: user.display_name),
+        ("Email", lambda user: user.email),
+        (
+            "EmailVerificationStatus",
+            lambda user: user.email_verification_status,
+        ),
+        ("MfaDeviceCount", lambda user: str(len(user.mfa_devices or []))),
+        ("CreatedAt", lambda user: user.created_at.isoformat()),
+        ("UpdatedAt", lambda user: user.updated_at.isoformat()),
+    ]
+    writer = csv.DictWriter(
+        output, fieldnames=[fieldname for fieldname, _ in field_maps]
+    )
+    writer.writeheader()
+    for user in users:
+        writer.writerow(
+            {field: converter(user) for field, converter in field_maps}
+        )
+
+
+def export_tuple_writer(
+    users: typing.Iterable[UserWithMfaDevice], output: NullSink
+) -> None:
+    UserCsvExporter(users).export(output)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Time the CSV export of synthetic users"
+    )
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--distinct", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for name, export in (
+        ("DictWriter", export_dict_writer),
+        ("csv.writer", export_tuple_writer),
+    ):
+        seconds = []
+        for _ in range(args.repeat):
+            users = iter_users(args.rows, args.distinct)
+            started_at = time.perf_counter()
+            export(users, NullSink())
+            seconds.append(time.perf_counter() - started_at)
+        print(f"{name}: {min(seconds):.2f}s best of {args.repeat}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+import json
+import os
+import typing
+
+import pytest
+from botocore.auth import SigV4Auth
+from botocore.session import Session
+from pytest_mock import MockerFixture
+from requests import Response
+
+from aws_sso_user_list.assignment import (
+    AccountAssignment,
+    UserAccountAssignments,
+    _fetch_account_assignments,
+    iter_all_account_assignments,
+)
+from aws_sso_user_list.group import GroupMemberships
+
+INSTANCE_ARN = "arn:aws:sso:::instance/ssoins-0123456789abcdef"
+
+
+@pytest.fixture
+def credential_env() -> dict[str, str]:
+    credentials = {
+        "AWS_ACCESS_KEY_ID": "testing",
+        "AWS_SECRET_ACCESS_KEY": "testing",
+        "AWS_SECURITY_TOKEN": "testing",
+        "AWS_SESSION_TOKEN": "testing",
+        "AWS_DEFAULT_REGION": "us-east-1",
+    }
+
+    for key, value in credentials.items():
+        os.environ[key] = value
+
+    return credentials
+
+
+class TestFetchAccountAssignments:
+    @pytest.fixture
+    def target(self) -> typing.Callable[..., dict]:
+        return _fetch_account_assignments
+
+    def test_call_success(
+        self,
+        target: typing.Callable[..., dict],
+        credential_env: dict[str, str],
+        mocker: MockerFixture,
+    ) -> None:
+        response = Response()
+        response.status_code = 200
+        response._content = json.dumps({"AccountAssignments": []}).encode()
+        mocked_post = mocker.patch("requests.post", return_value=response)
+        sigv4_auth = SigV4Auth(
+            credentials=Session().get_credentials(),
+            service_name="sso",
+            region_name="us-east-1",
+        )
+
+        data = target(sigv4_auth, INSTANCE_ARN, "us-east-1", "USER", "user1")
+
+        assert data == {"AccountAssignments": []}
+        args, kwargs = mocked_post.call_args
+        assert args[0] == "https://sso.us-east-1.amazonaws.com/"
+        assert kwargs["headers"]["X-Amz-Target"] == (
+            "SWBExternalService.ListAccountAssignmentsForPrincipal"
+        )
+        assert json.loads(kwargs["data"]) == {
+            "InstanceArn": INSTANCE_ARN,
+            "PrincipalType": "USER",
+            "PrincipalId": "user1",
+            "MaxResults": 100,
+        }
+
+
+def make_assignment(
+    account_id: str, permission_set_arn: str, principal: tuple[str, str]
+) -> dict:
+    return {
+        "AccountId": account_id,
+        "PermissionSetArn": permission_set_arn,
+        "PrincipalType": principal[0],
+        "PrincipalId": principal[1],
+    }
+
+
+class TestIterAllAccountAssignments:
+    @pytest.fixture
+    def target(
+        self,
+    ) -> typing.Callable[..., typing.Iterator[UserAccountAssignments]]:
+        return iter_all_account_assignments
+
+    def test_call_success(
+        self,
+        target: typing.Callable[..., typing.Iterator[UserAccountAssignments]],
+        credential_env: dict[str, str],
+        mocker: MockerFixture,
+    ) -> None:
+        assignments = {
+            ("USER", "user1", None): {
+                "AccountAssignments": [
+                    make_assignment("111", "ps-admin", ("USER", "user1")),
+                    make_assignment("222", "ps-read", ("GROUP", "group1")),
+                ],
+                "NextToken": "X",
+            },
+            ("USER", "user1", "X"): {"AccountAssignments": []},
+            ("USER", "user2", None): {"AccountAssignments": []},
+            ("GROUP", "group1", None): {
+                "AccountAssignments": [
+                    make_assignment("222", "ps-read", ("GROUP", "group1")),
+                    make_assignment("111", "ps-read", ("GROUP", "group1")),
+                ],
+            },
+        }
+
+        def fetch_account_assignments(
+            principal_type: str,
+            principal_id: str,
+            next_token: str | None,
+            **kwargs: typing.Any,
+        ) -> dict:
+            return assignments[(principal_type, principal_id, next_token)]
+
+        mocked_fetch_account_assignments = mocker.patch(
+            "aws_sso_user_list.assignment._fetch_account_assignments",
+            side_effect=fetch_account_assignments,
+        )
+        mocker.patch(
+            "aws_sso_user_list.assignment.list_group_ids",
+            return_value=["group1"],
+        )
+        mocked_describe_permission_set = mocker.patch(
+            "aws_sso_user_list.assignment._describe_permission_set",
+            side_effect=lambda permission_set_arn, **kwargs: {
+                "PermissionSet": {"Name": permission_set_arn.upper()}
+            },
+        )
+
+        data = list(
+            target(
+                "d-1234567890",
+                "us-east-1",
+                INSTANCE_ARN,
+                ["user1", "user2"],
+                max_workers=2,
+            )
+        )
+
+        group_assignments = [
+            AccountAssignment("111", "ps-read", "PS-READ", "GROUP", "group1"),
+            AccountAssignment("222", "ps-read", "PS-READ", "GROUP", "group1"),
+        ]
+        assert data == [
+            UserAccountAssignments(
+                user_id="user1",
+                account_assignments=[
+                    AccountAssignment(
+                        "111", "ps-admin", "PS-ADMIN", "USER", "user1"
+                    ),
+                    *group_assignments,
+                ],
+            ),
+            UserAccountAssignments(
+                user_id="user2", account_assignments=group_assignments
+            ),
+        ]
+        group_calls = [
+            call
+            for call in mocked_fetch_account_assignments.call_args_list
+            if call.kwargs["principal_type"] == "GROUP"
+        ]
+        assert len(group_calls) == 1
+        assert mocked_describe_permission_set.call_count == 2
+
+    def test_call_memberships(
+        self,
+        target: typing.Callable[..., typing.Iterator[UserAccountAssignments]],
+        credential_env: dict[str, str],
+        mocker: MockerFixture,
+    ) -> None:
+        mocker.patch(
+            "aws_sso_user_list.assignment._fetch_account_assignments",
+            return_value={"AccountAssignments": []},
+        )
+        mocked_list_group_ids = mocker.patch(
+            "aws_sso_user_list.assignment.list_group_ids", return_value=[]
+        )
+        memberships = GroupMemberships()
+        memberships.put("user1", [])
+
+        list(
+            target(
+                "d-1234567890",
+                "us-east-1",
+                INSTANCE_ARN,
+                ["user1", "user2"],
+                memberships=memberships,
+            )
+        )
+
+        # Only the user whose memberships were not listed yet is looked up
+        mocked_list_group_ids.assert_called_once()
+        assert mocked_list_group_ids.call_args.kwargs["user_id"] == "user2"
+        assert memberships.group_ids == {}
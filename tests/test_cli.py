@@ -1,13 +1,22 @@
+import gzip
 import json
+import os
 import typing
+import warnings
 from datetime import UTC, datetime
 
 import pytest
 from click.testing import CliRunner, Result
 from pytest_mock import MockerFixture
 
-from aws_sso_user_list.cli import main
+from aws_sso_user_list.cli import main, make_transport
+from aws_sso_user_list.failures import FailureReport
+from aws_sso_user_list.hedging import Hedge
+from aws_sso_user_list.loadtest import LoadResult
 from aws_sso_user_list.mfa_device import MfaDevice
+from aws_sso_user_list.recording import RecordingTransport
+from aws_sso_user_list.transport import RequestsTransport
+from aws_sso_user_list.user import ShardedScanWarning
 from aws_sso_user_list.utils import UserWithMfaDevice
 
 
@@ -69,6 +78,14 @@ class TestMain:
         mocked_fetch_all_user_with_mfa_device.assert_called_once_with(
             identity_store_id="d-0123456789",
             region="us-east-1",
+            transport=mocker.ANY,
+            max_workers=1,
+            sharded=False,
+            with_groups=False,
+            instance_arn=None,
+            failures=None,
+            user_ids=None,
+            user_names=None,
         )
         assert result.stdout == "\n".join(
             [
@@ -139,6 +156,14 @@ class TestMain:
         mocked_fetch_all_user_with_mfa_device.assert_called_once_with(
             identity_store_id="d-0123456789",
             region="us-east-1",
+            transport=mocker.ANY,
+            max_workers=1,
+            sharded=False,
+            with_groups=False,
+            instance_arn=None,
+            failures=None,
+            user_ids=None,
+            user_names=None,
         )
         assert json.loads(result.stdout) == {
             "Users": [
@@ -163,3 +188,883 @@ class TestMain:
                 },
             ],
         }
+
+
+class TestDiff:
+    def test_invoke_with_files(self, tmp_path: typing.Any) -> None:
+        def export_data(active: bool, device_ids: list[str]) -> dict:
+            return {
+                "Users": [
+                    {
+                        "active": active,
+                        "user_id": "01234567-89ab-cdef-0123-456789abcdef",
+                        "user_name": "user@example.com",
+                        "display_name": "John Doe",
+                        "email": "user@example.com",
+                        "email_verification_status": "VERIFIED",
+                        "created_at": "2000-01-23T04:56:00+00:00",
+                        "updated_at": "2000-01-23T04:56:00+00:00",
+                        "mfa_devices": [
+                            {
+                                "device_id": device_id,
+                                "device_name": f"{device_id}_name",
+                                "display_name": "MFA Device",
+                                "mfa_type": "WEBAUTHN",
+                                "registered_date": "2000-01-23T04:56:00+00:00",  # noqa: E501
+                            }
+                            for device_id in device_ids
+                        ],
+                    },
+                ],
+            }
+
+        old = tmp_path / "old.json"
+        old.write_text(json.dumps(export_data(True, ["m-1"])))
+        new = tmp_path / "new.json"
+        new.write_text(json.dumps(export_data(False, ["m-2"])))
+
+        runner = CliRunner()
+        result = runner.invoke(cli=main, args=["diff", str(old), str(new)])
+
+        assert result.exit_code == 0
+        data = json.loads(result.stdout)
+        assert data["Added"] == []
+        assert data["Removed"] == []
+        assert len(data["Changed"]) == 1
+        assert data["Changed"][0]["changes"] == {
+            "active": {"old": True, "new": False}
+        }
+        assert data["Changed"][0]["added_mfa_devices"][0]["device_id"] == "m-2"
+        assert (
+            data["Changed"][0]["removed_mfa_devices"][0]["device_id"] == "m-1"
+        )
+
+    def test_invoke_without_new(self, tmp_path: typing.Any) -> None:
+        old = tmp_path / "old.json"
+        old.write_text(json.dumps({"Users": []}))
+
+        runner = CliRunner()
+        result = runner.invoke(cli=main, args=["diff", str(old)])
+
+        assert result.exit_code == 2
+
+
+class TestExportMemoryLimit:
+    def test_invoke(self, mocker: MockerFixture) -> None:
+        mocked_fetch_all_user_with_mfa_device_bounded = mocker.patch(
+            "aws_sso_user_list.cli.fetch_all_user_with_mfa_device_bounded",
+            return_value=iter([]),
+        )
+
+        runner = CliRunner()
+        result = runner.invoke(
+            cli=main,
+            args=[
+                "--identity-store-id=d-0123456789",
+                "--region=us-east-1",
+                "--memory-limit=64",
+            ],
+        )
+
+        assert result.exit_code == 0
+        mocked_fetch_all_user_with_mfa_device_bounded.assert_called_once_with(
+            identity_store_id="d-0123456789",
+            region="us-east-1",
+            memory_limit=64 * 1024 * 1024,
+            transport=mocker.ANY,
+            max_workers=1,
+            sharded=False,
+            with_groups=False,
+            instance_arn=None,
+            failures=None,
+            user_ids=None,
+            user_names=None,
+        )
+        assert json.loads(result.stdout) == {"Users": []}
+
+    def test_invoke_sort_by(self, mocker: MockerFixture) -> None:
+        mocked_fetch_all_user_with_mfa_device_bounded = mocker.patch(
+            "aws_sso_user_list.cli.fetch_all_user_with_mfa_device_bounded",
+            return_value=iter([]),
+        )
+        mocked_sort_users = mocker.patch(
+            "aws_sso_user_list.cli.sort_users", return_value=iter([])
+        )
+
+        runner = CliRunner()
+        result = runner.invoke(
+            cli=main,
+            args=[
+                "--identity-store-id=d-0123456789",
+                "--region=us-east-1",
+                "--memory-limit=64",
+                "--sort-by=user_name",
+            ],
+        )
+
+        assert result.exit_code == 0
+        # The fetch and the sort share the limit
+        assert (
+            mocked_fetch_all_user_with_mfa_device_bounded.call_args.kwargs[
+                "memory_limit"
+            ]
+            == 32 * 1024 * 1024
+        )
+        assert (
+            mocked_sort_users.call_args.kwargs["memory_limit"]
+            == 32 * 1024 * 1024
+        )
+
+
+class TestExportColumnar:
+    def test_invoke(self, mocker: MockerFixture) -> None:
+        mocked_iter_all_user_with_mfa_device = mocker.patch(
+            "aws_sso_user_list.cli.iter_all_user_with_mfa_device",
+            return_value=iter([]),
+        )
+        mocked_fetch_all_user_with_mfa_device = mocker.patch(
+            "aws_sso_user_list.cli.fetch_all_user_with_mfa_device"
+        )
+
+        runner = CliRunner()
+        result = runner.invoke(
+            cli=main,
+            args=[
+                "--identity-store-id=d-0123456789",
+                "--region=us-east-1",
+                "--columnar",
+                "--format=csv",
+                "--with-groups",
+            ],
+        )
+
+        assert result.exit_code == 0
+        mocked_iter_all_user_with_mfa_device.assert_called_once_with(
+            identity_store_id="d-0123456789",
+            region="us-east-1",
+            transport=mocker.ANY,
+            max_workers=1,
+            sharded=False,
+            failures=None,
+            user_ids=None,
+            user_names=None,
+            with_groups=True,
+            instance_arn=None,
+        )
+        mocked_fetch_all_user_with_mfa_device.assert_not_called()
+        assert result.stdout.startswith("Active,UserId,")
+
+    def test_invoke_memory_limit(self) -> None:
+        runner = CliRunner()
+        result = runner.invoke(
+            cli=main,
+            args=[
+                "--identity-store-id=d-0123456789",
+                "--region=us-east-1",
+                "--columnar",
+                "--memory-limit=64",
+            ],
+        )
+
+        assert result.exit_code == 2
+        assert "mutually exclusive" in result.stderr
+
+
+class TestExportSummary:
+    def test_invoke(self, mocker: MockerFixture) -> None:
+        mocked_iter_all_user_with_mfa_device = mocker.patch(
+            "aws_sso_user_list.cli.iter_all_user_with_mfa_device",
+            return_value=iter(
+                [
+                    UserWithMfaDevice(
+                        active=True,
+                        user_id="01234567-89ab-cdef-0123-456789abcdef",
+                        user_name="user@example.com",
+                        display_name="John Doe",
+                        email="user@example.com",
+                        email_verification_status="NOT_VERIFIED",
+                        created_at=datetime(2000, 1, 23, 4, 56, tzinfo=UTC),
+                        updated_at=datetime(2000, 1, 23, 4, 56, tzinfo=UTC),
+                        mfa_devices=[],
+                    ),
+                ]
+            ),
+        )
+
+        runner = CliRunner()
+        result = runner.invoke(
+            cli=main,
+            args=[
+                "--identity-store-id=d-0123456789",
+                "--region=us-east-1",
+                "--format=summary",
+            ],
+        )
+
+        assert result.exit_code == 0
+        mocked_iter_all_user_with_mfa_device.assert_called_once()
+        data = json.loads(result.stdout)
+        assert data["Users"] == 1
+        assert data["ActiveUsersWithoutMfaDevice"] == 1
+        assert data["UnverifiedEmails"] == 1
+        assert data["StaleUsers"] == 1
+
+
+class TestExportSortBy:
+    def test_invoke(self, mocker: MockerFixture) -> None:
+        mocked_fetch_all_user_with_mfa_device = mocker.patch(
+            "aws_sso_user_list.cli.fetch_all_user_with_mfa_device"
+        )
+        mocked_iter_all_user_with_mfa_device = mocker.patch(
+            "aws_sso_user_list.cli.iter_all_user_with_mfa_device",
+            return_value=[
+                UserWithMfaDevice(
+                    active=True,
+                    user_id=f"user{index}",
+                    user_name=f"{user_name}@example.com",
+                    display_name="John Doe",
+                    email=f"{user_name}@example.com",
+                    email_verification_status="VERIFIED",
+                    created_at=datetime(2000, 1, 23, 4, 56, tzinfo=UTC),
+                    updated_at=datetime(2000, 1, 23, 4, 56, tzinfo=UTC),
+                    mfa_devices=[],
+                )
+                for index, user_name in enumerate(["carol", "alice", "bob"])
+            ],
+        )
+
+        runner = CliRunner()
+        result = runner.invoke(
+            cli=main,
+            args=[
+                "--identity-store-id=d-0123456789",
+                "--region=us-east-1",
+                "--sort-by=user_name",
+            ],
+        )
+
+        assert result.exit_code == 0
+        assert [
+            user["user_name"] for user in json.loads(result.stdout)["Users"]
+        ] == ["alice@example.com", "bob@example.com", "carol@example.com"]
+        # Users are streamed into the sort, not fetched into a list first
+        mocked_fetch_all_user_with_mfa_device.assert_not_called()
+        mocked_iter_all_user_with_mfa_device.assert_called_once()
+
+
+class TestExportMultipleFormats:
+    def test_invoke(self, mocker: MockerFixture, tmp_path: typing.Any) -> None:
+        mocked_fetch_all_user_with_mfa_device = mocker.patch(
+            "aws_sso_user_list.cli.fetch_all_user_with_mfa_device",
+            return_value=[
+                UserWithMfaDevice(
+                    active=True,
+                    user_id=f"user{index}",
+                    user_name=f"user{index}@example.com",
+                    display_name="John Doe",
+                    email=f"user{index}@example.com",
+                    email_verification_status="VERIFIED",
+                    created_at=datetime(2000, 1, 23, 4, 56, tzinfo=UTC),
+                    updated_at=datetime(2000, 1, 23, 4, 56, tzinfo=UTC),
+                    mfa_devices=[],
+                )
+                for index in range(3)
+            ],
+        )
+        csv_path = os.path.join(tmp_path, "users.csv")
+        json_path = os.path.join(tmp_path, "users.json")
+
+        runner = CliRunner()
+        result = runner.invoke(
+            cli=main,
+            args=[
+                "--identity-store-id=d-0123456789",
+                "--region=us-east-1",
+                "--format=csv",
+                f"--output={csv_path}",
+                "--format=json",
+                f"--output={json_path}",
+            ],
+        )
+
+        assert result.exit_code == 0
+        mocked_fetch_all_user_with_mfa_device.assert_called_once()
+        with open(csv_path, encoding="utf-8") as file:
+            assert len(file.read().splitlines()) == 4
+        with open(json_path, encoding="utf-8") as file:
+            assert len(json.load(file)["Users"]) == 3
+
+    def test_invoke_without_output(self) -> None:
+        runner = CliRunner()
+        result = runner.invoke(
+            cli=main,
+            args=[
+                "--identity-store-id=d-0123456789",
+                "--region=us-east-1",
+                "--format=csv",
+                "--format=json",
+            ],
+        )
+
+        assert result.exit_code == 2
+        assert "Each --format needs its own --output" in result.output
+
+
+class TestExportParts:
+    def test_invoke(self, mocker: MockerFixture, tmp_path: typing.Any) -> None:
+        mocker.patch(
+            "aws_sso_user_list.cli.fetch_all_user_with_mfa_device",
+            return_value=[
+                UserWithMfaDevice(
+                    active=True,
+                    user_id=f"user{index}",
+                    user_name=f"user{index}@example.com",
+                    display_name="John Doe",
+                    email=f"user{index}@example.com",
+                    email_verification_status="VERIFIED",
+                    created_at=datetime(2000, 1, 23, 4, 56, tzinfo=UTC),
+                    updated_at=datetime(2000, 1, 23, 4, 56, tzinfo=UTC),
+                    mfa_devices=[],
+                )
+                for index in range(5)
+            ],
+        )
+        csv_path = os.path.join(tmp_path, "users.csv")
+        summary_path = os.path.join(tmp_path, "summary.json")
+
+        runner = CliRunner()
+        result = runner.invoke(
+            cli=main,
+            args=[
+                "--identity-store-id=d-0123456789",
+                "--region=us-east-1",
+                "--format=csv",
+                f"--output={csv_path}",
+                "--format=summary",
+                f"--output={summary_path}",
+                "--parts=2",
+                "--split-by=round-robin",
+            ],
+        )
+
+        assert result.exit_code == 0, result.output
+        assert not os.path.exists(csv_path)
+        with open(os.path.join(tmp_path, "users.manifest.json")) as file:
+            manifest = json.load(file)
+        assert manifest["Format"] == "csv"
+        assert manifest["Users"] == 5
+        assert [part["Path"] for part in manifest["Parts"]] == [
+            "users-00000.csv",
+            "users-00001.csv",
+        ]
+        assert [part["Users"] for part in manifest["Parts"]] == [3, 2]
+        with open(summary_path, encoding="utf-8") as file:
+            assert json.load(file)["Users"] == 5
+
+    def test_invoke_with_stdout(self) -> None:
+        runner = CliRunner()
+        result = runner.invoke(
+            cli=main,
+            args=[
+                "--identity-store-id=d-0123456789",
+                "--region=us-east-1",
+                "--parts=2",
+            ],
+        )
+
+        assert result.exit_code == 2
+        assert "--parts needs a file --output" in result.output
+
+
+class TestExportTolerant:
+    def test_invoke(self, mocker: MockerFixture, tmp_path: typing.Any) -> None:
+        def fetch_all_user_with_mfa_device(
+            failures: FailureReport, **kwargs: typing.Any
+        ) -> list[UserWithMfaDevice]:
+            failures.add("BatchListMfaDevicesForUser", ["user0"], "KeyError")
+            return [
+                UserWithMfaDevice(
+                    active=True,
+                    user_id="user0",
+                    user_name="user0@example.com",
+                    display_name="John Doe",
+                    email="user0@example.com",
+                    email_verification_status="VERIFIED",
+                    created_at=datetime(2000, 1, 23, 4, 56, tzinfo=UTC),
+                    updated_at=datetime(2000, 1, 23, 4, 56, tzinfo=UTC),
+                    mfa_devices=None,
+                )
+            ]
+
+        mocker.patch(
+            "aws_sso_user_list.cli.fetch_all_user_with_mfa_device",
+            side_effect=fetch_all_user_with_mfa_device,
+        )
+        report_path = os.path.join(tmp_path, "failures.json")
+
+        runner = CliRunner()
+        result = runner.invoke(
+            cli=main,
+            args=[
+                "--identity-store-id=d-0123456789",
+                "--region=us-east-1",
+                "--tolerant",
+                f"--failure-report={report_path}",
+            ],
+        )
+
+        assert result.exit_code == 3
+        assert json.loads(result.stdout)["Users"][0]["mfa_devices"] is None
+        assert "MFA devices of 1 users could not be fetched" in result.stderr
+        with open(report_path, encoding="utf-8") as file:
+            assert json.load(file)["UnknownUsers"] == 1
+
+
+class TestExportUserFiles:
+    def test_invoke(self, mocker: MockerFixture, tmp_path: typing.Any) -> None:
+        mocked_fetch_all_user_with_mfa_device = mocker.patch(
+            "aws_sso_user_list.cli.fetch_all_user_with_mfa_device",
+            return_value=[
+                UserWithMfaDevice(
+                    active=True,
+                    user_id="user1",
+                    user_name="Alice@example.com",
+                    display_name="Alice",
+                    email="alice@example.com",
+                    email_verification_status="VERIFIED",
+                    created_at=datetime(2000, 1, 23, 4, 56, tzinfo=UTC),
+                    updated_at=datetime(2000, 1, 23, 4, 56, tzinfo=UTC),
+                    mfa_devices=[],
+                )
+            ],
+        )
+        user_ids_path = os.path.join(tmp_path, "user_ids.txt")
+        with open(user_ids_path, "w", encoding="utf-8") as file:
+            file.write("# offboarding\nuser1\n\nuser2\n")
+        user_names_path = os.path.join(tmp_path, "user_names.txt")
+        with open(user_names_path, "w", encoding="utf-8") as file:
+            file.write("alice@example.com\n")
+
+        runner = CliRunner()
+        result = runner.invoke(
+            cli=main,
+            args=[
+                "--identity-store-id=d-0123456789",
+                "--region=us-east-1",
+                f"--user-ids-file={user_ids_path}",
+                f"--user-names-file={user_names_path}",
+            ],
+        )
+
+        assert result.exit_code == 0
+        assert mocked_fetch_all_user_with_mfa_device.call_args.kwargs[
+            "user_ids"
+        ] == ["user1", "user2"]
+        assert mocked_fetch_all_user_with_mfa_device.call_args.kwargs[
+            "user_names"
+        ] == ["alice@example.com"]
+        assert len(json.loads(result.stdout)["Users"]) == 1
+        assert "1 requested users were not found: user2" in result.stderr
+
+
+class TestExportMemoryStats:
+    def test_invoke(self, mocker: MockerFixture) -> None:
+        mocker.patch(
+            "aws_sso_user_list.cli.fetch_all_user_with_mfa_device",
+            return_value=[],
+        )
+
+        runner = CliRunner()
+        result = runner.invoke(
+            cli=main,
+            args=[
+                "--identity-store-id=d-0123456789",
+                "--region=us-east-1",
+                "--memory-stats",
+            ],
+        )
+
+        assert result.exit_code == 0
+        assert json.loads(result.stdout) == {"Users": []}
+        assert result.stderr.splitlines()[0].split() == [
+            "Stage",
+            "Peak",
+            "Retained",
+        ]
+        assert result.stderr.splitlines()[1].startswith("export ")
+
+
+class TestMakeTransport:
+    def test_call(self) -> None:
+        with make_transport(
+            http2=False,
+            connect_timeout=1.0,
+            read_timeout=2.0,
+            hedge_percentile=95.0,
+            max_workers=4,
+        ) as transport:
+            assert isinstance(transport, RequestsTransport)
+            assert transport.connect_timeout == 1.0
+            assert transport.read_timeout == 2.0
+            assert isinstance(transport.hedge, Hedge)
+            assert transport.hedge.percentile == 95.0
+
+    def test_call_without_hedge(self) -> None:
+        transport = make_transport(
+            http2=False,
+            connect_timeout=1.0,
+            read_timeout=2.0,
+            hedge_percentile=None,
+            max_workers=1,
+        )
+
+        assert transport.hedge is None
+
+    def test_call_retry_options(self, tmp_path: typing.Any) -> None:
+        transport = make_transport(
+            http2=False,
+            connect_timeout=1.0,
+            read_timeout=2.0,
+            hedge_percentile=None,
+            max_workers=1,
+            max_retries=5,
+            retry_backoff=0.1,
+            max_retry_backoff=2.0,
+            record_file=str(tmp_path / "record.jsonl.gz"),
+        )
+
+        with transport:
+            assert isinstance(transport, RecordingTransport)
+            for retrying in (transport, transport.transport):
+                assert retrying.max_retries == 5
+                assert retrying.backoff == 0.1
+                assert retrying.max_backoff == 2.0
+
+
+class TestExportReplay:
+    @pytest.fixture
+    def replay_file(self, tmp_path: typing.Any) -> str:
+        user_id = "01234567-89ab-cdef-0123-456789abcdef"
+        search_users = {
+            "TotalUserCount": 1,
+            "Users": [
+                {
+                    "Active": True,
+                    "Meta": {
+                        "CreatedAt": 948603360.0,
+                        "UpdatedAt": 948603360.0,
+                    },
+                    "UserAttributes": {
+                        "emails": {
+                            "ComplexListValue": [
+                                {
+                                    "verificationStatus": {
+                                        "StringValue": "VERIFIED"
+                                    },
+                                    "value": {
+                                        "StringValue": "user@example.com"
+                                    },
+                                    "primary": {"BooleanValue": True},
+                                }
+                            ]
+                        },
+                        "displayName": {"StringValue": "John Doe"},
+                    },
+                    "UserId": user_id,
+                    "UserName": "user@example.com",
+                }
+            ],
+        }
+        mfa_devices = {
+            "userMfaDevicesEntryList": [
+                {"user": {"userId": user_id}, "mfaDevices": []}
+            ]
+        }
+        entries = [
+            (
+                "SearchUsers",
+                {
+                    "IdentityStoreId": "d-0123456789",
+                    "MaxResults": 100,
+                    "NextToken": None,
+                },
+                search_users,
+            ),
+            (
+                "BatchListMfaDevicesForUser",
+                {
+                    "userList": [
+                        {"directoryId": "d-0123456789", "userId": user_id}
+                    ]
+                },
+                mfa_devices,
+            ),
+        ]
+        path = str(tmp_path / "api.jsonl.gz")
+        with gzip.open(path, "wt") as file:
+            for target, request, response in entries:
+                entry = {
+                    "elapsed": 0.0,
+                    "target": target,
+                    "request": json.dumps(request),
+                    "status_code": 200,
+                    "response": json.dumps(response),
+                }
+                file.write(json.dumps(entry) + "\n")
+        return path
+
+    def test_invoke(self, replay_file: str, mocker: MockerFixture) -> None:
+        mocker.patch.dict(os.environ, clear=True)
+
+        runner = CliRunner()
+        result = runner.invoke(
+            cli=main,
+            args=[
+                "--identity-store-id=d-0123456789",
+                "--region=us-east-1",
+                f"--replay-file={replay_file}",
+                "--format=csv",
+            ],
+        )
+
+        assert result.exit_code == 0, result.output
+        assert result.stdout.splitlines()[1].startswith(
+            "True,01234567-89ab-cdef-0123-456789abcdef,user@example.com"
+        )
+
+    def test_invoke_record_and_replay(
+        self, replay_file: str, tmp_path: typing.Any
+    ) -> None:
+        runner = CliRunner()
+        result = runner.invoke(
+            cli=main,
+            args=[
+                "--identity-store-id=d-0123456789",
+                "--region=us-east-1",
+                f"--replay-file={replay_file}",
+                f"--record-file={tmp_path / 'other.jsonl.gz'}",
+            ],
+        )
+
+        assert result.exit_code == 2
+
+
+class TestExportAccountAssignments:
+    def test_invoke_without_instance_arn(self) -> None:
+        runner = CliRunner()
+        result = runner.invoke(
+            cli=main,
+            args=[
+                "--identity-store-id=d-0123456789",
+                "--region=us-east-1",
+                "--with-account-assignments",
+            ],
+        )
+
+        assert result.exit_code == 2
+        assert "--instance-arn" in result.output
+
+
+class TestServe:
+    def test_invoke(self, mocker: MockerFixture) -> None:
+        def fetch_all_user_with_mfa_device(
+            user_ids: list[str] | None = None, **kwargs: typing.Any
+        ) -> list[UserWithMfaDevice]:
+            return [
+                UserWithMfaDevice(
+                    active=True,
+                    user_id=user_id,
+                    user_name=f"{user_id}@example.com",
+                    display_name="John Doe",
+                    email=f"{user_id}@example.com",
+                    email_verification_status="VERIFIED",
+                    created_at=datetime(2000, 1, 23, 4, 56, tzinfo=UTC),
+                    updated_at=datetime(2000, 1, 23, 4, 56, tzinfo=UTC),
+                    mfa_devices=[],
+                )
+                for user_id in (user_ids or ["user1"])
+            ]
+
+        mocked_fetch_all_user_with_mfa_device = mocker.patch(
+            "aws_sso_user_list.cli.fetch_all_user_with_mfa_device",
+            side_effect=fetch_all_user_with_mfa_device,
+        )
+        lookups: list[bytes | None] = []
+
+        def serve_forever(server: typing.Any) -> None:
+            lookups.append(server.cache.lookup_user_id("user1"))
+            lookups.append(server.cache.lookup_user_id("user2"))
+            raise KeyboardInterrupt()
+
+        mocker.patch(
+            "aws_sso_user_list.cli.UserServer.serve_forever",
+            autospec=True,
+            side_effect=serve_forever,
+        )
+
+        runner = CliRunner()
+        result = runner.invoke(
+            cli=main,
+            args=[
+                "serve",
+                "--identity-store-id=d-0123456789",
+                "--region=us-east-1",
+                "--port=0",
+            ],
+        )
+
+        assert result.exit_code == 0, result.output
+        assert "Serving 1 users on http://127.0.0.1:" in result.stderr
+        assert [json.loads(data)["user_id"] for data in lookups if data] == [
+            "user1",
+            "user2",
+        ]
+        # The user missing from the cache is described directly
+        assert mocked_fetch_all_user_with_mfa_device.call_count == 2
+        assert mocked_fetch_all_user_with_mfa_device.call_args.kwargs[
+            "user_ids"
+        ] == ["user2"]
+
+
+class TestLoadtest:
+    def test_invoke(self, mocker: MockerFixture) -> None:
+        mocked_sweep = mocker.patch(
+            "aws_sso_user_list.cli.sweep",
+            return_value=[
+                LoadResult(
+                    users=1000,
+                    batch_size=25,
+                    max_workers=4,
+                    seconds=0.5,
+                    users_per_second=2000.0,
+                    requests=50,
+                    throttled=0,
+                    p99_latency=0.06,
+                    peak_rss_bytes=1024,
+                )
+            ],
+        )
+
+        runner = CliRunner()
+        result = runner.invoke(
+            cli=main,
+            args=[
+                "loadtest",
+                "--users=1000",
+                "--users=10000",
+                "--max-workers=4",
+                "--throttle-rate=0.1",
+            ],
+        )
+
+        assert result.exit_code == 0, result.output
+        mocked_sweep.assert_called_once_with(
+            user_counts=(1000, 10000),
+            batch_sizes=(25,),
+            max_workers_options=(4,),
+            latency=0.05,
+            throttle_rate=0.1,
+        )
+        assert result.stdout.splitlines()[1] == (
+            "1000,25,4,0.5,2000.0,50,0,0.06,1024,0,"
+        )
+
+
+class TestWatch:
+    def test_invoke_with_baseline(
+        self, mocker: MockerFixture, tmp_path: typing.Any
+    ) -> None:
+        baseline = tmp_path / "baseline.json"
+        baseline.write_text(json.dumps({"Users": []}))
+        mocked_fetch_all_user_with_mfa_device = mocker.patch(
+            "aws_sso_user_list.cli.fetch_all_user_with_mfa_device",
+            return_value=[
+                UserWithMfaDevice(
+                    active=True,
+                    user_id="01234567-89ab-cdef-0123-456789abcdef",
+                    user_name="user@example.com",
+                    display_name="John Doe",
+                    email="user@example.com",
+                    email_verification_status="VERIFIED",
+                    created_at=datetime(2000, 1, 23, 4, 56, tzinfo=UTC),
+                    updated_at=datetime(2000, 1, 23, 4, 56, tzinfo=UTC),
+                    mfa_devices=[],
+                )
+            ],
+        )
+        mocker.patch(
+            "aws_sso_user_list.cli.Watcher.run",
+            autospec=True,
+            side_effect=lambda watcher, interval, stopped: watcher.poll(),
+        )
+
+        runner = CliRunner()
+        result = runner.invoke(
+            cli=main,
+            args=[
+                "watch",
+                "--identity-store-id=d-0123456789",
+                "--region=us-east-1",
+                f"--baseline={baseline}",
+            ],
+        )
+
+        assert result.exit_code == 0, result.output
+        assert (
+            mocked_fetch_all_user_with_mfa_device.call_args.kwargs["failures"]
+            is not None
+        )
+        event = json.loads(result.stdout)
+        assert event["event"] == "UserCreated"
+        assert (
+            event["user"]["user_id"] == "01234567-89ab-cdef-0123-456789abcdef"
+        )
+
+
+class TestExportWarnings:
+    def test_invoke(self, mocker: MockerFixture) -> None:
+        def fetch_all_user_with_mfa_device(
+            **kwargs: typing.Any,
+        ) -> list[UserWithMfaDevice]:
+            warnings.warn("Sharded scan skipped", ShardedScanWarning)
+            return []
+
+        mocker.patch(
+            "aws_sso_user_list.cli.fetch_all_user_with_mfa_device",
+            side_effect=fetch_all_user_with_mfa_device,
+        )
+
+        runner = CliRunner()
+        result = runner.invoke(
+            cli=main,
+            args=[
+                "--identity-store-id=d-0123456789",
+                "--region=us-east-1",
+                "--sharded-scan",
+            ],
+        )
+
+        assert result.exit_code == 0, result.output
+        assert result.stderr == "Warning: Sharded scan skipped\n"
+
+
+class TestExportProgress:
+    def test_invoke(self, mocker: MockerFixture) -> None:
+        mocker.patch(
+            "aws_sso_user_list.cli.fetch_all_user_with_mfa_device",
+            return_value=[],
+        )
+
+        runner = CliRunner()
+        result = runner.invoke(
+            cli=main,
+            args=[
+                "--identity-store-id=d-0123456789",
+                "--region=us-east-1",
+                "--progress=json",
+            ],
+        )
+
+        assert result.exit_code == 0, result.output
+        assert json.loads(result.stdout) == {"Users": []}
+        assert json.loads(result.stderr.splitlines()[-1])["users"] == 0
@@ -0,0 +1,40 @@
+import threading
+import typing
+from concurrent.futures import ThreadPoolExecutor
+
+from aws_sso_user_list.concurrency import bounded_map
+
+
+class TestBoundedMap:
+    def test_call(self) -> None:
+        released = threading.Event()
+
+        def function(item: int) -> int:
+            # Later items finish first, but are still handed out in order
+            if item == 0:
+                released.wait(5)
+            return item * 2
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            pairs = bounded_map(executor, function, range(10), 3)
+            released.set()
+            results = [(item, future.result()) for item, future in pairs]
+
+        assert results == [(item, item * 2) for item in range(10)]
+
+    def test_call_pending(self) -> None:
+        consumed: list[int] = []
+
+        def items() -> typing.Iterator[int]:
+            for item in range(10):
+                consumed.append(item)
+                yield item
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            pairs = bounded_map(executor, lambda item: item, items(), 2)
+            item, _ = next(pairs)
+
+            # Only two items are submitted before the first is handed out
+            assert item == 0
+            assert consumed == [0, 1]
+            assert [item for item, _ in pairs] == list(range(1, 10))
@@ -0,0 +1,137 @@
+import io
+import json
+import typing
+from datetime import UTC, datetime
+
+import pytest
+
+from aws_sso_user_list.diff import UserChange, diff_users, load_users
+from aws_sso_user_list.mfa_device import MfaDevice
+from aws_sso_user_list.utils import UserWithMfaDevice
+
+
+def make_user(
+    user_id: str,
+    active: bool = True,
+    email_verification_status: str = "VERIFIED",
+    device_ids: typing.Sequence[str] = (),
+) -> UserWithMfaDevice:
+    return UserWithMfaDevice(
+        active=active,
+        user_id=user_id,
+        user_name=f"{user_id}@example.com",
+        display_name="John Doe",
+        email=f"{user_id}@example.com",
+        email_verification_status=email_verification_status,
+        created_at=datetime(2000, 1, 23, 4, 56, tzinfo=UTC),
+        updated_at=datetime(2000, 1, 23, 4, 56, tzinfo=UTC),
+        mfa_devices=[
+            MfaDevice(
+                device_id=device_id,
+                device_name=f"{device_id}_name",
+                display_name="MFA Device",
+                mfa_type="WEBAUTHN",
+                registered_date=datetime(2000, 1, 23, 4, 56, tzinfo=UTC),
+            )
+            for device_id in device_ids
+        ],
+    )
+
+
+class TestUserChange:
+    @pytest.fixture
+    def target(self) -> typing.Type[UserChange]:
+        return UserChange
+
+    def test_from_users_unchanged(
+        self, target: typing.Type[UserChange]
+    ) -> None:
+        old = make_user("user1", device_ids=["m-1"])
+        new = make_user("user1", device_ids=["m-1"])
+
+        assert target.from_users(old, new) is None
+
+    def test_from_users_changed(self, target: typing.Type[UserChange]) -> None:
+        old = make_user(
+            "user1",
+            email_verification_status="NOT_VERIFIED",
+            device_ids=["m-1", "m-2"],
+        )
+        new = make_user("user1", active=False, device_ids=["m-2", "m-3"])
+
+        change = target.from_users(old, new)
+
+        assert change is not None
+        assert change.changes == {
+            "active": (True, False),
+            "email_verification_status": ("NOT_VERIFIED", "VERIFIED"),
+        }
+        assert [device.device_id for device in change.added_mfa_devices] == [
+            "m-3"
+        ]
+        assert [device.device_id for device in change.removed_mfa_devices] == [
+            "m-1"
+        ]
+
+
+class TestDiffUsers:
+    @pytest.fixture
+    def target(
+        self,
+    ) -> typing.Callable[
+        [list[UserWithMfaDevice], list[UserWithMfaDevice]], typing.Any
+    ]:
+        return diff_users
+
+    def test_call_success(self, target: typing.Callable) -> None:
+        old_users = [
+            make_user("user1"),
+            make_user("user2"),
+            make_user("user3"),
+        ]
+        new_users = [
+            make_user("user4"),
+            make_user("user3", active=False),
+            make_user("user1"),
+        ]
+
+        user_diff = target(old_users, new_users)
+
+        assert [user.user_id for user in user_diff.added] == ["user4"]
+        assert [user.user_id for user in user_diff.removed] == ["user2"]
+        assert [change.user_id for change in user_diff.changed] == ["user3"]
+
+
+class TestLoadUsers:
+    def test_call_success(self) -> None:
+        data = {
+            "Users": [
+                {
+                    "active": True,
+                    "user_id": "01234567-89ab-cdef-0123-456789abcdef",
+                    "user_name": "user@example.com",
+                    "display_name": "John Doe",
+                    "email": "user@example.com",
+                    "email_verification_status": "VERIFIED",
+                    "created_at": "2000-01-23T04:56:00+00:00",
+                    "updated_at": "2000-01-23T04:56:00+00:00",
+                    "mfa_devices": [
+                        {
+                            "device_id": "m-0123456789abcdef_id",
+                            "device_name": "m-0123456789abcdef_name",
+                            "display_name": "MFA Device",
+                            "mfa_type": "WEBAUTHN",
+                            "registered_date": "2000-01-23T04:56:00+00:00",
+                        },
+                    ],
+                },
+            ],
+        }
+
+        users = load_users(io.StringIO(json.dumps(data)))
+
+        assert len(users) == 1
+        assert users[0].created_at == datetime(2000, 1, 23, 4, 56, tzinfo=UTC)
+        assert users[0].mfa_devices[0].registered_date == datetime(
+            2000, 1, 23, 4, 56, tzinfo=UTC
+        )
@@ -0,0 +1,234 @@
+import csv
+import io
+import json
+import zipfile
+from datetime import UTC, datetime
+from xml.etree import ElementTree
+
+import pytest
+
+from aws_sso_user_list.exporter import (
+    UserCsvExporter,
+    UserJsonExporter,
+    UserMfaDeviceCsvExporter,
+    UserXlsxExporter,
+    json_default,
+)
+from aws_sso_user_list.mfa_device import MfaDevice
+from aws_sso_user_list.utils import UserWithMfaDevice
+
+
+class TestUserJsonExporter:
+    @pytest.mark.parametrize("count", [0, 1, 3])
+    def test_export_matches_json_dump(self, count: int) -> None:
+        users = [
+            UserWithMfaDevice(
+                active=True,
+                user_id=f"user{i}",
+                user_name=f"user{i}@example.com",
+                display_name="John Doe",
+                email=f"user{i}@example.com",
+                email_verification_status="VERIFIED",
+                created_at=datetime(2000, 1, 23, 4, 56, tzinfo=UTC),
+                updated_at=datetime(2000, 1, 23, 4, 56, tzinfo=UTC),
+                mfa_devices=[],
+            )
+            for i in range(count)
+        ]
+        output = io.StringIO()
+
+        UserJsonExporter(iter(users)).export(output)
+
+        assert output.getvalue() == json.dumps(
+            {"Users": [user.to_dict() for user in users]},
+            indent=2,
+            default=json_default,
+            ensure_ascii=False,
+        )
+
+
+class TestUserXlsxExporter:
+    def test_export(self) -> None:
+        users = [
+            UserWithMfaDevice(
+                active=True,
+                user_id="user1",
+                user_name="user1@example.com",
+                display_name="John Doe",
+                email="user1@example.com",
+                email_verification_status="VERIFIED",
+                created_at=datetime(2000, 1, 1, tzinfo=UTC),
+                updated_at=datetime(2000, 1, 1, 12, tzinfo=UTC),
+                mfa_devices=[],
+            )
+        ]
+        buffer = io.BytesIO()
+        output = io.TextIOWrapper(buffer, encoding="utf-8")
+
+        UserXlsxExporter(iter(users)).export(output)
+
+        with zipfile.ZipFile(io.BytesIO(buffer.getvalue())) as zip_file:
+            sheet = ElementTree.fromstring(
+                zip_file.read("xl/worksheets/sheet1.xml")
+            )
+        namespace = (
+            "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+        )
+        rows = [
+            [
+                (
+                    element.get("t"),
+                    element.get("s"),
+                    "".join(element.itertext()),
+                )
+                for element in row
+            ]
+            for row in sheet.iter(f"{namespace}row")
+        ]
+        assert [value for _, _, value in rows[0]] == [
+            "Active",
+            "UserId",
+            "UserName",
+            "DisplayName",
+            "Email",
+            "EmailVerificationStatus",
+            "MfaDeviceCount",
+            "CreatedAt",
+            "UpdatedAt",
+        ]
+        assert rows[1] == [
+            ("b", None, "1"),
+            ("inlineStr", None, "user1"),
+            ("inlineStr", None, "user1@example.com"),
+            ("inlineStr", None, "John Doe"),
+            ("inlineStr", None, "user1@example.com"),
+            ("inlineStr", None, "VERIFIED"),
+            (None, None, "0"),
+            (None, "1", "36526.0"),
+            (None, "1", "36526.5"),
+        ]
+
+
+class TestUserCsvExporter:
+    @pytest.mark.parametrize("with_groups", [False, True])
+    def test_export_groups(self, with_groups: bool) -> None:
+        user = UserWithMfaDevice(
+            active=True,
+            user_id="user1",
+            user_name="user1@example.com",
+            display_name="John Doe",
+            email="user1@example.com",
+            email_verification_status="VERIFIED",
+            created_at=datetime(2000, 1, 1, tzinfo=UTC),
+            updated_at=datetime(2000, 1, 1, tzinfo=UTC),
+            mfa_devices=[],
+            groups=["Admins", "Developers"],
+        )
+        output = io.StringIO()
+
+        UserCsvExporter([user], with_groups=with_groups).export(output)
+
+        header, row = csv.reader(io.StringIO(output.getvalue()))
+        assert ("Groups" in header) is with_groups
+        assert ("Admins;Developers" in row) is with_groups
+
+    def test_export_matches_dict_writer(self) -> None:
+        user = UserWithMfaDevice(
+            active=True,
+            user_id="user1",
+            user_name="user1@example.com",
+            display_name='John "JD" Doe',
+            email="user1@example.com",
+            email_verification_status="",
+            created_at=datetime(2000, 1, 1, tzinfo=UTC),
+            updated_at=datetime(2000, 1, 2, tzinfo=UTC),
+            mfa_devices=[],
+        )
+        fieldnames = UserCsvExporter.fieldnames
+        expected = io.StringIO()
+        writer = csv.DictWriter(expected, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerow(dict(zip(fieldnames, UserCsvExporter.row(user))))
+        output = io.StringIO()
+
+        UserCsvExporter([user]).export(output)
+
+        assert output.getvalue() == expected.getvalue()
+        assert output.getvalue().splitlines()[1] == (
+            'True,user1,user1@example.com,"John ""JD"" Doe",'
+            "user1@example.com,,0,"
+            "2000-01-01T00:00:00+00:00,2000-01-02T00:00:00+00:00"
+        )
+
+    def test_export_unknown_mfa_devices(self) -> None:
+        user = UserWithMfaDevice(
+            active=True,
+            user_id="user1",
+            user_name="user1@example.com",
+            display_name="John Doe",
+            email="user1@example.com",
+            email_verification_status="VERIFIED",
+            created_at=datetime(2000, 1, 1, tzinfo=UTC),
+            updated_at=datetime(2000, 1, 1, tzinfo=UTC),
+            mfa_devices=None,
+        )
+        output, device_output = io.StringIO(), io.StringIO()
+
+        UserCsvExporter([user]).export(output)
+        UserMfaDeviceCsvExporter([user]).export(device_output)
+
+        _, row = csv.reader(io.StringIO(output.getvalue()))
+        assert row[6] == ""
+        _, device_row = csv.reader(io.StringIO(device_output.getvalue()))
+        assert device_row[4:] == ["", "", "UNKNOWN", ""]
+
+
+class TestUserMfaDeviceCsvExporter:
+    def test_export(self) -> None:
+        users = [
+            UserWithMfaDevice(
+                active=True,
+                user_id=f"user{index}",
+                user_name=f"user{index}@example.com",
+                display_name="John Doe",
+                email=f"user{index}@example.com",
+                email_verification_status="VERIFIED",
+                created_at=datetime(2000, 1, 1, tzinfo=UTC),
+                updated_at=datetime(2000, 1, 1, tzinfo=UTC),
+                mfa_devices=[
+                    MfaDevice(
+                        device_id=f"device{index}-{device_index}",
+                        device_name="Phone",
+                        display_name=None,
+                        mfa_type="TOTP",
+                        registered_date=datetime(2000, 1, 1, tzinfo=UTC),
+                    )
+                    for device_index in range(index)
+                ],
+                groups=["Admins"],
+            )
+            for index in range(3)
+        ]
+        output = io.StringIO()
+
+        UserMfaDeviceCsvExporter(users, with_groups=True).export(output)
+
+        header, *rows = csv.reader(io.StringIO(output.getvalue()))
+        assert header == [
+            "Active",
+            "UserId",
+            "UserName",
+            "Email",
+            "DeviceId",
+            "DeviceName",
+            "MfaType",
+            "RegisteredDate",
+            "Groups",
+        ]
+        assert [(row[1], row[4], row[8]) for row in rows] == [
+            ("user0", "", "Admins"),
+            ("user1", "device1-0", "Admins"),
+            ("user2", "device2-0", "Admins"),
+            ("user2", "device2-1", "Admins"),
+        ]
+        assert rows[1][6:8] == ["TOTP", "2000-01-01T00:00:00+00:00"]
@@ -0,0 +1,54 @@
+import typing
+
+import pytest
+
+from aws_sso_user_list.fanout import fan_out
+
+
+class TestFanOut:
+    @pytest.fixture
+    def target(self) -> typing.Callable:
+        return fan_out
+
+    def test_call_success(self, target: typing.Callable) -> None:
+        results: list[list[int]] = [[], []]
+
+        target(
+            iter(range(100)),
+            [results[0].extend, results[1].extend],
+            maxsize=4,
+        )
+
+        assert results == [list(range(100)), list(range(100))]
+
+    def test_consumer_error(self, target: typing.Callable) -> None:
+        results: list[int] = []
+
+        def fail(items: typing.Iterable[int]) -> None:
+            for item in items:
+                if item == 10:
+                    raise ValueError(item)
+
+        with pytest.raises(ValueError):
+            target(iter(range(100)), [results.extend, fail], maxsize=4)
+
+        assert results == list(range(100))
+
+    def test_producer_error(self, target: typing.Callable) -> None:
+        results: list[list[int]] = [[], []]
+
+        def items() -> typing.Iterator[int]:
+            yield from range(10)
+            raise KeyError("user")
+
+        def consume(index: int) -> typing.Callable:
+            def consumer(items: typing.Iterable[int]) -> None:
+                for item in items:
+                    results[index].append(item)
+
+            return consumer
+
+        with pytest.raises(KeyError):
+            target(items(), [consume(0), consume(1)], maxsize=4)
+
+        assert results == [list(range(10)), list(range(10))]
@@ -0,0 +1,135 @@
+import json
+import os
+import typing
+
+import pytest
+from botocore.auth import SigV4Auth
+from botocore.session import Session
+from pytest_mock import MockerFixture
+from requests import Response
+
+from aws_sso_user_list.group import (
+    GroupMemberships,
+    UserGroups,
+    _fetch_group_memberships,
+    iter_all_groups,
+)
+
+
+@pytest.fixture
+def credential_env() -> dict[str, str]:
+    credentials = {
+        "AWS_ACCESS_KEY_ID": "testing",
+        "AWS_SECRET_ACCESS_KEY": "testing",
+        "AWS_SECURITY_TOKEN": "testing",
+        "AWS_SESSION_TOKEN": "testing",
+        "AWS_DEFAULT_REGION": "us-east-1",
+    }
+
+    for key, value in credentials.items():
+        os.environ[key] = value
+
+    return credentials
+
+
+class TestFetchGroupMemberships:
+    @pytest.fixture
+    def target(self) -> typing.Callable[..., dict]:
+        return _fetch_group_memberships
+
+    def test_call_success(
+        self,
+        target: typing.Callable[..., dict],
+        credential_env: dict[str, str],
+        mocker: MockerFixture,
+    ) -> None:
+        response = Response()
+        response.status_code = 200
+        response._content = json.dumps(
+            {"GroupMemberships": [{"GroupId": "g1"}]}
+        ).encode()
+        mocked_post = mocker.patch("requests.post", return_value=response)
+        sigv4_auth = SigV4Auth(
+            credentials=Session().get_credentials(),
+            service_name="identitystore",
+            region_name="us-east-1",
+        )
+
+        data = target(sigv4_auth, "d-1234567890", "us-east-1", "user1", "X")
+
+        assert data == {"GroupMemberships": [{"GroupId": "g1"}]}
+        mocked_post.assert_called_once()
+        args, kwargs = mocked_post.call_args
+        assert args[0] == "https://identitystore.us-east-1.amazonaws.com/"
+        assert kwargs["headers"]["X-Amz-Target"] == (
+            "AWSIdentityStore.ListGroupMembershipsForMember"
+        )
+        assert "Authorization" in kwargs["headers"]
+        assert json.loads(kwargs["data"]) == {
+            "IdentityStoreId": "d-1234567890",
+            "MemberId": {"UserId": "user1"},
+            "MaxResults": 100,
+            "NextToken": "X",
+        }
+
+
+class TestIterAllGroups:
+    @pytest.fixture
+    def target(self) -> typing.Callable[..., typing.Iterator[UserGroups]]:
+        return iter_all_groups
+
+    def test_call_success(
+        self,
+        target: typing.Callable[..., typing.Iterator[UserGroups]],
+        credential_env: dict[str, str],
+        mocker: MockerFixture,
+    ) -> None:
+        responses = {
+            ("user1", None): {
+                "GroupMemberships": [{"GroupId": "g2"}],
+                "NextToken": "X",
+            },
+            ("user1", "X"): {"GroupMemberships": [{"GroupId": "g1"}]},
+            ("user2", None): {"GroupMemberships": [{"GroupId": "g2"}]},
+            ("user3", None): {"GroupMemberships": []},
+        }
+
+        def fetch_group_memberships(
+            user_id: str, next_token: str | None, **kwargs: typing.Any
+        ) -> dict:
+            return responses[(user_id, next_token)]
+
+        mocker.patch(
+            "aws_sso_user_list.group._fetch_group_memberships",
+            side_effect=fetch_group_memberships,
+        )
+        mocked_describe_group = mocker.patch(
+            "aws_sso_user_list.group._describe_group",
+            side_effect=lambda group_id, **kwargs: {
+                "GroupId": group_id,
+                "DisplayName": f"Group {group_id}",
+            },
+        )
+
+        memberships = GroupMemberships()
+        user_groups = list(
+            target(
+                "d-1234567890",
+                "us-east-1",
+                ["user1", "user2", "user3"],
+                max_workers=2,
+                memberships=memberships,
+            )
+        )
+
+        assert user_groups == [
+            UserGroups(user_id="user1", group_names=["Group g1", "Group g2"]),
+            UserGroups(user_id="user2", group_names=["Group g2"]),
+            UserGroups(user_id="user3", group_names=[]),
+        ]
+        assert mocked_describe_group.call_count == 2
+        assert memberships.group_ids == {
+            "user1": ["g2", "g1"],
+            "user2": ["g2"],
+            "user3": [],
+        }
@@ -0,0 +1,94 @@
+import threading
+import typing
+
+import pytest
+
+from aws_sso_user_list import metrics
+from aws_sso_user_list.hedging import Hedge
+
+
+class TestHedge:
+    @pytest.fixture
+    def target(self) -> typing.Iterator[Hedge]:
+        hedge = Hedge(percentile=50, max_workers=1, min_samples=2)
+        yield hedge
+        hedge.close()
+
+    def test_delay(self, target: Hedge) -> None:
+        assert target.delay() is None
+
+        for seconds in [0.4, 0.1, 0.3, 0.2]:
+            target.observe(seconds)
+
+        assert target.delay() == 0.3
+
+    def test_call_without_samples(self, target: Hedge) -> None:
+        assert target.call(lambda x: x * 2, 21) == 42
+        assert list(target.latencies) != []
+
+    def test_call_hedged(self, target: Hedge, tmp_path: str) -> None:
+        target.observe(0.01)
+        target.observe(0.01)
+        released = threading.Event()
+        calls: list[int] = []
+
+        def function() -> str:
+            calls.append(1)
+            if len(calls) == 1:
+                released.wait(5)
+                return "slow"
+            return "fast"
+
+        with metrics.collect(f"{tmp_path}/metrics.prom") as collected:
+            result = target.call(function)
+        released.set()
+
+        assert result == "fast"
+        assert collected is not None
+        assert collected.counters["hedged_requests"] == 1
+
+    def test_call_hedged_error(self, target: Hedge) -> None:
+        target.observe(0.01)
+        target.observe(0.01)
+        released = threading.Event()
+        calls: list[int] = []
+
+        def function() -> str:
+            calls.append(1)
+            if len(calls) == 1:
+                released.wait(0.2)
+                return "slow"
+            raise RuntimeError()
+
+        assert target.call(function) == "slow"
+
+    def test_call_error(self, target: Hedge) -> None:
+        def function() -> None:
+            raise RuntimeError()
+
+        with pytest.raises(RuntimeError):
+            target.call(function)
+        assert list(target.latencies) == []
+
+    def test_call_not_succeeded(self, target: Hedge) -> None:
+        assert target.call(lambda: 503, succeeded=lambda x: x == 200) == 503
+        assert list(target.latencies) == []
+
+    def test_call_hedged_observes_primary(self, target: Hedge) -> None:
+        target.observe(0.01)
+        target.observe(0.01)
+        released = threading.Event()
+        calls: list[int] = []
+
+        def function() -> str:
+            calls.append(1)
+            if len(calls) == 1:
+                released.wait(5)
+                return "slow"
+            return "fast"
+
+        assert target.call(function) == "fast"
+        # The duplicate is not a sample, and the slow first request has
+        # not answered yet
+        assert list(target.latencies) == [0.01, 0.01]
+        released.set()
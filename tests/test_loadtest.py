@@ -0,0 +1,188 @@
+import io
+import typing
+
+import pytest
+import requests
+from pytest_mock import MockerFixture
+
+from aws_sso_user_list.loadtest import (
+    LoadResult,
+    StubServer,
+    percentile,
+    run_load,
+    serve_stub,
+    stub_user_id,
+    sweep,
+    write_results,
+)
+
+
+class TestStubServer:
+    @pytest.fixture
+    def target(self) -> typing.Iterator[StubServer]:
+        server = StubServer(("127.0.0.1", 0), users=150)
+        yield server
+        server.server_close()
+
+    def test_search_users(self, target: StubServer) -> None:
+        first = target.search_users({"MaxResults": 100})
+        second = target.search_users(
+            {"MaxResults": 100, "NextToken": first["NextToken"]}
+        )
+
+        assert len(first["Users"]) == 100
+        assert first["NextToken"] == "100"
+        assert len(second["Users"]) == 50
+        assert "NextToken" not in second
+        assert second["Users"][-1]["UserId"] == stub_user_id(149)
+
+    def test_list_mfa_devices(self, target: StubServer) -> None:
+        response = target.list_mfa_devices(
+            {
+                "userList": [
+                    {"directoryId": "d-0000000000", "userId": stub_user_id(i)}
+                    for i in range(3)
+                ]
+            }
+        )
+
+        assert [
+            len(entry["mfaDevices"])
+            for entry in response["userMfaDevicesEntryList"]
+        ] == [0, 1, 2]
+
+
+class TestServeStub:
+    def test_throttle(self) -> None:
+        headers = {"X-Amz-Target": "AWSIdentityStoreService.SearchUsers"}
+        with serve_stub(10, throttle_rate=1.0) as endpoint:
+            response = requests.post(endpoint, headers=headers, data="{}")
+
+        assert response.status_code == 400
+        assert response.json()["__type"] == "ThrottlingException"
+
+    def test_unknown_operation(self) -> None:
+        with serve_stub(10) as endpoint:
+            response = requests.post(
+                endpoint,
+                headers={"X-Amz-Target": "AWSIdentityStoreService.Unknown"},
+                data="{}",
+            )
+
+        assert response.status_code == 400
+        assert response.json()["__type"] == "UnknownOperationException"
+
+
+class TestRunLoad:
+    @pytest.fixture
+    def target(self) -> typing.Callable[..., LoadResult]:
+        return run_load
+
+    def test_run_load(self, target: typing.Callable[..., LoadResult]) -> None:
+        with serve_stub(120) as endpoint:
+            result = target(endpoint, users=120, batch_size=25, max_workers=2)
+
+        assert result.users == 120
+        assert result.batch_size == 25
+        assert result.max_workers == 2
+        # Two SearchUsers pages and five MFA device batches
+        assert result.requests == 7
+        assert result.throttled == 0
+        assert result.users_per_second > 0
+        assert result.p99_latency > 0
+        assert result.peak_rss_bytes > 0
+        assert result.failed_users == 0
+        assert result.error == ""
+
+    def test_run_load_error(
+        self,
+        target: typing.Callable[..., LoadResult],
+        mocker: MockerFixture,
+    ) -> None:
+        mocker.patch(
+            "aws_sso_user_list.loadtest.fetch_all_user_with_mfa_device",
+            side_effect=KeyError("Users"),
+        )
+
+        with serve_stub(10) as endpoint:
+            result = target(endpoint, users=10, batch_size=5, max_workers=1)
+
+        assert result.users_per_second == 0.0
+        assert result.error == "KeyError: 'Users'"
+
+    def test_run_load_failed_users(
+        self,
+        target: typing.Callable[..., LoadResult],
+        mocker: MockerFixture,
+    ) -> None:
+        def fetch(**kwargs: typing.Any) -> list:
+            kwargs["failures"].add(
+                "BatchListMfaDevicesForUser", ["u1", "u2"], "Throttled"
+            )
+            return [None] * 10
+
+        mocker.patch(
+            "aws_sso_user_list.loadtest.fetch_all_user_with_mfa_device",
+            side_effect=fetch,
+        )
+
+        with serve_stub(10) as endpoint:
+            result = target(endpoint, users=10, batch_size=5, max_workers=1)
+
+        assert result.failed_users == 2
+        assert result.error == ""
+
+
+class TestSweep:
+    def test_sweep(self) -> None:
+        results = list(
+            sweep(
+                user_counts=[10],
+                batch_sizes=[5, 10],
+                max_workers_options=[1],
+                latency=0.0,
+            )
+        )
+
+        assert [(result.users, result.batch_size) for result in results] == [
+            (10, 5),
+            (10, 10),
+        ]
+        assert [result.requests for result in results] == [3, 2]
+
+
+class TestPercentile:
+    def test_percentile(self) -> None:
+        values = [float(value) for value in range(100, 0, -1)]
+
+        assert percentile(values, 99) == 99.0
+        assert percentile(values, 100) == 100.0
+        assert percentile([0.5], 99) == 0.5
+        assert percentile([], 99) == 0.0
+
+
+class TestWriteResults:
+    def test_write_results(self) -> None:
+        output = io.StringIO()
+        write_results(
+            [
+                LoadResult(
+                    users=1000,
+                    batch_size=25,
+                    max_workers=4,
+                    seconds=0.5,
+                    users_per_second=2000.0,
+                    requests=50,
+                    throttled=1,
+                    p99_latency=0.06,
+                    peak_rss_bytes=1024,
+                )
+            ],
+            output,
+        )
+
+        assert output.getvalue().splitlines() == [
+            "Users,BatchSize,MaxWorkers,Seconds,UsersPerSecond,Requests,"
+            "Throttled,P99LatencySeconds,PeakRssBytes,FailedUsers,Error",
+            "1000,25,4,0.5,2000.0,50,1,0.06,1024,0,",
+        ]
@@ -0,0 +1,50 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from aws_sso_user_list.lookup import LookupCache
+
+
+class TestLookupCache:
+    def test_get(self) -> None:
+        started = threading.Event()
+        released = threading.Event()
+        calls: list[str] = []
+
+        def describe(group_id: str) -> str:
+            calls.append(group_id)
+            started.set()
+            released.wait(5)
+            return f"name-{group_id}"
+
+        target = LookupCache(describe)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futures = [executor.submit(target.get, "g1") for _ in range(4)]
+            started.wait(5)
+            released.set()
+            names = [future.result() for future in futures]
+
+        assert names == ["name-g1"] * 4
+        assert calls == ["g1"]
+        assert target.get("g1") == "name-g1"
+        assert len(target) == 1
+
+    def test_get_error(self) -> None:
+        calls: list[str] = []
+
+        def describe(group_id: str) -> str:
+            calls.append(group_id)
+            if len(calls) == 1:
+                raise RuntimeError(group_id)
+            return f"name-{group_id}"
+
+        target = LookupCache(describe)
+
+        with pytest.raises(RuntimeError):
+            target.get("g1")
+        assert len(target) == 0
+        # A failed lookup is not cached, so the next one tries again
+        assert target.get("g1") == "name-g1"
+        assert target.get("g1") == "name-g1"
+        assert calls == ["g1", "g1"]
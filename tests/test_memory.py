@@ -0,0 +1,58 @@
+import io
+import tracemalloc
+
+import pytest
+
+from aws_sso_user_list import memory
+from aws_sso_user_list.cli import read_lines
+from aws_sso_user_list.memory import MemoryStats
+
+
+class TestMemoryStats:
+    @pytest.fixture
+    def target(self) -> MemoryStats:
+        return MemoryStats()
+
+    def test_stage(self, target: MemoryStats) -> None:
+        tracemalloc.start(memory.TRACEBACK_LIMIT)
+        try:
+            with target.stage("outer"):
+                with target.stage("inner"):
+                    lines = read_lines(io.StringIO("user\n" * 10000))
+                    transient = bytearray(4 * 1024 * 1024)
+                    del transient
+        finally:
+            tracemalloc.stop()
+
+        inner, outer = target.stages
+        assert inner.name == "inner"
+        assert inner.peak >= 4 * 1024 * 1024
+        assert outer.peak >= inner.peak
+        assert 0 < inner.retained < 4 * 1024 * 1024
+        assert inner.top_sites[0][0].startswith("aws_sso_user_list/cli.py:")
+        # The snapshots of the profiler are not reported
+        assert not any(
+            site.startswith("aws_sso_user_list/memory.py:")
+            for stage in target.stages
+            for site, _ in stage.top_sites
+        )
+        assert "Top allocating call sites in inner:" in target.render()
+        assert len(lines) == 10000
+
+
+class TestCollect:
+    def test_collect(self) -> None:
+        with memory.collect(True) as stats:
+            assert tracemalloc.is_tracing()
+            with memory.stage("fetch_users"):
+                pass
+
+        assert not tracemalloc.is_tracing()
+        assert stats is not None
+        assert [stage.name for stage in stats.stages] == ["fetch_users"]
+
+    def test_collect_disabled(self) -> None:
+        with memory.collect(False) as stats, memory.stage("fetch_users"):
+            assert not tracemalloc.is_tracing()
+
+        assert stats is None
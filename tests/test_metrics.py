@@ -0,0 +1,160 @@
+import time
+import typing
+
+import pytest
+from pytest_mock import MockerFixture
+
+from aws_sso_user_list import memory, metrics
+from aws_sso_user_list.metrics import Histogram, Metrics
+from aws_sso_user_list.transport import BaseTransport, TransportResponse
+
+
+class TestHistogram:
+    def test_observe(self) -> None:
+        histogram = Histogram([0.1, 1.0])
+
+        for value in (0.05, 0.1, 0.5, 5.0):
+            histogram.observe(value)
+
+        assert histogram.cumulative_counts() == [2, 3]
+        assert histogram.count == 4
+        assert histogram.sum == pytest.approx(5.65)
+
+
+class TestMetrics:
+    @pytest.fixture
+    def target(self) -> Metrics:
+        return Metrics()
+
+    def test_render(self, target: Metrics) -> None:
+        target.observe_stage("fetch_users", 1.5)
+        target.observe_request("SearchUsers", 200, 0.2)
+        target.observe_request("SearchUsers", 400, 0.02)
+        target.observe_throttle("SearchUsers")
+        target.observe_retry("SearchUsers")
+        target.increment("users", 1234567)
+        target.increment("mfa_devices", 3)
+
+        lines = target.render(success=True).splitlines()
+
+        assert "# TYPE sso_user_list_requests_total counter" in lines
+        assert (
+            'sso_user_list_stage_duration_seconds{stage="fetch_users"} 1.5'
+            in lines
+        )
+        assert (
+            'sso_user_list_requests_total{target="SearchUsers",status="200"} 1'
+            in lines
+        )
+        assert (
+            "sso_user_list_request_duration_seconds_bucket"
+            '{target="SearchUsers",le="0.05"} 1' in lines
+        )
+        assert (
+            "sso_user_list_request_duration_seconds_bucket"
+            '{target="SearchUsers",le="+Inf"} 2' in lines
+        )
+        assert (
+            'sso_user_list_request_duration_seconds_count{target="SearchUsers"} 2'  # noqa: E501
+            in lines
+        )
+        assert 'sso_user_list_throttles_total{target="SearchUsers"} 1' in lines
+        assert 'sso_user_list_retries_total{target="SearchUsers"} 1' in lines
+        assert "sso_user_list_users 1234567" in lines
+        assert "sso_user_list_mfa_devices 3" in lines
+        assert "sso_user_list_last_run_success 1" in lines
+
+
+class TestCollect:
+    def test_write_on_success(self, tmp_path: typing.Any) -> None:
+        path = tmp_path / "sso_user_list.prom"
+
+        with metrics.collect(str(path)) as collected:
+            assert metrics.active() is collected
+            with metrics.stage("export"):
+                pass
+            metrics.increment("users", 2)
+
+        assert metrics.active() is None
+        text = path.read_text()
+        assert 'sso_user_list_stage_duration_seconds{stage="export"}' in text
+        assert "sso_user_list_users 2" in text
+        assert "sso_user_list_last_run_success 1" in text
+
+    def test_iter_stage(self, tmp_path: typing.Any) -> None:
+        def produce() -> typing.Iterator[int]:
+            for item in range(3):
+                time.sleep(0.01)
+                yield item
+
+        with (
+            metrics.collect(str(tmp_path / "sso_user_list.prom")) as collected,
+            memory.collect(True) as stats,
+        ):
+            for _ in metrics.iter_stage("fetch_users", produce()):
+                # Time spent by the consumer is not part of the stage
+                time.sleep(0.05)
+
+        assert collected is not None
+        assert 0.03 <= collected.stage_durations["fetch_users"] < 0.15
+        assert stats is not None
+        assert [stage.name for stage in stats.stages] == ["fetch_users"]
+
+    @pytest.mark.parametrize(
+        "max_retries, status_code, requests, retries",
+        [(3, 200, 3, 2), (1, 503, 2, 1), (0, 429, 1, 0)],
+    )
+    def test_write_retries(
+        self,
+        tmp_path: typing.Any,
+        mocker: MockerFixture,
+        max_retries: int,
+        status_code: int,
+        requests: int,
+        retries: int,
+    ) -> None:
+        path = tmp_path / "sso_user_list.prom"
+        transport = BaseTransport(max_retries=max_retries, backoff=0)
+        mocker.patch.object(
+            transport,
+            "send",
+            side_effect=[
+                TransportResponse(status_code=429, content=b""),
+                TransportResponse(status_code=503, content=b""),
+                TransportResponse(status_code=200, content=b"{}"),
+            ],
+        )
+        headers = {"X-Amz-Target": "AWSIdentityStoreService.SearchUsers"}
+
+        with metrics.collect(str(path)):
+            response = transport.post("https://example.com/", headers, "{}")
+
+        assert response.status_code == status_code
+        lines = path.read_text().splitlines()
+        assert (
+            sum(
+                int(line.rsplit(" ", 1)[1])
+                for line in lines
+                if line.startswith("sso_user_list_requests_total{")
+            )
+            == requests
+        )
+        retries_line = (
+            f'sso_user_list_retries_total{{target="SearchUsers"}} {retries}'
+        )
+        assert (retries_line in lines) == bool(retries)
+
+    def test_write_on_failure(self, tmp_path: typing.Any) -> None:
+        path = tmp_path / "sso_user_list.prom"
+
+        with pytest.raises(RuntimeError):
+            with metrics.collect(str(path)):
+                raise RuntimeError()
+
+        assert "sso_user_list_last_run_success 0" in path.read_text()
+
+    def test_disabled(self) -> None:
+        with metrics.collect(None) as collected:
+            metrics.increment("users")
+
+        assert collected is None
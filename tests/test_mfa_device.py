@@ -9,6 +9,7 @@ from botocore.session import Session
 from pytest_mock import MockerFixture
 from requests import Response
 
+from aws_sso_user_list.failures import FailureReport
 from aws_sso_user_list.mfa_device import (
     MfaDevice,
     UserMfa,
@@ -281,3 +282,96 @@ class TestFetchAllMfaDevices:
             user_mfa_devices[1].mfa_devices[0].device_id
             == "m-0123456789abcdef_id2"  # noqa: E501
         )
+
+    def test_call_concurrently(
+        self,
+        target: typing.Callable[..., list[UserMfa]],
+        credential_env: dict[str, str],
+        mocker: MockerFixture,
+    ) -> None:
+        def fetch_mfa_devices(user_ids: list[str], **kwargs: str) -> dict:
+            return {
+                "userMfaDevicesEntryList": [
+                    {"mfaDevices": [], "user": {"userId": user_id}}
+                    for user_id in user_ids
+                ],
+            }
+
+        mocked_fetch_mfa_devices = mocker.patch(
+            "aws_sso_user_list.mfa_device._fetch_mfa_devices",
+            side_effect=fetch_mfa_devices,
+        )
+        user_ids = [f"user{i:03}" for i in range(120)]
+
+        user_mfa_devices = target(
+            "d-1234567890", "us-east-1", user_ids, max_workers=4
+        )
+
+        assert mocked_fetch_mfa_devices.call_count == 5
+        assert [user_mfa.user_id for user_mfa in user_mfa_devices] == user_ids
+
+    def test_call_tolerant(
+        self,
+        target: typing.Callable[..., list[UserMfa]],
+        credential_env: dict[str, str],
+        mocker: MockerFixture,
+    ) -> None:
+        attempts: dict[str, int] = {}
+
+        def fetch_mfa_devices(user_ids: list[str], **kwargs: str) -> dict:
+            attempts[user_ids[0]] = attempts.get(user_ids[0], 0) + 1
+            if user_ids[0] == "user000" and attempts[user_ids[0]] == 1:
+                return {"__type": "InternalServerException"}
+            return {
+                "userMfaDevicesEntryList": [
+                    {"mfaDevices": [], "user": {"userId": user_id}}
+                    for user_id in user_ids
+                    if user_id != "user030"
+                ],
+            }
+
+        mocked_fetch_mfa_devices = mocker.patch(
+            "aws_sso_user_list.mfa_device._fetch_mfa_devices",
+            side_effect=fetch_mfa_devices,
+        )
+        user_ids = [f"user{i:03}" for i in range(50)]
+        failures = FailureReport()
+
+        user_mfa_devices = target(
+            "d-1234567890", "us-east-1", user_ids, failures=failures
+        )
+
+        # Both failed batches are retried once at the end
+        assert mocked_fetch_mfa_devices.call_count == 4
+        assert sorted(user_mfa.user_id for user_mfa in user_mfa_devices) == (
+            user_ids
+        )
+        assert [
+            user_mfa.user_id
+            for user_mfa in user_mfa_devices
+            if user_mfa.mfa_devices is None
+        ] == ["user030"]
+        assert failures.to_dict() == {
+            "UnknownUsers": 1,
+            "Failures": [
+                {
+                    "target": "BatchListMfaDevicesForUser",
+                    "user_ids": ["user030"],
+                    "error": "Missing from userMfaDevicesEntryList",
+                },
+            ],
+        }
+
+    def test_call_strict(
+        self,
+        target: typing.Callable[..., list[UserMfa]],
+        credential_env: dict[str, str],
+        mocker: MockerFixture,
+    ) -> None:
+        mocker.patch(
+            "aws_sso_user_list.mfa_device._fetch_mfa_devices",
+            return_value={"__type": "InternalServerException"},
+        )
+
+        with pytest.raises(KeyError):
+            target("d-1234567890", "us-east-1", ["user000"])
@@ -0,0 +1,120 @@
+import json
+import os
+import typing
+from datetime import UTC, datetime
+from functools import partial
+
+import pytest
+
+from aws_sso_user_list.cli import export_users
+from aws_sso_user_list.exporter import UserCsvExporter, UserJsonExporter
+from aws_sso_user_list.parts import (
+    manifest_path,
+    part_key,
+    part_path,
+    write_parts,
+)
+from aws_sso_user_list.utils import UserWithMfaDevice
+
+
+def make_user(user_id: str) -> UserWithMfaDevice:
+    return UserWithMfaDevice(
+        active=True,
+        user_id=user_id,
+        user_name=f"{user_id}@example.com",
+        display_name="John Doe",
+        email=f"{user_id}@example.com",
+        email_verification_status="VERIFIED",
+        created_at=datetime(2000, 1, 23, 4, 56, tzinfo=UTC),
+        updated_at=datetime(2000, 1, 23, 4, 56, tzinfo=UTC),
+        mfa_devices=[],
+    )
+
+
+def test_part_path() -> None:
+    assert part_path("/tmp/users.csv", 3) == "/tmp/users-00003.csv"
+    assert part_path("users", 0) == "users-00000"
+    assert manifest_path("/tmp/users.csv") == "/tmp/users.manifest.json"
+
+
+class TestPartKey:
+    def test_hash(self) -> None:
+        key = part_key("hash", 4)
+        users = [make_user(f"user{index}") for index in range(100)]
+
+        indexes = [key(user) for user in users]
+
+        assert indexes == [part_key("hash", 4)(user) for user in users]
+        assert set(indexes) == {0, 1, 2, 3}
+
+    def test_round_robin(self) -> None:
+        key = part_key("round-robin", 3)
+
+        assert [key(make_user(f"user{index}")) for index in range(7)] == [
+            0,
+            1,
+            2,
+            0,
+            1,
+            2,
+            0,
+        ]
+
+
+class TestWriteParts:
+    @pytest.fixture
+    def target(self) -> typing.Callable[..., None]:
+        return write_parts
+
+    def test_write_csv(
+        self, target: typing.Callable[..., None], tmp_path: typing.Any
+    ) -> None:
+        path = os.path.join(tmp_path, "users.csv")
+        users = [make_user(f"user{index:03d}") for index in range(100)]
+
+        target(
+            users,
+            export=partial(export_users, exporter_class=UserCsvExporter),
+            path=path,
+            parts=4,
+            split_by="hash",
+            format_="csv",
+        )
+
+        with open(manifest_path(path), encoding="utf-8") as file:
+            manifest = json.load(file)
+        assert manifest["Format"] == "csv"
+        assert manifest["SplitBy"] == "hash"
+        assert manifest["Users"] == 100
+        assert len(manifest["Parts"]) == 4
+
+        user_ids = []
+        for part in manifest["Parts"]:
+            part_file = os.path.join(tmp_path, part["Path"])
+            assert os.path.getsize(part_file) == part["Bytes"]
+            with open(part_file, encoding="utf-8") as file:
+                lines = file.read().splitlines()
+            assert lines[0].startswith("Active,UserId")
+            assert len(lines) == part["Users"] + 1
+            user_ids.extend(line.split(",")[1] for line in lines[1:])
+        assert sorted(user_ids) == [user.user_id for user in users]
+
+    def test_write_json(
+        self, target: typing.Callable[..., None], tmp_path: typing.Any
+    ) -> None:
+        path = os.path.join(tmp_path, "users.json")
+
+        target(
+            [make_user(f"user{index}") for index in range(5)],
+            export=partial(export_users, exporter_class=UserJsonExporter),
+            path=path,
+            parts=2,
+            split_by="round-robin",
+            format_="json",
+        )
+
+        with open(part_path(path, 1), encoding="utf-8") as file:
+            assert [user["user_id"] for user in json.load(file)["Users"]] == [
+                "user1",
+                "user3",
+            ]
@@ -0,0 +1,114 @@
+import io
+import json
+import typing
+
+import pytest
+from pytest_mock import MockerFixture
+
+from aws_sso_user_list import progress
+from aws_sso_user_list.progress import Progress, format_duration
+
+
+def test_format_duration() -> None:
+    assert format_duration(0) == "0:00:00"
+    assert format_duration(3725.9) == "1:02:05"
+
+
+class TestProgress:
+    @pytest.fixture
+    def clock(self, mocker: MockerFixture) -> list[float]:
+        now = [100.0]
+        mocker.patch(
+            "aws_sso_user_list.progress.time.monotonic",
+            side_effect=lambda: now[0],
+        )
+        return now
+
+    @pytest.fixture
+    def target(self, clock: list[float]) -> Progress:
+        return Progress(io.StringIO(), format_="json")
+
+    def test_snapshot(self, target: Progress, clock: list[float]) -> None:
+        target.increment("pages", 10)
+        target.increment("users", 1000)
+        target.increment("mfa_batches_started", 12)
+        target.increment("mfa_batches", 10)
+        target.increment("mfa_users", 250)
+        target.increment("requests", 30)
+        clock[0] += 10
+
+        snapshot = target.snapshot()
+
+        assert snapshot == {
+            "elapsed_seconds": 10.0,
+            "pages": 10,
+            "users": 1000,
+            "total_users": None,
+            "mfa_batches": 10,
+            "mfa_batches_in_flight": 2,
+            "requests": 30,
+            "requests_per_second": 3.0,
+            "eta_seconds": None,
+        }
+
+    def test_snapshot_with_total(
+        self, target: Progress, clock: list[float]
+    ) -> None:
+        target.set_total_users(1000)
+        target.increment("users", 1000)
+        target.increment("mfa_users", 250)
+        target.increment("requests", 30)
+        clock[0] += 10
+        target.snapshot()
+        target.increment("requests", 10)
+        clock[0] += 2.5
+
+        snapshot = target.snapshot()
+
+        # 1250 of 2000 units of work in 12.5 seconds
+        assert snapshot["eta_seconds"] == 7.5
+        assert snapshot["requests_per_second"] == 4.0
+
+    def test_report_json(self, target: Progress) -> None:
+        target.increment("users", 5)
+
+        target.report()
+
+        output = typing.cast(io.StringIO, target.output)
+        assert json.loads(output.getvalue())["users"] == 5
+
+    def test_report_text(self, clock: list[float]) -> None:
+        output = io.StringIO()
+        target = Progress(output, format_="text")
+        target.set_total_users(100)
+        target.increment("pages", 1)
+        target.increment("users", 100)
+        clock[0] += 1
+
+        target.report()
+
+        assert output.getvalue() == (
+            "0:00:01 pages 1, users 100/100, MFA batches 0 (0 in flight), "
+            "0.0 requests/s, ETA 0:00:01\n"
+        )
+
+
+class TestCollect:
+    def test_collect(self) -> None:
+        output = io.StringIO()
+
+        with progress.collect("json", interval=60, output=output) as active:
+            progress.increment("users", 3)
+            progress.set_total_users(3)
+            assert active is not None
+        progress.increment("users", 3)
+
+        lines = output.getvalue().splitlines()
+        assert len(lines) == 1
+        assert json.loads(lines[0])["users"] == 3
+        assert json.loads(lines[0])["total_users"] == 3
+
+    def test_collect_disabled(self) -> None:
+        with progress.collect(None) as active:
+            progress.increment("users", 3)
+            assert active is None
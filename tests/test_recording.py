@@ -0,0 +1,121 @@
+import gzip
+import json
+import typing
+
+import pytest
+from pytest_mock import MockerFixture
+
+from aws_sso_user_list.recording import (
+    REDACTED,
+    RecordingTransport,
+    ReplayTransport,
+    redact_headers,
+)
+from aws_sso_user_list.transport import BaseTransport, TransportResponse
+
+HEADERS = {
+    "X-Amz-Target": "AWSIdentityStoreService.SearchUsers",
+    "X-Amz-Date": "20000123T045600Z",
+    "X-Amz-Security-Token": "token",
+    "Authorization": "AWS4-HMAC-SHA256 Credential=AKIA/...",
+}
+
+
+def test_redact_headers() -> None:
+    assert redact_headers(HEADERS) == {
+        "X-Amz-Target": "AWSIdentityStoreService.SearchUsers",
+        "X-Amz-Date": REDACTED,
+        "X-Amz-Security-Token": REDACTED,
+        "Authorization": REDACTED,
+    }
+
+
+class TestRecordingTransport:
+    @pytest.fixture
+    def target(
+        self, tmp_path: typing.Any, mocker: MockerFixture
+    ) -> RecordingTransport:
+        transport = BaseTransport()
+        mocker.patch.object(
+            transport,
+            "send",
+            side_effect=[
+                TransportResponse(status_code=200, content=b'{"Users": [1]}'),
+                TransportResponse(status_code=200, content=b'{"Users": [2]}'),
+            ],
+        )
+        return RecordingTransport(str(tmp_path / "api.jsonl.gz"), transport)
+
+    def test_post(
+        self, target: RecordingTransport, tmp_path: typing.Any
+    ) -> None:
+        with target:
+            response = target.post("https://example.com/", HEADERS, '{"a": 1}')
+            target.post("https://example.com/", HEADERS, '{"a": 2}')
+
+        assert response.json() == {"Users": [1]}
+        with gzip.open(tmp_path / "api.jsonl.gz", "rt") as file:
+            entries = [json.loads(line) for line in file]
+        assert [entry["request"] for entry in entries] == [
+            '{"a": 1}',
+            '{"a": 2}',
+        ]
+        assert entries[0]["target"] == "SearchUsers"
+        assert entries[0]["headers"]["Authorization"] == REDACTED
+        assert entries[0]["status_code"] == 200
+        assert entries[0]["response"] == '{"Users": [1]}'
+        assert "token" not in (tmp_path / "api.jsonl.gz").read_bytes().decode(
+            "latin-1"
+        )
+
+
+class TestReplayTransport:
+    @pytest.fixture
+    def path(self, tmp_path: typing.Any) -> str:
+        path = str(tmp_path / "api.jsonl.gz")
+        with gzip.open(path, "wt") as file:
+            for request, status_code, response in [
+                ('{"a": 1}', 503, ""),
+                ('{"a": 1}', 200, '{"Users": [1]}'),
+                ('{"a": 2}', 200, '{"Users": [2]}'),
+            ]:
+                entry = {
+                    "offset": 0.0,
+                    "elapsed": 0.25,
+                    "target": "SearchUsers",
+                    "url": "https://example.com/",
+                    "headers": {},
+                    "request": request,
+                    "status_code": status_code,
+                    "response": response,
+                }
+                file.write(json.dumps(entry) + "\n")
+        return path
+
+    def test_post(self, path: str) -> None:
+        target = ReplayTransport(path)
+        target.backoff = 0
+
+        first = target.post("https://example.com/", HEADERS, '{"a": 1}')
+        second = target.post("https://example.com/", HEADERS, '{"a": 2}')
+        repeated = target.post("https://example.com/", HEADERS, '{"a": 2}')
+
+        assert first.json() == {"Users": [1]}
+        assert second.json() == {"Users": [2]}
+        assert repeated.json() == {"Users": [2]}
+
+    def test_post_original_timing(
+        self, path: str, mocker: MockerFixture
+    ) -> None:
+        mocked_sleep = mocker.patch("aws_sso_user_list.recording.time.sleep")
+        target = ReplayTransport(path, original_timing=True)
+
+        target.post("https://example.com/", HEADERS, '{"a": 2}')
+
+        mocked_sleep.assert_called_once_with(0.25)
+
+    def test_post_missing(self, path: str) -> None:
+        target = ReplayTransport(path)
+
+        with pytest.raises(KeyError):
+            target.post("https://example.com/", HEADERS, '{"a": 3}')
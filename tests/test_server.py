@@ -0,0 +1,172 @@
+import json
+import threading
+import typing
+from datetime import UTC, datetime
+from http import HTTPStatus
+
+import pytest
+import requests
+
+from aws_sso_user_list.server import UserCache, UserIndex, UserServer
+from aws_sso_user_list.utils import UserWithMfaDevice
+
+
+def make_user(user_id: str) -> UserWithMfaDevice:
+    return UserWithMfaDevice(
+        active=True,
+        user_id=user_id,
+        user_name=f"{user_id}@example.com",
+        display_name="John Doe",
+        email=f"{user_id}@Example.com",
+        email_verification_status="VERIFIED",
+        created_at=datetime(2000, 1, 23, 4, 56, tzinfo=UTC),
+        updated_at=datetime(2000, 1, 23, 4, 56, tzinfo=UTC),
+        mfa_devices=[],
+    )
+
+
+class TestUserIndex:
+    @pytest.fixture
+    def target(self) -> UserIndex:
+        return UserIndex([make_user("user1"), make_user("user2")])
+
+    def test_lookup(self, target: UserIndex) -> None:
+        def user_id(data: bytes | None) -> str | None:
+            return json.loads(data)["user_id"] if data else None
+
+        assert len(target) == 2
+        assert user_id(target.lookup(user_id="user1")) == "user1"
+        assert user_id(target.lookup(user_name="USER2@example.com")) == "user2"
+        assert user_id(target.lookup(email="user2@example.com")) == "user2"
+        assert target.lookup(user_id="user3") is None
+        assert target.lookup() is None
+
+    def test_export(self, target: UserIndex) -> None:
+        assert [
+            user["user_id"] for user in json.loads(target.export)["Users"]
+        ] == ["user1", "user2"]
+
+
+class TestUserCache:
+    def test_refresh_in_background(self) -> None:
+        refreshed = threading.Event()
+        fetched: list[list[UserWithMfaDevice]] = [
+            [make_user("user1")],
+            [make_user("user1"), make_user("user2")],
+        ]
+
+        def fetch() -> list[UserWithMfaDevice]:
+            users = fetched.pop(0)
+            if not fetched:
+                refreshed.set()
+            return users
+
+        target = UserCache(fetch=fetch, refresh_interval=0.01)
+        target.refresh()
+        assert len(target.index or ()) == 1
+
+        target.start()
+        assert refreshed.wait(5)
+        target.stop()
+
+        assert len(target.index or ()) == 2
+
+    def test_refresh_failure_keeps_index(self) -> None:
+        failed = threading.Event()
+        results: list[typing.Any] = [[make_user("user1")]]
+
+        def fetch() -> list[UserWithMfaDevice]:
+            if results:
+                return results.pop(0)
+            failed.set()
+            raise RuntimeError("failed")
+
+        target = UserCache(fetch=fetch, refresh_interval=0.01)
+        target.refresh()
+        target.start()
+        assert failed.wait(5)
+        target.stop()
+
+        assert len(target.index or ()) == 1
+        assert target.last_error == "RuntimeError('failed')"
+
+
+def fetch_user(user_id: str) -> UserWithMfaDevice | None:
+    if user_id == "failed":
+        raise RuntimeError("failed")
+    return make_user(user_id) if user_id == "new_user" else None
+
+
+class TestUserServer:
+    @pytest.fixture
+    def target(self) -> typing.Iterator[str]:
+        cache = UserCache(
+            fetch=lambda: [make_user("user1")],
+            refresh_interval=60,
+            fetch_user=fetch_user,
+        )
+        cache.refresh()
+        server = UserServer(("127.0.0.1", 0), cache)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+
+        yield f"http://127.0.0.1:{server.server_port}"
+
+        server.shutdown()
+        server.server_close()
+
+    @pytest.mark.parametrize(
+        "path, status_code",
+        [
+            ("/users/user1", 200),
+            ("/users/new_user", 200),
+            ("/users/user2", 404),
+            ("/users/failed", 502),
+            ("/users?user_name=user1@example.com", 200),
+            ("/users?email=user1@example.com", 200),
+            ("/users?email=user2@example.com", 404),
+            ("/users?user_id=user1", 400),
+            ("/unknown", 404),
+        ],
+    )
+    def test_lookup(
+        self,
+        target: str,
+        path: str,
+        status_code: int,
+        capsys: pytest.CaptureFixture[str],
+    ) -> None:
+        response = requests.get(target + path)
+
+        assert response.status_code == status_code
+        if status_code == 200:
+            assert response.json()["user_id"] in {"user1", "new_user"}
+        else:
+            assert response.json()["message"] == HTTPStatus(status_code).phrase
+        if status_code == 502:
+            assert "RuntimeError: failed" in capsys.readouterr().err
+
+    def test_export(self, target: str) -> None:
+        response = requests.get(target + "/users")
+
+        assert response.status_code == 200
+        assert len(response.json()["Users"]) == 1
+
+    def test_health(self, target: str) -> None:
+        response = requests.get(target + "/health")
+
+        assert response.status_code == 200
+        assert response.json()["users"] == 1
+
+    def test_not_ready(self) -> None:
+        cache = UserCache(fetch=lambda: [], refresh_interval=60)
+        server = UserServer(("127.0.0.1", 0), cache)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            url = f"http://127.0.0.1:{server.server_port}"
+            assert requests.get(url + "/health").status_code == 503
+            assert requests.get(url + "/users").status_code == 503
+        finally:
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,70 @@
+import os
+import pickle
+import typing
+
+import pytest
+from pytest_mock import MockerFixture
+
+from aws_sso_user_list.spill import MEMORY_LIMIT, SpillBuffer
+
+
+class TestSpillBuffer:
+    @pytest.fixture
+    def target(self) -> typing.Iterator[SpillBuffer[tuple[int, str]]]:
+        with SpillBuffer[tuple[int, str]](
+            key=lambda item: item[0], memory_limit=64
+        ) as buffer:
+            yield buffer
+
+    def test_default_memory_limit(self) -> None:
+        with SpillBuffer[int](key=lambda item: item) as buffer:
+            assert buffer.memory_limit == MEMORY_LIMIT
+
+    def test_iterate_in_memory(self) -> None:
+        with SpillBuffer[int](key=lambda item: item, memory_limit=1024) as b:
+            b.extend([3, 1, 2])
+
+            assert b.runs == []
+            assert list(b) == [1, 2, 3]
+
+    def test_iterate_spilled(
+        self, target: SpillBuffer[tuple[int, str]]
+    ) -> None:
+        items = [(i * 7 % 50, f"value{i}") for i in range(50)]
+        target.extend(items)
+
+        assert len(target.runs) > 1
+        assert len(target) == 50
+        assert list(target) == sorted(items)
+        assert list(target) == sorted(items)
+
+    def test_iterate_merge_passes(
+        self, target: SpillBuffer[tuple[int, str]]
+    ) -> None:
+        target.max_open_runs = 3
+        items = [(i * 7 % 50, f"value{i}") for i in range(50)]
+        target.extend(items)
+        paths = list(target.runs)
+
+        assert len(paths) > 9
+        assert list(target) == sorted(items)
+        assert len(target.runs) <= 3
+        assert not any(os.path.exists(path) for path in paths)
+        assert list(target) == sorted(items)
+
+    def test_append_samples_size(self, mocker: MockerFixture) -> None:
+        mocked_dumps = mocker.spy(pickle, "dumps")
+
+        with SpillBuffer[int](key=lambda item: item, memory_limit=1024) as b:
+            b.extend(range(100))
+
+            assert mocked_dumps.call_count == 2
+            assert b.buffer_size == 100 * len(pickle.dumps(0))
+
+    def test_close(self, target: SpillBuffer[tuple[int, str]]) -> None:
+        target.extend([(i, "value") for i in range(50)])
+        paths = list(target.runs)
+
+        target.close()
+
+        assert not any(os.path.exists(path) for path in paths)
@@ -0,0 +1,79 @@
+from dataclasses import replace
+from datetime import UTC, datetime, timedelta
+
+import pytest
+
+from aws_sso_user_list.mfa_device import MfaDevice
+from aws_sso_user_list.summary import UserSummary
+from aws_sso_user_list.table import UserTable
+from aws_sso_user_list.utils import UserWithMfaDevice
+
+
+def make_user(
+    active: bool,
+    email_verification_status: str,
+    updated_at: datetime,
+    mfa_types: list[str],
+) -> UserWithMfaDevice:
+    return UserWithMfaDevice(
+        active=active,
+        user_id="01234567-89ab-cdef-0123-456789abcdef",
+        user_name="user@example.com",
+        display_name="John Doe",
+        email="user@example.com",
+        email_verification_status=email_verification_status,
+        created_at=datetime(2000, 1, 23, 4, 56, tzinfo=UTC),
+        updated_at=updated_at,
+        mfa_devices=[
+            MfaDevice(
+                device_id=f"m-0123456789abcdef_id{i}",
+                device_name=f"m-0123456789abcdef_name{i}",
+                display_name="MFA Device",
+                mfa_type=mfa_type,
+                registered_date=datetime(2000, 1, 23, 4, 56, tzinfo=UTC),
+            )
+            for i, mfa_type in enumerate(mfa_types)
+        ],
+    )
+
+
+class TestUserSummary:
+    @pytest.fixture
+    def target(self) -> UserSummary:
+        return UserSummary(stale_before=datetime(2001, 1, 1, tzinfo=UTC))
+
+    @pytest.mark.parametrize("from_table", [False, True])
+    def test_extend(self, target: UserSummary, from_table: bool) -> None:
+        stale = datetime(2000, 1, 1, tzinfo=UTC)
+        fresh = datetime(2002, 1, 1, tzinfo=UTC)
+
+        users = [
+            make_user(True, "VERIFIED", fresh, ["WEBAUTHN", "TOTP"]),
+            make_user(True, "NOT_VERIFIED", stale, []),
+            make_user(False, "VERIFIED", stale, []),
+            make_user(True, "VERIFIED", fresh, ["TOTP"]),
+            replace(make_user(True, "VERIFIED", fresh, []), mfa_devices=None),
+        ]
+        if from_table:
+            target.extend_table(UserTable.from_users(users))
+        else:
+            target.extend(users)
+
+        assert target.to_dict() == {
+            "Users": 5,
+            "ActiveUsers": 4,
+            "ActiveUsersWithoutMfaDevice": 1,
+            "UnknownMfaUsers": 1,
+            "UnverifiedEmails": 1,
+            "StaleUsers": 2,
+            "StaleBefore": "2001-01-01T00:00:00+00:00",
+            "MfaDevices": 3,
+            "MfaDevicesByType": {"TOTP": 2, "WEBAUTHN": 1},
+        }
+
+    def test_from_stale_days(self) -> None:
+        summary = UserSummary.from_stale_days(30)
+
+        assert (
+            datetime.now(UTC) - summary.stale_before - timedelta(days=30)
+        ) < timedelta(seconds=5)
@@ -0,0 +1,168 @@
+from datetime import UTC, datetime
+from io import BytesIO, StringIO
+
+import pytest
+from pytest_mock import MockerFixture
+
+from aws_sso_user_list.exporter import (
+    BaseUserExporter,
+    UserCsvExporter,
+    UserJsonExporter,
+    UserXlsxExporter,
+)
+from aws_sso_user_list.mfa_device import MfaDevice
+from aws_sso_user_list.table import StringDictionary, UserTable
+from aws_sso_user_list.utils import UserWithMfaDevice
+
+
+class TestStringDictionary:
+    @pytest.fixture
+    def target(self) -> StringDictionary:
+        return StringDictionary()
+
+    def test_encode_decode(self, target: StringDictionary) -> None:
+        assert target.encode("TOTP") == 0
+        assert target.encode("WEBAUTHN") == 1
+        assert target.encode("TOTP") == 0
+        assert target.decode(1) == "WEBAUTHN"
+
+    def test_encode_too_many_values(self, target: StringDictionary) -> None:
+        for i in range(target.max_size):
+            target.encode(str(i))
+
+        with pytest.raises(ValueError):
+            target.encode("overflow")
+
+
+class TestUserTable:
+    @pytest.fixture
+    def users(self) -> list[UserWithMfaDevice]:
+        return [
+            UserWithMfaDevice(
+                active=True,
+                user_id="01234567-89ab-cdef-0123-456789abcde1",
+                user_name="user1@example.com",
+                display_name="John Doe",
+                email="user1@example.com",
+                email_verification_status="VERIFIED",
+                created_at=datetime(2000, 1, 23, 4, 56, tzinfo=UTC),
+                updated_at=datetime(2000, 1, 23, 4, 56, 7, 89, tzinfo=UTC),
+                mfa_devices=[
+                    MfaDevice(
+                        device_id="m-0123456789abcdef_id1",
+                        device_name="m-0123456789abcdef_name1",
+                        display_name="MFA Device",
+                        mfa_type="WEBAUTHN",
+                        registered_date=datetime(
+                            2000, 1, 23, 4, 56, tzinfo=UTC
+                        ),
+                    ),
+                    MfaDevice(
+                        device_id="m-0123456789abcdef_id2",
+                        device_name="m-0123456789abcdef_name2",
+                        display_name=None,
+                        mfa_type="TOTP",
+                        registered_date=datetime(
+                            2000, 1, 23, 4, 56, tzinfo=UTC
+                        ),
+                    ),
+                ],
+            ),
+            UserWithMfaDevice(
+                active=True,
+                user_id="01234567-89ab-cdef-0123-456789abcde2",
+                user_name="user2@example.com",
+                display_name="Jane Doe",
+                email="user2@example.com",
+                email_verification_status="NOT_VERIFIED",
+                created_at=datetime(2000, 1, 23, 4, 56, tzinfo=UTC),
+                updated_at=datetime(2000, 1, 23, 4, 56, tzinfo=UTC),
+                mfa_devices=[],
+                groups=["Developers"],
+            ),
+            UserWithMfaDevice(
+                active=False,
+                user_id="01234567-89ab-cdef-0123-456789abcde3",
+                user_name="user3@example.com",
+                display_name="Jim Doe",
+                email="user3@example.com",
+                email_verification_status="VERIFIED",
+                created_at=datetime(2000, 1, 23, 4, 56, tzinfo=UTC),
+                updated_at=datetime(2000, 1, 23, 4, 56, tzinfo=UTC),
+                mfa_devices=None,
+            ),
+        ]
+
+    @pytest.fixture
+    def target(self, users: list[UserWithMfaDevice]) -> UserTable:
+        return UserTable.from_users(users)
+
+    def test_round_trip(
+        self, target: UserTable, users: list[UserWithMfaDevice]
+    ) -> None:
+        assert len(target) == 3
+        assert list(target) == users
+        assert target[-1] == users[-1]
+        assert target[1:] == users[1:]
+
+    def test_index_out_of_range(self, target: UserTable) -> None:
+        with pytest.raises(IndexError):
+            target[3]
+
+    def test_aggregations(self, target: UserTable) -> None:
+        assert target.mfa_device_counts() == [2, 0, 0]
+        assert target.count_active() == 2
+        assert target.count_active_without_mfa_device() == 1
+        assert target.count_by_email_verification_status() == {
+            "VERIFIED": 2,
+            "NOT_VERIFIED": 1,
+        }
+        assert target.count_by_mfa_type() == {"WEBAUTHN": 1, "TOTP": 1}
+        assert target.count_mfa_unknown() == 1
+        assert (
+            target.count_updated_before(
+                datetime(2000, 1, 23, 4, 56, 7, tzinfo=UTC)
+            )
+            == 2
+        )
+        assert target.mfa_device_count_column() == [2, 0, None]
+        assert target.email_verification_status_column() == [
+            "VERIFIED",
+            "NOT_VERIFIED",
+            "VERIFIED",
+        ]
+
+    def test_export_json(
+        self,
+        target: UserTable,
+        users: list[UserWithMfaDevice],
+    ) -> None:
+        expected, actual = StringIO(), StringIO()
+        UserJsonExporter(users).export(expected)
+        UserJsonExporter(target).export(actual)
+
+        assert actual.getvalue() == expected.getvalue()
+
+    @pytest.mark.parametrize(
+        "exporter_class, output_class",
+        [(UserCsvExporter, StringIO), (UserXlsxExporter, BytesIO)],
+    )
+    @pytest.mark.parametrize("with_groups", [False, True])
+    def test_export_columns(
+        self,
+        target: UserTable,
+        users: list[UserWithMfaDevice],
+        mocker: MockerFixture,
+        exporter_class: type[BaseUserExporter],
+        output_class: type[StringIO | BytesIO],
+        with_groups: bool,
+    ) -> None:
+        expected, actual = output_class(), output_class()
+        exporter_class(users, with_groups=with_groups).export(expected)
+        # The columns are read directly, without building users
+        mocker.patch.object(
+            UserTable, "__getitem__", side_effect=AssertionError
+        )
+        exporter_class(target, with_groups=with_groups).export(actual)
+
+        assert actual.getvalue() == expected.getvalue()
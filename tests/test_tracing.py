@@ -0,0 +1,150 @@
+import json
+import typing
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from pytest_mock import MockerFixture
+
+from aws_sso_user_list import tracing
+from aws_sso_user_list.mfa_device import fetch_all_mfa_devices
+from aws_sso_user_list.tracing import NOOP_SPAN, Tracer
+
+
+class TestTracer:
+    @pytest.fixture
+    def target(self) -> typing.Iterator[Tracer]:
+        with tracing.collect("/dev/null") as tracer:
+            assert tracer is not None
+            yield tracer
+
+    def test_nested_spans(self, target: Tracer) -> None:
+        with tracing.span("parent", page=1) as parent:
+            with tracing.span("child") as child:
+                child.set_attribute("response_bytes", 10)
+
+        spans = {span.name: span for span in target.spans}
+        assert spans["child"].parent_span_id == spans["parent"].span_id
+        assert spans["parent"].parent_span_id is None
+        assert spans["parent"].attributes == {"page": 1}
+        assert spans["child"].attributes == {"response_bytes": 10}
+        assert parent is spans["parent"]
+
+    def test_wrap_propagates_to_threads(self, target: Tracer) -> None:
+        def work() -> None:
+            with tracing.span("worker"):
+                pass
+
+        with tracing.span("parent"):
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                for _ in range(4):
+                    executor.submit(tracing.wrap(work)).result()
+
+        spans = target.spans
+        parent = next(span for span in spans if span.name == "parent")
+        workers = [span for span in spans if span.name == "worker"]
+        assert len(workers) == 4
+        assert all(span.parent_span_id == parent.span_id for span in workers)
+
+    def test_error(self, target: Tracer) -> None:
+        with pytest.raises(ValueError):
+            with tracing.span("failing"):
+                raise ValueError("failed")
+
+        assert target.spans[0].attributes == {"error": "ValueError('failed')"}
+        otlp_span = tracing.otlp_span(target.spans[0])
+        assert otlp_span["status"]["code"] == 2
+
+    def test_to_otlp(self, target: Tracer) -> None:
+        with tracing.span("parent", page=1, ratio=0.5, last=True):
+            with tracing.span("child", target="SearchUsers"):
+                pass
+
+        data = target.to_otlp()
+
+        spans = data["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        child, parent = spans
+        assert child["parentSpanId"] == parent["spanId"]
+        assert len(parent["traceId"]) == 32
+        assert "parentSpanId" not in parent
+        assert parent["attributes"] == [
+            {"key": "page", "value": {"intValue": "1"}},
+            {"key": "ratio", "value": {"doubleValue": 0.5}},
+            {"key": "last", "value": {"boolValue": True}},
+        ]
+        assert child["attributes"] == [
+            {"key": "target", "value": {"stringValue": "SearchUsers"}},
+        ]
+
+
+class TestCollect:
+    def test_write_json(self, tmp_path: typing.Any) -> None:
+        path = tmp_path / "trace.json"
+
+        with tracing.collect(str(path)):
+            with tracing.span("fetch_all_users", pages=2):
+                pass
+
+        assert tracing.active() is None
+        data = json.loads(path.read_text())
+        assert data["traceEvents"][0]["name"] == "fetch_all_users"
+        assert data["traceEvents"][0]["ph"] == "X"
+        assert data["traceEvents"][0]["args"] == {"pages": 2}
+
+    def test_send_otlp(self, mocker: MockerFixture) -> None:
+        mocked_post = mocker.patch("requests.post")
+
+        with tracing.collect(None, otlp_endpoint="http://localhost:4318/"):
+            with tracing.span("fetch_all_users"):
+                pass
+
+        mocked_post.assert_called_once()
+        assert (
+            mocked_post.call_args.args[0] == "http://localhost:4318/v1/traces"
+        )
+        payload = json.loads(mocked_post.call_args.kwargs["data"])
+        assert len(payload["resourceSpans"][0]["scopeSpans"][0]["spans"]) == 1
+
+    def test_disabled(self) -> None:
+        with tracing.collect(None) as tracer:
+            with tracing.span("fetch_all_users") as span:
+                span.set_attribute("pages", 1)
+
+        assert tracer is None
+        assert span is NOOP_SPAN
+
+
+class TestPipelineSpans:
+    def test_fetch_all_mfa_devices(
+        self, mocker: MockerFixture, tmp_path: typing.Any
+    ) -> None:
+        mocker.patch("aws_sso_user_list.mfa_device.SigV4Auth")
+        mocker.patch("aws_sso_user_list.mfa_device.Session")
+        mocker.patch(
+            "aws_sso_user_list.mfa_device._fetch_mfa_devices",
+            return_value={"userMfaDevicesEntryList": []},
+        )
+
+        with tracing.collect(str(tmp_path / "trace.json")) as tracer:
+            fetch_all_mfa_devices(
+                "d-0123456789",
+                "us-east-1",
+                [f"user{i}" for i in range(60)],
+                max_workers=2,
+            )
+
+        assert tracer is not None
+        parent = next(
+            span
+            for span in tracer.spans
+            if span.name == "fetch_all_mfa_devices"
+        )
+        batches = [
+            span for span in tracer.spans if span.name == "_fetch_mfa_devices"
+        ]
+        assert parent.attributes["batches"] == 3
+        assert sorted(span.attributes["batch_size"] for span in batches) == [
+            10,
+            25,
+            25,
+        ]
+        assert all(span.parent_span_id == parent.span_id for span in batches)
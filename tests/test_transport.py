@@ -0,0 +1,317 @@
+import json
+import os
+import typing
+
+import pytest
+import requests
+from botocore.auth import SigV4Auth
+from botocore.credentials import Credentials
+from pytest_mock import MockerFixture
+from requests import Response
+
+from aws_sso_user_list import metrics
+from aws_sso_user_list.hedging import Hedge
+from aws_sso_user_list.transport import (
+    BaseTransport,
+    Http2Transport,
+    RequestsTransport,
+    TransportResponse,
+    TransportTimeoutError,
+    post_signed,
+    use_placeholder_credentials,
+)
+
+
+class TestTransportResponse:
+    def test_json(self) -> None:
+        response = TransportResponse(status_code=200, content=b'{"a": 1}')
+
+        assert response.json() == {"a": 1}
+
+    @pytest.mark.parametrize(
+        "status_code, content, throttled, retryable",
+        [
+            (200, b"{}", False, False),
+            (429, b"", True, True),
+            (400, b'{"__type": "ThrottlingException"}', True, True),
+            (
+                400,
+                b'{"__type": "com.amazon#ThrottlingException"}',
+                True,
+                True,
+            ),
+            (400, b'{"__type": "ValidationException"}', False, False),
+            (400, b"<html>", False, False),
+            (503, b"", False, True),
+        ],
+    )
+    def test_throttled(
+        self,
+        status_code: int,
+        content: bytes,
+        throttled: bool,
+        retryable: bool,
+    ) -> None:
+        response = TransportResponse(status_code=status_code, content=content)
+
+        assert response.throttled is throttled
+        assert response.retryable is retryable
+
+
+class TestBaseTransport:
+    @pytest.fixture
+    def target(self, mocker: MockerFixture) -> BaseTransport:
+        transport = BaseTransport()
+        transport.backoff = 0
+        mocker.patch.object(
+            transport,
+            "send",
+            side_effect=[
+                TransportResponse(status_code=429, content=b""),
+                TransportResponse(status_code=503, content=b""),
+                TransportResponse(status_code=200, content=b"{}"),
+            ],
+        )
+        return transport
+
+    def test_post_retry(
+        self, target: BaseTransport, tmp_path: typing.Any
+    ) -> None:
+        path = tmp_path / "metrics.prom"
+        headers = {"X-Amz-Target": "AWSIdentityStoreService.SearchUsers"}
+
+        with metrics.collect(str(path)) as collected:
+            response = target.post("https://example.com/", headers, "{}")
+
+        assert response.status_code == 200
+        assert collected is not None
+        assert collected.throttles == {"SearchUsers": 1}
+        assert collected.retries == {"SearchUsers": 2}
+        assert sum(collected.requests.values()) == 3
+
+    def test_post_retry_exhausted(self, target: BaseTransport) -> None:
+        target.max_retries = 1
+
+        response = target.post("https://example.com/", {}, "{}")
+
+        assert response.status_code == 503
+
+    def test_post_timeout(self, mocker: MockerFixture) -> None:
+        target = BaseTransport()
+        target.backoff = 0
+        mocker.patch.object(
+            target,
+            "send",
+            side_effect=[
+                TransportTimeoutError(),
+                TransportResponse(status_code=200, content=b"{}"),
+            ],
+        )
+
+        response = target.post("https://example.com/", {}, "{}")
+
+        assert response.status_code == 200
+
+    def test_post_timeout_exhausted(self, mocker: MockerFixture) -> None:
+        target = BaseTransport()
+        target.backoff = 0
+        target.max_retries = 1
+        mocker.patch.object(
+            target,
+            "send",
+            side_effect=TransportTimeoutError(),
+        )
+
+        with pytest.raises(TransportTimeoutError):
+            target.post("https://example.com/", {}, "{}")
+
+    def test_post_hedged(self, mocker: MockerFixture) -> None:
+        hedge = Hedge(percentile=99)
+        mocked_call = mocker.patch.object(
+            hedge,
+            "call",
+            return_value=TransportResponse(status_code=200, content=b"{}"),
+        )
+        target = BaseTransport(hedge=hedge)
+
+        with target:
+            target.post(
+                "https://example.com/",
+                {
+                    "X-Amz-Target": "AppsAuthControlPlaneService"
+                    ".BatchListMfaDevicesForUser"
+                },
+                "{}",
+            )
+            mocked_call.assert_called_once_with(
+                target.send,
+                "https://example.com/",
+                mocker.ANY,
+                "{}",
+                succeeded=mocker.ANY,
+            )
+            mocked_call.reset_mock()
+            mocker.patch.object(
+                target,
+                "send",
+                return_value=TransportResponse(status_code=200, content=b"{}"),
+            )
+            target.post(
+                "https://example.com/",
+                {"X-Amz-Target": "AWSIdentityStoreService.SearchUsers"},
+                "{}",
+            )
+            mocked_call.assert_not_called()
+
+    def test_post_hedged_not_after_throttle(
+        self, mocker: MockerFixture
+    ) -> None:
+        hedge = Hedge(percentile=99)
+        mocked_call = mocker.patch.object(
+            hedge,
+            "call",
+            return_value=TransportResponse(status_code=429, content=b""),
+        )
+        target = BaseTransport(hedge=hedge, backoff=0)
+        mocked_send = mocker.patch.object(
+            target,
+            "send",
+            return_value=TransportResponse(status_code=200, content=b"{}"),
+        )
+
+        with target:
+            response = target.post(
+                "https://example.com/",
+                {
+                    "X-Amz-Target": "AppsAuthControlPlaneService"
+                    ".BatchListMfaDevicesForUser"
+                },
+                "{}",
+            )
+
+        assert response.status_code == 200
+        mocked_call.assert_called_once()
+        mocked_send.assert_called_once()
+
+
+class TestPostSigned:
+    def test_call(self, mocker: MockerFixture) -> None:
+        transport = BaseTransport()
+        mocked_send = mocker.patch.object(
+            transport,
+            "send",
+            return_value=TransportResponse(status_code=200, content=b"{}"),
+        )
+        sigv4_auth = SigV4Auth(
+            credentials=Credentials("testing", "testing"),
+            service_name="identitystore",
+            region_name="us-east-1",
+        )
+
+        data = post_signed(
+            sigv4_auth=sigv4_auth,
+            url="https://example.com/",
+            target="Service.Operation",
+            body={"A": 1},
+            transport=transport,
+            content_type="application/x-amz-json-1.0",
+        )
+
+        assert data == {}
+        url, headers, body = (
+            mocked_send.call_args.args[0],
+            mocked_send.call_args.kwargs["headers"],
+            mocked_send.call_args.kwargs["data"],
+        )
+        assert url == "https://example.com/"
+        assert headers["X-Amz-Target"] == "Service.Operation"
+        assert headers["Content-Type"] == "application/x-amz-json-1.0"
+        assert "Authorization" in headers
+        assert json.loads(body) == {"A": 1}
+
+
+class TestUsePlaceholderCredentials:
+    def test_call(self, mocker: MockerFixture) -> None:
+        mocker.patch.dict(
+            os.environ, {"AWS_ACCESS_KEY_ID": "AKIAEXAMPLE"}, clear=True
+        )
+
+        use_placeholder_credentials("replay")
+
+        assert os.environ["AWS_ACCESS_KEY_ID"] == "AKIAEXAMPLE"
+        assert os.environ["AWS_SECRET_ACCESS_KEY"] == "replay"
+
+
+class TestRequestsTransport:
+    @pytest.fixture
+    def target(self) -> RequestsTransport:
+        return RequestsTransport()
+
+    def test_post(
+        self, target: RequestsTransport, mocker: MockerFixture
+    ) -> None:
+        response = Response()
+        response.status_code = 200
+        response._content = json.dumps({"Users": []}).encode()
+        mocked_post = mocker.patch("requests.post", return_value=response)
+
+        with target:
+            transport_response = target.post(
+                "https://example.com/", headers={"A": "B"}, data="{}"
+            )
+
+        mocked_post.assert_called_once_with(
+            "https://example.com/",
+            headers={"A": "B"},
+            data="{}",
+            timeout=(10.0, 60.0),
+        )
+        assert transport_response.status_code == 200
+        assert transport_response.json() == {"Users": []}
+
+    def test_post_timeout(
+        self, target: RequestsTransport, mocker: MockerFixture
+    ) -> None:
+        target.max_retries = 0
+        mocker.patch("requests.post", side_effect=requests.Timeout())
+
+        with pytest.raises(TransportTimeoutError):
+            target.post("https://example.com/", headers={}, data="{}")
+
+
+class TestHttp2Transport:
+    def test_post(self, mocker: MockerFixture) -> None:
+        mocked_httpx = mocker.patch("aws_sso_user_list.transport.httpx")
+        client = mocked_httpx.Client.return_value
+        client.post.return_value.status_code = 200
+        client.post.return_value.content = b"{}"
+
+        with Http2Transport() as target:
+            transport_response = target.post(
+                "https://example.com/", headers={"A": "B"}, data="{}"
+            )
+
+        mocked_httpx.Timeout.assert_called_once_with(60.0, connect=10.0)
+        mocked_httpx.Client.assert_called_once_with(
+            http2=True, timeout=mocked_httpx.Timeout.return_value
+        )
+        client.post.assert_called_once_with(
+            "https://example.com/", headers={"A": "B"}, content="{}"
+        )
+        client.close.assert_called_once()
+        assert transport_response == TransportResponse(
+            status_code=200, content=b"{}"
+        )
+
+    def test_missing_httpx(self, mocker: MockerFixture) -> None:
+        mocker.patch("aws_sso_user_list.transport.httpx", None)
+
+        with pytest.raises(RuntimeError):
+            Http2Transport()
+
+    def test_missing_h2(self, mocker: MockerFixture) -> None:
+        mocked_httpx = mocker.patch("aws_sso_user_list.transport.httpx")
+        mocked_httpx.Client.side_effect = ImportError()
+
+        with pytest.raises(RuntimeError):
+            Http2Transport()
@@ -1,5 +1,7 @@
+import io
 import json
 import os
+import pickle
 import typing
 from datetime import UTC, datetime
 
@@ -9,7 +11,16 @@ from botocore.session import Session
 from pytest_mock import MockerFixture
 from requests import Response
 
-from aws_sso_user_list.user import User, _fetch_users, fetch_all_users
+from aws_sso_user_list import progress
+from aws_sso_user_list.user import (
+    ShardedScanWarning,
+    User,
+    _fetch_users,
+    fetch_all_users,
+    iter_all_users,
+    iter_users_by_ids,
+    iter_users_by_names,
+)
 
 
 class TestUser:
@@ -73,6 +84,35 @@ class TestUser:
         assert user.created_at == datetime(2000, 1, 23, 4, 56, tzinfo=UTC)
         assert user.updated_at == datetime(2000, 1, 23, 4, 56, tzinfo=UTC)
 
+    def test_from_data_lazy(self, target: typing.Type[User]) -> None:
+        data = make_user_data("user1", "user1@example.com")
+        del data["Meta"]["UpdatedAt"]
+
+        user = target.from_data(data)
+
+        assert user.created_at == datetime(2000, 1, 23, 4, 56, tzinfo=UTC)
+        data["Meta"]["CreatedAt"] = 0.0
+        assert user.created_at == datetime(2000, 1, 23, 4, 56, tzinfo=UTC)
+        with pytest.raises(KeyError):
+            user.updated_at
+
+    def test_from_data_equals_eager(self, target: typing.Type[User]) -> None:
+        user = target.from_data(make_user_data("user1", "user1@example.com"))
+        eager = User(
+            active=True,
+            user_id="user1",
+            user_name="user1@example.com",
+            display_name="John Doe",
+            email="user1@example.com",
+            email_verification_status="VERIFIED",
+            created_at=datetime(2000, 1, 23, 4, 56, tzinfo=UTC),
+            updated_at=datetime(2000, 1, 23, 4, 56, tzinfo=UTC),
+        )
+
+        assert user == eager
+        assert eager == user
+        assert pickle.loads(pickle.dumps(user)) == eager
+
 
 class TestFetchUsers:
     @pytest.fixture
@@ -294,3 +334,302 @@ class TestFetchAllUsers:
         assert mocked_fetch_user.call_count == 2
         assert users[0].email == "user1@example.com"
         assert users[1].email == "user2@example.com"
+
+    def test_call_reports_progress(
+        self,
+        target: typing.Callable[[str, str], list[User]],
+        credential_env: dict[str, str],
+        mocker: MockerFixture,
+    ) -> None:
+        mocker.patch(
+            "aws_sso_user_list.user._fetch_users",
+            side_effect=[
+                {
+                    "TotalUserCount": 3,
+                    "Users": [
+                        make_user_data("user1", "user1@example.com"),
+                        make_user_data("user2", "user2@example.com"),
+                    ],
+                    "NextToken": "XXXXXXXX",
+                },
+                {"Users": [make_user_data("user3", "user3@example.com")]},
+            ],
+        )
+
+        with progress.collect("json", interval=60, output=io.StringIO()) as (
+            active
+        ):
+            target("d-1234567890", "us-east-1")
+
+        assert active is not None
+        assert active.counters["pages"] == 2
+        assert active.counters["users"] == 3
+        assert active.total_users == 3
+
+
+def make_user_data(user_id: str, user_name: str) -> dict:
+    return {
+        "Active": True,
+        "Meta": {"CreatedAt": 948603360.0, "UpdatedAt": 948603360.0},
+        "UserAttributes": {
+            "emails": {
+                "ComplexListValue": [
+                    {
+                        "verificationStatus": {"StringValue": "VERIFIED"},
+                        "value": {"StringValue": user_name},
+                        "primary": {"BooleanValue": True},
+                    },
+                ]
+            },
+            "displayName": {"StringValue": "John Doe"},
+        },
+        "UserId": user_id,
+        "UserName": user_name,
+    }
+
+
+class TestIterAllUsersSharded:
+    @pytest.fixture
+    def target(self) -> typing.Callable[..., typing.Iterator[User]]:
+        return iter_all_users
+
+    @pytest.fixture
+    def credential_env(self) -> dict[str, str]:
+        credentials = {
+            "AWS_ACCESS_KEY_ID": "testing",
+            "AWS_SECRET_ACCESS_KEY": "testing",
+            "AWS_DEFAULT_REGION": "us-east-1",
+        }
+
+        for key, value in credentials.items():
+            os.environ[key] = value
+
+        return credentials
+
+    def mock_fetch_users(
+        self,
+        mocker: MockerFixture,
+        shards: dict[str, list[dict]],
+        pages: list[dict],
+    ) -> typing.Any:
+        def fetch_users(
+            next_token: str | None,
+            filters: list[dict] | None,
+            **kwargs: typing.Any,
+        ) -> dict:
+            if filters:
+                return {"Users": shards.get(filters[0]["AttributeValue"], [])}
+            return pages[1] if next_token else pages[0]
+
+        return mocker.patch(
+            "aws_sso_user_list.user._fetch_users", side_effect=fetch_users
+        )
+
+    def test_call_success(
+        self,
+        target: typing.Callable[..., typing.Iterator[User]],
+        credential_env: dict[str, str],
+        mocker: MockerFixture,
+    ) -> None:
+        user1 = make_user_data("user1", "alice@example.com")
+        user2 = make_user_data("user2", "bob@example.com")
+        user3 = make_user_data("user3", "Bill@example.com")
+        user4 = make_user_data("user4", "_svc@example.com")
+        mocked_fetch_users = self.mock_fetch_users(
+            mocker,
+            shards={"a": [user1], "b": [user2], "B": [user3], "_": [user4]},
+            pages=[
+                {"TotalUserCount": 4, "Users": [user1], "NextToken": "X"},
+            ],
+        )
+
+        users = list(
+            target("d-1234567890", "us-east-1", sharded=True, max_workers=4)
+        )
+
+        assert [user.user_id for user in users] == [
+            "user1",
+            "user2",
+            "user3",
+            "user4",
+        ]
+        calls = mocked_fetch_users.call_args_list
+        assert [call.kwargs["filters"] for call in calls].count(None) == 1
+
+    def test_call_fallback(
+        self,
+        target: typing.Callable[..., typing.Iterator[User]],
+        credential_env: dict[str, str],
+        mocker: MockerFixture,
+    ) -> None:
+        user1 = make_user_data("user1", "alice@example.com")
+        user2 = make_user_data("user2", "émile@example.com")
+        self.mock_fetch_users(
+            mocker,
+            shards={},
+            pages=[
+                {"TotalUserCount": 2, "Users": [user1], "NextToken": "X"},
+                {"TotalUserCount": 2, "Users": [user1, user2]},
+            ],
+        )
+
+        with pytest.warns(
+            ShardedScanWarning,
+            match="^Sharded scan found 1 of 2 users, scanning sequentially$",
+        ):
+            users = list(
+                target(
+                    "d-1234567890",
+                    "us-east-1",
+                    sharded=True,
+                    max_workers=4,
+                )
+            )
+
+        assert [user.user_id for user in users] == ["user1", "user2"]
+
+    def test_call_without_total(
+        self,
+        target: typing.Callable[..., typing.Iterator[User]],
+        credential_env: dict[str, str],
+        mocker: MockerFixture,
+    ) -> None:
+        user1 = make_user_data("user1", "alice@example.com")
+        user2 = make_user_data("user2", "bob@example.com")
+        mocked_fetch_users = self.mock_fetch_users(
+            mocker,
+            shards={"a": [user1], "b": [user2]},
+            pages=[
+                {"Users": [user1], "NextToken": "X"},
+                {"Users": [user2]},
+            ],
+        )
+
+        with pytest.warns(ShardedScanWarning, match="^Sharded scan skipped"):
+            users = list(
+                target(
+                    "d-1234567890",
+                    "us-east-1",
+                    sharded=True,
+                    max_workers=4,
+                )
+            )
+
+        assert [user.user_id for user in users] == ["user1", "user2"]
+        calls = mocked_fetch_users.call_args_list
+        assert [call.kwargs["filters"] for call in calls] == [None, None]
+
+    def test_call_single_page(
+        self,
+        target: typing.Callable[..., typing.Iterator[User]],
+        credential_env: dict[str, str],
+        mocker: MockerFixture,
+    ) -> None:
+        user1 = make_user_data("user1", "alice@example.com")
+        mocked_fetch_users = self.mock_fetch_users(
+            mocker,
+            shards={},
+            pages=[{"TotalUserCount": 1, "Users": [user1]}],
+        )
+
+        users = list(target("d-1234567890", "us-east-1", sharded=True))
+
+        assert [user.user_id for user in users] == ["user1"]
+        mocked_fetch_users.assert_called_once()
+
+
+class TestIterUsersByIds:
+    @pytest.fixture
+    def target(self) -> typing.Callable[..., typing.Iterator[User]]:
+        return iter_users_by_ids
+
+    def test_call_success(
+        self,
+        target: typing.Callable[..., typing.Iterator[User]],
+        mocker: MockerFixture,
+    ) -> None:
+        mocker.patch.dict(
+            os.environ,
+            {
+                "AWS_ACCESS_KEY_ID": "testing",
+                "AWS_SECRET_ACCESS_KEY": "testing",
+            },
+        )
+
+        def describe_users(user_ids: list[str], **kwargs: typing.Any) -> dict:
+            return {
+                "Users": [
+                    make_user_data(user_id, f"{user_id}@example.com")
+                    for user_id in user_ids
+                    if user_id != "user007"
+                ]
+            }
+
+        mocked_describe_users = mocker.patch(
+            "aws_sso_user_list.user._describe_users",
+            side_effect=describe_users,
+        )
+        user_ids = [f"user{i:03}" for i in range(150)]
+
+        users = list(
+            target(
+                "d-1234567890",
+                "us-east-1",
+                user_ids + ["user000"],
+                max_workers=2,
+            )
+        )
+
+        assert mocked_describe_users.call_count == 2
+        assert [user.user_id for user in users] == [
+            user_id for user_id in user_ids if user_id != "user007"
+        ]
+
+
+class TestIterUsersByNames:
+    @pytest.fixture
+    def target(self) -> typing.Callable[..., typing.Iterator[User]]:
+        return iter_users_by_names
+
+    def test_call_success(
+        self,
+        target: typing.Callable[..., typing.Iterator[User]],
+        mocker: MockerFixture,
+    ) -> None:
+        mocker.patch.dict(
+            os.environ,
+            {
+                "AWS_ACCESS_KEY_ID": "testing",
+                "AWS_SECRET_ACCESS_KEY": "testing",
+            },
+        )
+        directory = [
+            make_user_data("user1", "alice@example.com"),
+            make_user_data("user2", "alice@example.com.au"),
+            make_user_data("user3", "bob@example.com"),
+        ]
+
+        def fetch_users(filters: list[dict], **kwargs: typing.Any) -> dict:
+            prefix = filters[0]["AttributeValue"].casefold()
+            return {
+                "Users": [
+                    user
+                    for user in directory
+                    if user["UserName"].casefold().startswith(prefix)
+                ]
+            }
+
+        mocker.patch(
+            "aws_sso_user_list.user._fetch_users", side_effect=fetch_users
+        )
+
+        users = list(
+            target(
+                "d-1234567890",
+                "us-east-1",
+                ["Alice@example.com", "bob@example.com", "carol@example.com"],
+                max_workers=2,
+            )
+        )
+
+        assert [user.user_id for user in users] == ["user1", "user3"]
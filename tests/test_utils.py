@@ -1,15 +1,32 @@
+import json
+import pickle
 import typing
+from dataclasses import asdict, replace
 from datetime import UTC, datetime
+from itertools import islice
 
 import pytest
 from pytest_mock import MockerFixture
 
+from aws_sso_user_list.assignment import (
+    AccountAssignment,
+    UserAccountAssignments,
+)
+from aws_sso_user_list.exporter import json_default
+from aws_sso_user_list.group import UserGroups
 from aws_sso_user_list.mfa_device import MfaDevice, UserMfa
 from aws_sso_user_list.user import User
 from aws_sso_user_list.utils import (
     UserWithMfaDevice,
     combine_user_and_user_mfa,
     fetch_all_user_with_mfa_device,
+    fetch_all_user_with_mfa_device_bounded,
+    iter_all_user_with_mfa_device,
+    iter_selected_users,
+    iter_with_account_assignments,
+    iter_with_groups,
+    merge_join_user_and_user_mfa,
+    sort_users,
 )
 
 
@@ -78,6 +95,49 @@ class TestUserWithMfaDevice:
             2000, 1, 23, 4, 56, tzinfo=UTC
         )
 
+    def test_to_dict(self, target: typing.Type[UserWithMfaDevice]) -> None:
+        user = target.from_user_and_user_mfa(
+            user=make_user("user1"), user_mfa=make_user_mfa("user1")
+        )
+
+        assert "groups" not in user.to_dict()
+        assert "account_assignments" not in user.to_dict()
+        user.groups = ["Admins"]
+        user.account_assignments = [
+            AccountAssignment("111", "ps", "Admin", "USER", "user1")
+        ]
+        assert user.to_dict()["groups"] == ["Admins"]
+        assert user.to_dict()["account_assignments"] == [
+            {
+                "account_id": "111",
+                "permission_set_arn": "ps",
+                "permission_set_name": "Admin",
+                "principal_type": "USER",
+                "principal_id": "user1",
+            }
+        ]
+        data = json.loads(json.dumps(user.to_dict(), default=json_default))
+        assert target.from_dict(data) == user
+
+    def test_from_user_and_user_mfa_lazy(
+        self, target: typing.Type[UserWithMfaDevice]
+    ) -> None:
+        user = target.from_user_and_user_mfa(
+            user=make_user("user1"), user_mfa=make_user_mfa("user1")
+        )
+        eager = UserWithMfaDevice(
+            mfa_devices=make_user_mfa("user1").mfa_devices,
+            **asdict(make_user("user1")),
+        )
+
+        assert user == eager
+        assert pickle.loads(pickle.dumps(user)) == eager
+        assert replace(user, groups=["Admins"]) == replace(
+            eager, groups=["Admins"]
+        )
+        with pytest.raises(AttributeError):
+            user.missing
+
 
 class TestCombineUserAndUserMfa:
     @pytest.fixture
@@ -223,14 +283,403 @@ class TestFetchAllUserWithMfaDevice:
         mocked_fetch_all_users.assert_called_once_with(
             identity_store_id="d-0123456789",
             region="us-east-1",
+            transport=None,
+            sharded=False,
+            max_workers=1,
         )
         mocked_fetch_all_mfa_devices.assert_called_once_with(
             identity_store_id="d-0123456789",
             region="us-east-1",
             user_ids=["01234567-89ab-cdef-0123-456789abcdef"],
+            transport=None,
+            max_workers=1,
+            failures=None,
+            batch_size=25,
         )
         mocked_combine_user_and_user_mfa.assert_called_once_with(
             users=[user],
             user_mfas=[user_mfa],
         )
         assert data == [user_with_mfa_device]
+
+
+def make_user(user_id: str) -> User:
+    return User(
+        active=True,
+        user_id=user_id,
+        user_name=f"{user_id}@example.com",
+        display_name="John Doe",
+        email=f"{user_id}@example.com",
+        email_verification_status="VERIFIED",
+        created_at=datetime(2000, 1, 23, 4, 56, tzinfo=UTC),
+        updated_at=datetime(2000, 1, 23, 4, 56, tzinfo=UTC),
+    )
+
+
+def make_user_mfa(user_id: str) -> UserMfa:
+    return UserMfa(
+        user_id=user_id,
+        mfa_devices=[
+            MfaDevice(
+                device_id=f"{user_id}_device",
+                device_name=f"{user_id}_device_name",
+                display_name="MFA Device",
+                mfa_type="WEBAUTHN",
+                registered_date=datetime(2000, 1, 23, 4, 56, tzinfo=UTC),
+            ),
+        ],
+    )
+
+
+class TestMergeJoinUserAndUserMfa:
+    @pytest.fixture
+    def target(
+        self,
+    ) -> typing.Callable[
+        [list[User], list[UserMfa]], typing.Iterator[UserWithMfaDevice]
+    ]:
+        return merge_join_user_and_user_mfa
+
+    def test_call_success(self, target: typing.Callable) -> None:
+        users = [make_user("user1"), make_user("user3")]
+        user_mfas = [
+            make_user_mfa("user1"),
+            make_user_mfa("user2"),
+            make_user_mfa("user3"),
+        ]
+
+        user_with_mfa_device = list(target(users, user_mfas))
+
+        assert [user.user_id for user in user_with_mfa_device] == [
+            "user1",
+            "user3",
+        ]
+        assert (
+            user_with_mfa_device[1].mfa_devices[0].device_id == "user3_device"
+        )
+
+    def test_missing_user_mfa(self, target: typing.Callable) -> None:
+        users = [make_user("user1"), make_user("user2")]
+        user_mfas = [make_user_mfa("user1")]
+
+        with pytest.raises(KeyError):
+            list(target(users, user_mfas))
+
+
+class TestFetchAllUserWithMfaDeviceBounded:
+    @pytest.fixture
+    def target(
+        self,
+    ) -> typing.Callable[[str, str, int], typing.Iterator[UserWithMfaDevice]]:
+        return fetch_all_user_with_mfa_device_bounded
+
+    def test_call_success(
+        self,
+        target: typing.Callable[
+            [str, str, int], typing.Iterator[UserWithMfaDevice]
+        ],
+        mocker: MockerFixture,
+    ) -> None:
+        user_ids = [f"user{i:02}" for i in range(30, 0, -1)]
+        mocker.patch(
+            "aws_sso_user_list.utils.iter_all_users",
+            return_value=iter([make_user(user_id) for user_id in user_ids]),
+        )
+
+        def iter_all_mfa_devices(
+            identity_store_id: str,
+            region: str,
+            user_ids: typing.Iterable[str],
+            **kwargs: typing.Any,
+        ) -> typing.Iterator[UserMfa]:
+            return reversed([make_user_mfa(user_id) for user_id in user_ids])
+
+        mocked_iter_all_mfa_devices = mocker.patch(
+            "aws_sso_user_list.utils.iter_all_mfa_devices",
+            side_effect=iter_all_mfa_devices,
+        )
+
+        data = list(target("d-0123456789", "us-east-1", 1024))
+
+        mocked_iter_all_mfa_devices.assert_called_once()
+        assert [user.user_id for user in data] == sorted(user_ids)
+        assert all(
+            user.mfa_devices[0].device_id == f"{user.user_id}_device"
+            for user in data
+        )
+
+
+IterAllUserWithMfaDevice = typing.Callable[
+    [str, str], typing.Iterator[UserWithMfaDevice]
+]
+
+
+class TestIterAllUserWithMfaDevice:
+    @pytest.fixture
+    def target(self) -> IterAllUserWithMfaDevice:
+        return iter_all_user_with_mfa_device
+
+    def test_call_success(
+        self,
+        target: IterAllUserWithMfaDevice,
+        mocker: MockerFixture,
+    ) -> None:
+        user_ids = [f"user{i:02}" for i in range(60)]
+        mocker.patch(
+            "aws_sso_user_list.utils.iter_all_users",
+            return_value=iter([make_user(user_id) for user_id in user_ids]),
+        )
+        max_pending: list[int] = []
+
+        def iter_all_mfa_devices(
+            identity_store_id: str,
+            region: str,
+            user_ids: typing.Iterable[str],
+            **kwargs: typing.Any,
+        ) -> typing.Iterator[UserMfa]:
+            user_id_iter = iter(user_ids)
+            while batch := list(islice(user_id_iter, 25)):
+                max_pending.append(len(batch))
+                yield from reversed([make_user_mfa(i) for i in batch])
+
+        mocker.patch(
+            "aws_sso_user_list.utils.iter_all_mfa_devices",
+            side_effect=iter_all_mfa_devices,
+        )
+
+        data = list(target("d-0123456789", "us-east-1"))
+
+        assert sorted(user.user_id for user in data) == user_ids
+        assert all(
+            user.mfa_devices[0].device_id == f"{user.user_id}_device"
+            for user in data
+        )
+        assert max_pending == [25, 25, 10]
+
+    def test_missing_user_mfa(
+        self,
+        target: IterAllUserWithMfaDevice,
+        mocker: MockerFixture,
+    ) -> None:
+        mocker.patch(
+            "aws_sso_user_list.utils.iter_all_users",
+            return_value=iter([make_user("user1"), make_user("user2")]),
+        )
+
+        def iter_all_mfa_devices(
+            identity_store_id: str,
+            region: str,
+            user_ids: typing.Iterable[str],
+            **kwargs: typing.Any,
+        ) -> typing.Iterator[UserMfa]:
+            list(user_ids)
+            yield make_user_mfa("user1")
+
+        mocker.patch(
+            "aws_sso_user_list.utils.iter_all_mfa_devices",
+            side_effect=iter_all_mfa_devices,
+        )
+
+        with pytest.raises(KeyError):
+            list(target("d-0123456789", "us-east-1"))
+
+    def test_call_with_groups(
+        self,
+        target: typing.Callable[..., typing.Iterator[UserWithMfaDevice]],
+        mocker: MockerFixture,
+    ) -> None:
+        mocker.patch(
+            "aws_sso_user_list.utils.iter_all_users",
+            return_value=iter([make_user("user1"), make_user("user2")]),
+        )
+        mocker.patch(
+            "aws_sso_user_list.utils.iter_all_mfa_devices",
+            side_effect=lambda user_ids, **_: map(make_user_mfa, user_ids),
+        )
+
+        def iter_all_groups(
+            user_ids: typing.Iterable[str], **kwargs: typing.Any
+        ) -> typing.Iterator[UserGroups]:
+            for user_id in user_ids:
+                yield UserGroups(user_id=user_id, group_names=[user_id])
+
+        mocker.patch(
+            "aws_sso_user_list.utils.iter_all_groups",
+            side_effect=iter_all_groups,
+        )
+
+        data = list(target("d-0123456789", "us-east-1", with_groups=True))
+
+        assert [user.groups for user in data] == [["user1"], ["user2"]]
+
+
+class TestIterWithGroups:
+    @pytest.fixture
+    def target(
+        self,
+    ) -> typing.Callable[..., typing.Iterator[UserWithMfaDevice]]:
+        return iter_with_groups
+
+    def test_call_success(
+        self,
+        target: typing.Callable[..., typing.Iterator[UserWithMfaDevice]],
+        mocker: MockerFixture,
+    ) -> None:
+        users = [
+            UserWithMfaDevice.from_user_and_user_mfa(
+                user=make_user(user_id), user_mfa=make_user_mfa(user_id)
+            )
+            for user_id in ["user1", "user2"]
+        ]
+
+        def iter_all_groups(
+            user_ids: typing.Iterable[str], **kwargs: typing.Any
+        ) -> typing.Iterator[UserGroups]:
+            for user_id in user_ids:
+                yield UserGroups(user_id=user_id, group_names=[user_id])
+
+        mocked_iter_all_groups = mocker.patch(
+            "aws_sso_user_list.utils.iter_all_groups",
+            side_effect=iter_all_groups,
+        )
+
+        data = list(
+            target(
+                identity_store_id="d-0123456789",
+                region="us-east-1",
+                users=iter(users),
+                max_workers=2,
+            )
+        )
+
+        assert [user.groups for user in data] == [["user1"], ["user2"]]
+        assert [user.mfa_devices for user in data] == [
+            user.mfa_devices for user in users
+        ]
+        assert users[0].groups is None
+        assert mocked_iter_all_groups.call_args.kwargs["max_workers"] == 2
+
+
+class TestIterWithAccountAssignments:
+    @pytest.fixture
+    def target(
+        self,
+    ) -> typing.Callable[..., typing.Iterator[UserWithMfaDevice]]:
+        return iter_with_account_assignments
+
+    def test_call_success(
+        self,
+        target: typing.Callable[..., typing.Iterator[UserWithMfaDevice]],
+        mocker: MockerFixture,
+    ) -> None:
+        users = [
+            UserWithMfaDevice.from_user_and_user_mfa(
+                user=make_user(user_id), user_mfa=make_user_mfa(user_id)
+            )
+            for user_id in ["user1", "user2"]
+        ]
+        account_assignment = AccountAssignment(
+            "111", "ps", "Admin", "GROUP", "group1"
+        )
+
+        def iter_all_account_assignments(
+            user_ids: typing.Iterable[str], **kwargs: typing.Any
+        ) -> typing.Iterator[UserAccountAssignments]:
+            for user_id in user_ids:
+                yield UserAccountAssignments(
+                    user_id=user_id, account_assignments=[account_assignment]
+                )
+
+        mocked_iter_all_account_assignments = mocker.patch(
+            "aws_sso_user_list.utils.iter_all_account_assignments",
+            side_effect=iter_all_account_assignments,
+        )
+
+        data = list(
+            target(
+                identity_store_id="d-0123456789",
+                region="us-east-1",
+                instance_arn="arn:aws:sso:::instance/ssoins-0123456789abcdef",
+                users=iter(users),
+            )
+        )
+
+        assert [user.account_assignments for user in data] == [
+            [account_assignment],
+            [account_assignment],
+        ]
+        kwargs = mocked_iter_all_account_assignments.call_args.kwargs
+        assert kwargs["instance_arn"] == (
+            "arn:aws:sso:::instance/ssoins-0123456789abcdef"
+        )
+
+
+class TestSortUsers:
+    @pytest.fixture
+    def target(self) -> typing.Callable:
+        return sort_users
+
+    @pytest.mark.parametrize("memory_limit", [64, 1024 * 1024])
+    def test_call_success(
+        self, target: typing.Callable, memory_limit: int
+    ) -> None:
+        users = [
+            UserWithMfaDevice.from_user_and_user_mfa(
+                user=make_user(f"user{index:02}"),
+                user_mfa=UserMfa(
+                    user_id=f"user{index:02}",
+                    mfa_devices=make_user_mfa(f"user{index:02}").mfa_devices
+                    * (index * 7 % 3),
+                ),
+            )
+            for index in range(20)
+        ]
+
+        result = list(
+            target(
+                reversed(users),
+                sort_by="mfa_device_count",
+                memory_limit=memory_limit,
+            )
+        )
+
+        assert [(len(user.mfa_devices), user.user_id) for user in result] == (
+            sorted((len(user.mfa_devices), user.user_id) for user in users)
+        )
+
+
+class TestIterSelectedUsers:
+    @pytest.fixture
+    def target(self) -> typing.Callable:
+        return iter_selected_users
+
+    def test_call_success(
+        self, target: typing.Callable, mocker: MockerFixture
+    ) -> None:
+        mocked_iter_users_by_ids = mocker.patch(
+            "aws_sso_user_list.utils.iter_users_by_ids",
+            return_value=iter([make_user("user1"), make_user("user2")]),
+        )
+        mocker.patch(
+            "aws_sso_user_list.utils.iter_users_by_names",
+            return_value=iter([make_user("user2"), make_user("user3")]),
+        )
+        mocked_iter_all_users = mocker.patch(
+            "aws_sso_user_list.utils.iter_all_users"
+        )
+
+        users = list(
+            target(
+                "d-0123456789",
+                "us-east-1",
+                user_ids=["user1", "user2"],
+                user_names=["user2@example.com", "user3@example.com"],
+            )
+        )
+
+        assert [user.user_id for user in users] == ["user1", "user2", "user3"]
+        assert mocked_iter_users_by_ids.call_args.kwargs["user_ids"] == [
+            "user1",
+            "user2",
+        ]
+        mocked_iter_all_users.assert_not_called()
@@ -0,0 +1,249 @@
+import io
+import json
+import threading
+import typing
+from dataclasses import replace
+from datetime import UTC, datetime
+
+import pytest
+
+from aws_sso_user_list.mfa_device import MfaDevice
+from aws_sso_user_list.utils import UserWithMfaDevice
+from aws_sso_user_list.watch import Watcher
+
+
+def make_user(
+    user_id: str,
+    active: bool = True,
+    mfa_devices: list[MfaDevice] | None = None,
+) -> UserWithMfaDevice:
+    return UserWithMfaDevice(
+        active=active,
+        user_id=user_id,
+        user_name=f"{user_id}@example.com",
+        display_name="John Doe",
+        email=f"{user_id}@example.com",
+        email_verification_status="VERIFIED",
+        created_at=datetime(2000, 1, 23, 4, 56, tzinfo=UTC),
+        updated_at=datetime(2000, 1, 23, 4, 56, tzinfo=UTC),
+        mfa_devices=[] if mfa_devices is None else mfa_devices,
+    )
+
+
+def make_device(device_id: str) -> MfaDevice:
+    return MfaDevice(
+        device_id=device_id,
+        device_name=f"{device_id}_name",
+        display_name="MFA Device",
+        mfa_type="WEBAUTHN",
+        registered_date=datetime(2000, 1, 23, 4, 56, tzinfo=UTC),
+    )
+
+
+class TestWatcher:
+    @pytest.fixture
+    def polls(self) -> list[list[UserWithMfaDevice]]:
+        return []
+
+    @pytest.fixture
+    def output(self) -> io.StringIO:
+        return io.StringIO()
+
+    @pytest.fixture
+    def target(
+        self, polls: list[list[UserWithMfaDevice]], output: io.StringIO
+    ) -> Watcher:
+        return Watcher(fetch=lambda: polls.pop(0), output=output)
+
+    def events(self, output: io.StringIO) -> list[dict]:
+        return [json.loads(line) for line in output.getvalue().splitlines()]
+
+    def test_first_poll_sets_state(
+        self,
+        target: Watcher,
+        polls: list[list[UserWithMfaDevice]],
+        output: io.StringIO,
+    ) -> None:
+        polls.append([make_user("user1")])
+
+        assert target.poll() == 0
+        assert output.getvalue() == ""
+        assert list(target.users or ()) == ["user1"]
+
+    def test_created_and_deleted(
+        self,
+        target: Watcher,
+        polls: list[list[UserWithMfaDevice]],
+        output: io.StringIO,
+    ) -> None:
+        polls.extend([[make_user("user1")], [make_user("user2")]])
+
+        target.poll()
+        assert target.poll() == 2
+
+        events = self.events(output)
+        assert [event["event"] for event in events] == [
+            "UserCreated",
+            "UserDeleted",
+        ]
+        assert events[0]["user"]["user_id"] == "user2"
+        assert events[1]["user"]["user_id"] == "user1"
+        assert datetime.fromisoformat(events[0]["time"]).tzinfo is not None
+
+    def test_changed(
+        self,
+        target: Watcher,
+        polls: list[list[UserWithMfaDevice]],
+        output: io.StringIO,
+    ) -> None:
+        old = make_user("user1", mfa_devices=[make_device("m-1")])
+        new = replace(
+            make_user("user1", active=False, mfa_devices=[make_device("m-2")]),
+            email_verification_status="NOT_VERIFIED",
+            display_name="Jane Doe",
+        )
+        polls.extend([[old], [new]])
+
+        target.poll()
+        target.poll()
+
+        events = self.events(output)
+        assert [event["event"] for event in events] == [
+            "UserActivationChanged",
+            "EmailVerificationChanged",
+            "UserUpdated",
+            "MfaDeviceAdded",
+            "MfaDeviceRemoved",
+        ]
+        assert events[0]["user_id"] == "user1"
+        assert (events[0]["old"], events[0]["new"]) == (True, False)
+        assert events[1]["new"] == "NOT_VERIFIED"
+        assert events[2]["changes"] == {
+            "display_name": {"old": "John Doe", "new": "Jane Doe"}
+        }
+        assert events[3]["mfa_device"]["device_id"] == "m-2"
+        assert events[4]["mfa_device"]["device_id"] == "m-1"
+
+    def test_unknown_mfa_devices_keep_state(
+        self,
+        target: Watcher,
+        polls: list[list[UserWithMfaDevice]],
+        output: io.StringIO,
+    ) -> None:
+        polls.extend(
+            [
+                [make_user("user1", mfa_devices=[make_device("m-1")])],
+                [replace(make_user("user1", active=False), mfa_devices=None)],
+                [make_user("user1", active=False)],
+            ]
+        )
+
+        target.poll()
+        assert target.poll() == 1
+        assert target.poll() == 1
+
+        assert [event["event"] for event in self.events(output)] == [
+            "UserActivationChanged",
+            "MfaDeviceRemoved",
+        ]
+        assert target.users is not None
+        assert target.users["user1"].mfa_devices == []
+
+    def test_unknown_mfa_devices_keep_fields(
+        self,
+        target: Watcher,
+        polls: list[list[UserWithMfaDevice]],
+        output: io.StringIO,
+    ) -> None:
+        old = make_user("user1", mfa_devices=[make_device("m-1")])
+        polls.extend(
+            [
+                [old],
+                [
+                    replace(
+                        old,
+                        display_name="Jane Doe",
+                        email="jane@example.com",
+                        mfa_devices=None,
+                    )
+                ],
+            ]
+        )
+
+        target.poll()
+        target.poll()
+
+        events = self.events(output)
+        assert [event["event"] for event in events] == ["UserUpdated"]
+        assert events[0]["changes"] == {
+            "display_name": {"old": "John Doe", "new": "Jane Doe"},
+            "email": {"old": "user1@example.com", "new": "jane@example.com"},
+        }
+        assert target.users is not None
+        assert target.users["user1"].display_name == "Jane Doe"
+        assert target.users["user1"].mfa_devices == [make_device("m-1")]
+
+    def test_created_with_unknown_mfa_devices(
+        self,
+        target: Watcher,
+        polls: list[list[UserWithMfaDevice]],
+        output: io.StringIO,
+    ) -> None:
+        polls.extend(
+            [
+                [],
+                [replace(make_user("user1"), mfa_devices=None)],
+                [replace(make_user("user1"), mfa_devices=None)],
+                [make_user("user1", mfa_devices=[make_device("m-1")])],
+            ]
+        )
+
+        target.poll()
+        assert target.poll() == 1
+        assert target.poll() == 0
+        assert target.poll() == 1
+
+        events = self.events(output)
+        assert [event["event"] for event in events] == [
+            "UserCreated",
+            "MfaDeviceAdded",
+        ]
+        assert events[1]["mfa_device"]["device_id"] == "m-1"
+
+    def test_baseline(
+        self,
+        polls: list[list[UserWithMfaDevice]],
+        output: io.StringIO,
+    ) -> None:
+        polls.append([make_user("user1"), make_user("user2")])
+        target = Watcher(
+            fetch=lambda: polls.pop(0),
+            output=output,
+            users=[make_user("user1")],
+        )
+
+        assert target.poll() == 1
+        assert self.events(output)[0]["event"] == "UserCreated"
+
+    def test_run_survives_failed_poll(self, output: io.StringIO) -> None:
+        stopped = threading.Event()
+        results: list[typing.Any] = [
+            [make_user("user1")],
+            RuntimeError("boom"),
+            [make_user("user2")],
+        ]
+
+        def fetch() -> list[UserWithMfaDevice]:
+            result = results.pop(0)
+            if not results:
+                stopped.set()
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        Watcher(fetch=fetch, output=output).run(0, stopped)
+
+        assert [event["event"] for event in self.events(output)] == [
+            "UserCreated",
+            "UserDeleted",
+        ]
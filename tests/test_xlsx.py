@@ -0,0 +1,90 @@
+import io
+import zipfile
+from datetime import UTC, datetime
+from xml.etree import ElementTree
+
+import pytest
+
+from aws_sso_user_list.xlsx import XlsxWriter, cell, column_name, excel_serial
+
+NAMESPACE = {"s": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+
+
+class UnseekableBytesIO(io.BytesIO):
+    def seekable(self) -> bool:
+        return False
+
+    def seek(self, *args: object) -> int:
+        raise io.UnsupportedOperation()
+
+    def tell(self) -> int:
+        raise io.UnsupportedOperation()
+
+
+@pytest.mark.parametrize(
+    "index, name", [(0, "A"), (8, "I"), (25, "Z"), (26, "AA"), (701, "ZZ")]
+)
+def test_column_name(index: int, name: str) -> None:
+    assert column_name(index) == name
+
+
+def test_excel_serial() -> None:
+    assert excel_serial(datetime(2000, 1, 1, 12, tzinfo=UTC)) == 36526.5
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        (None, ""),
+        (True, '<c r="A1" t="b"><v>1</v></c>'),
+        (3, '<c r="A1"><v>3</v></c>'),
+        (
+            datetime(2000, 1, 1, tzinfo=UTC),
+            '<c r="A1" s="1"><v>36526.0</v></c>',
+        ),
+        (
+            "a<b\x01",
+            '<c r="A1" t="inlineStr">'
+            '<is><t xml:space="preserve">a&lt;b</t></is></c>',
+        ),
+    ],
+)
+def test_cell(value: object, expected: str) -> None:
+    assert cell("A1", value) == expected  # type: ignore[arg-type]
+
+
+class TestXlsxWriter:
+    @pytest.fixture
+    def target(self) -> UnseekableBytesIO:
+        return UnseekableBytesIO()
+
+    def test_writerow(self, target: UnseekableBytesIO) -> None:
+        with XlsxWriter(target, "Users") as writer:
+            writer.writerow(["Name", "Count"])
+            writer.writerow(["John Doe", 2])
+
+        with zipfile.ZipFile(io.BytesIO(target.getvalue())) as zip_file:
+            assert set(zip_file.namelist()) == {
+                "[Content_Types].xml",
+                "_rels/.rels",
+                "xl/workbook.xml",
+                "xl/_rels/workbook.xml.rels",
+                "xl/styles.xml",
+                "xl/worksheets/sheet1.xml",
+            }
+            workbook = ElementTree.fromstring(zip_file.read("xl/workbook.xml"))
+            sheet = ElementTree.fromstring(
+                zip_file.read("xl/worksheets/sheet1.xml")
+            )
+
+        sheet_names = [
+            element.get("name")
+            for element in workbook.findall("s:sheets/s:sheet", NAMESPACE)
+        ]
+        assert sheet_names == ["Users"]
+        rows = sheet.findall("s:sheetData/s:row", NAMESPACE)
+        assert [row.get("r") for row in rows] == ["1", "2"]
+        references = [
+            element.get("r") for element in rows[1].findall("s:c", NAMESPACE)
+        ]
+        assert references == ["A2", "B2"]